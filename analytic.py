@@ -0,0 +1,405 @@
+import argparse
+import functools
+import math
+
+import numpy as np
+
+from convergence import TierTracker
+from metrics import DownsampledSeries, RunningStats
+from simulation import elo_update_team, simulate
+
+# Largest panel `expected_elo_deltas` enumerates (2**n vote patterns)
+MAX_ENUMERATED_PANEL = 16
+
+
+def correct_vote_probability(goodness, mood_factor):
+    """
+    Exact probability that a voter sides with the post's true quality under
+    `User.apply_mood` followed by `vote`, whichever side that is.
+
+    A voter with adjusted goodness `a` votes correctly with probability
+    a + (1 - a) / 2, which is linear in `a`, so only the mean of the mood
+    adjustment matters. With probability `mood_factor` goodness is scaled
+    by 1 - u or min(1, 1 + u) for u ~ U(0, 0.25), with equal odds.
+
+    Returns:
+        Array of probabilities
+    """
+    goodness = np.asarray(goodness, dtype=np.float64)
+    mood_factor = np.asarray(mood_factor, dtype=np.float64)
+    lowered = 0.875 * goodness
+    # The raised goodness hits 1 for u >= 1/g - 1, which is below 0.25 once g > 0.8
+    capped = goodness > 0.8
+    t = np.where(capped, 1 / np.where(capped, goodness, 1) - 1, 0.25)
+    raised = np.where(capped, 4 * (goodness * (t + t * t / 2) + 0.25 - t), 1.125 * goodness)
+    adjusted = (1 - mood_factor) * goodness + mood_factor * (raised + lowered) / 2
+    return (1 + adjusted) / 2
+
+
+def panel_pmf(p):
+    """
+    Poisson-binomial distribution of the number of correct votes of a fixed
+    panel whose members vote correctly with probabilities `p`.
+
+    Returns:
+        Array of length len(p) + 1, the probability of 0..n correct votes
+    """
+    pmf = np.ones(1)
+    for p_i in np.asarray(p, dtype=np.float64):
+        pmf = np.convolve(pmf, (1 - p_i, p_i))
+    return pmf
+
+
+def power_moments(p, size):
+    """
+    Per-voter terms p^k (1 - p)^(j - k) for 0 <= k <= j <= `size`, flattened
+    to rows of (size + 1)**2 so they can be summed over any set of voters.
+    """
+    p = np.asarray(p, dtype=np.float64)[:, None]
+    j, k = np.divmod(np.arange((size + 1) ** 2), size + 1)
+    return np.where(k <= j, p ** k * (1 - p) ** np.maximum(j - k, 0), 0.0)
+
+
+@functools.lru_cache(maxsize=None)
+def _root_powers(size):
+    """Binomial coefficients C(j, k) and the powers w^(k t) of the (size + 1)-th roots of unity."""
+    j, k = np.ogrid[: size + 1, : size + 1]
+    roots = np.exp(2j * np.pi * np.arange(size + 1) / (size + 1))
+    return np.vectorize(math.comb)(j, k), roots ** np.arange(size + 1)[:, None]
+
+
+def sampled_panel_pmfs(moments, size):
+    """
+    Distributions of the number of correct votes of a panel of `size` drawn
+    uniformly without replacement from a set of voters, exactly as
+    `RankIndex.sample_range` or `random.sample` draw them, for many voter
+    sets at once.
+
+    Summed over all panels, the generating polynomial of correct votes is the
+    elementary symmetric polynomial e_size of the voters' (1 - p + p x). It
+    follows from their power sums by Newton's identities, and the power sums
+    only need the summed `power_moments` of the voters, so the cost does not
+    depend on how many voters there are. The recursion runs on the values of
+    the polynomials at the (size + 1)-th roots of unity, vectorised over the
+    voter sets, and one FFT turns the values of e_size back into
+    coefficients.
+
+    Args:
+        moments: (sets, (n + 1)**2) array, each row the `power_moments(p, n)`
+            of a set of at least `size` voters summed over the set, n >= size
+
+    Returns:
+        (sets, size + 1) array, the probability of 0..size correct votes
+    """
+    moments = np.asarray(moments, dtype=np.float64)
+    width = math.isqrt(moments.shape[1])
+    moments = moments.reshape(-1, width, width)[:, : size + 1, : size + 1]
+    binomials, powers = _root_powers(size)
+    power_sums = (binomials * moments) @ powers
+    power_sums[:, 2::2] *= -1
+    elementary = np.empty((size + 1, len(moments), size + 1), dtype=complex)
+    elementary[0] = 1
+    for m in range(1, size + 1):
+        total = elementary[m - 1] * power_sums[:, 1]
+        for j in range(2, m + 1):
+            total += elementary[m - j] * power_sums[:, j]
+        elementary[m] = total / m
+    # Coefficients sum to e_size(1, ..., 1), the number of possible panels
+    pmf = np.maximum(np.fft.fft(elementary[size], axis=-1).real, 0)
+    return pmf / pmf.sum(axis=-1, keepdims=True)
+
+
+def sampled_panel_pmf(moments, size):
+    """`sampled_panel_pmfs` for a single set of voters."""
+    return sampled_panel_pmfs(np.asarray(moments)[None], size)[0]
+
+
+def support_probability(pmf, good_post):
+    """
+    Probability that a round with this correct-vote distribution has more
+    support than oppose votes (a draw does not publish). Works on stacked
+    distributions with an array of `good_post` flags too.
+    """
+    n = np.shape(pmf)[-1] - 1
+    correct = np.arange(n + 1)
+    return np.where(
+        good_post, pmf[..., 2 * correct > n].sum(axis=-1), pmf[..., 2 * correct < n].sum(axis=-1)
+    )
+
+
+def decision_accuracy(p, good_post):
+    """Exact probability that a single fixed panel decides the post correctly."""
+    supports = float(support_probability(panel_pmf(p), good_post))
+    return supports if good_post else 1 - supports
+
+
+def expected_elo_deltas(elo, p, good_post, k_factor=32):
+    """
+    Expected ELO change of each voter of a fixed panel from one round of
+    `round_voting`, by enumerating every vote pattern with its probability
+    and applying `elo_update_team` as `settle_round` does.
+
+    Returns:
+        Array of expected deltas aligned with the panel
+    """
+    elo = np.asarray(elo, dtype=np.float64)
+    p = np.asarray(p, dtype=np.float64)
+    n = len(p)
+    if n > MAX_ENUMERATED_PANEL:
+        raise ValueError(f"panels of more than {MAX_ENUMERATED_PANEL} voters are not enumerated")
+    correct = (np.arange(2**n)[:, None] >> np.arange(n)) & 1 == 1
+    weight = np.where(correct, p, 1 - p).prod(axis=1)
+    support = correct if good_post else ~correct
+    support_count = support.sum(axis=1)
+    winners = np.where((2 * support_count > n)[:, None], support, ~support)
+    winner_count = winners.sum(axis=1)
+    # Draws and unanimous rounds leave ratings unchanged
+    settled = (2 * support_count != n) & (winner_count < n)
+    winners, weight, winner_count = winners[settled], weight[settled], winner_count[settled]
+    loser_count = n - winner_count
+    change_per_winner, change_per_loser = elo_update_team(
+        (winners * elo).sum(axis=1) / winner_count,
+        (~winners * elo).sum(axis=1) / loser_count,
+        k=k_factor,
+        winner_size=winner_count,
+        loser_size=loser_count,
+    )
+    deltas = np.where(winners, change_per_winner[:, None], change_per_loser[:, None])
+    return weight @ deltas
+
+
+class AnalyticAccuracy:
+    """
+    Expected decision accuracy of every post, without sampling noise from
+    the votes.
+
+    Called before each post is voted on, it records what decides the exact
+    probability that `multi_round_voting` gets that post right, given its
+    quality and the ratings at that moment: Round 1 and Round 2 panels are
+    drawn without replacement from their tiers (`sampled_panel_pmfs`), vote
+    independently, and the post is published when both rounds support it.
+    The per-post values average to the same accuracy as the 0/1 outcomes,
+    with far less variance, so configurations can be compared on far fewer
+    posts.
+
+    Registered as a rating observer, it keeps the summed `power_moments` of
+    the Round 2 tier up to date through a `convergence.TierTracker`, so a
+    post costs O((changed users + cutoff movement) log N), not a pass over
+    the population. The probabilities are evaluated in batches of
+    `batch_size` posts; `expected` and `series` include every recorded post.
+
+    Voters follow the honest `vote` model; a `behaviour.VoterBehaviour`
+    is not taken into account. Pass it as `analytic` to `simulate`, with the
+    same panel parameters as the run.
+    """
+
+    def __init__(
+        self,
+        round1_users=5,
+        round2_users=5,
+        round1_split=70,
+        single_round_threshold=20,
+        batch_size=4096,
+    ):
+        self.round1_users = round1_users
+        self.round2_users = round2_users
+        self.round1_split = round1_split
+        self.single_round_threshold = single_round_threshold
+        self.batch_size = batch_size
+        self.panel_size = max(round1_users, round2_users)
+        self.size = 0
+        width = (self.panel_size + 1) ** 2
+        self._moments = np.empty((1024, width))
+        self._total = np.zeros(width)
+        self._upper = np.zeros(width)
+        self._tier = TierTracker(round1_split / 100.0)
+        self._dirty = set()
+        # Per pending post: Round 1 and Round 2 tier moments, tier sizes, quality side
+        self._pending = ([], [], [], [], [])
+        self._expected = RunningStats()
+        self._series = DownsampledSeries()
+
+    def config(self):
+        """Constructor arguments, e.g. to validate a checkpoint."""
+        return {
+            "round1_users": self.round1_users,
+            "round2_users": self.round2_users,
+            "round1_split": self.round1_split,
+            "single_round_threshold": self.single_round_threshold,
+            "batch_size": self.batch_size,
+        }
+
+    @property
+    def expected(self):
+        """`RunningStats` of the per-post expected accuracy."""
+        self.flush()
+        return self._expected
+
+    @property
+    def series(self):
+        """`DownsampledSeries` of the per-post expected accuracy."""
+        self.flush()
+        return self._series
+
+    def rating_changed(self, user_id, elo):
+        self._dirty.add(user_id)
+
+    def user_removed(self, user_id, moved_from):
+        """Drop `user_id`; the user with id `moved_from` (the last) takes it over."""
+        tier = self._tier
+        self._total -= self._moments[user_id]
+        if user_id < len(tier.member) and tier.member[user_id]:
+            self._upper -= self._moments[user_id]
+        self._moments[user_id] = self._moments[moved_from]
+        tier.user_removed(user_id, moved_from)
+        self._dirty.discard(user_id)
+        self._dirty.discard(moved_from)
+        self.size -= 1
+        capacity = len(self._moments) // 2
+        if capacity >= 1024 and self.size < capacity // 2:
+            self._moments = self._moments[:capacity].copy()
+
+    def _add_users(self, users):
+        start, end = self.size, len(users)
+        if end <= start:
+            return
+        if end > len(self._moments):
+            moments = np.empty((max(end, 2 * len(self._moments)), self._moments.shape[1]))
+            moments[:start] = self._moments[:start]
+            self._moments = moments
+        if hasattr(users, "goodness"):  # population.Population
+            goodness = users.goodness[start:end]
+            mood_factor = users.mood_factor[start:end]
+        else:
+            new_users = users[start:end]
+            goodness = [user.goodness for user in new_users]
+            mood_factor = [user.mood_factor for user in new_users]
+        moments = power_moments(correct_vote_probability(goodness, mood_factor), self.panel_size)
+        self._moments[start:end] = moments
+        self._total += moments.sum(axis=0)
+        self.size = end
+
+    def record_post(self, users, rank_index, quality):
+        """Record the next post of `quality`, about to be voted on by `users`."""
+        self._add_users(users)
+        N = len(users)
+        if N < self.single_round_threshold:
+            # One round over everyone; Round 2 is marked as not held
+            lower, upper, round1_voters, round2_voters = self._total.copy(), self._upper, N, -1
+        else:
+            tier = self._tier
+            tier.update(rank_index, self._dirty)
+            self._dirty.clear()
+            if tier.changed:
+                changed = np.array(tier.changed)
+                entered = np.frombuffer(tier.member, dtype=np.uint8)[changed]
+                self._upper += (2.0 * entered - 1) @ self._moments[changed]
+            lower, upper = self._total - self._upper, self._upper
+            round1_voters, round2_voters = N - tier.size, tier.size
+        for pending, value in zip(
+            self._pending, (lower, upper.copy(), round1_voters, round2_voters, quality >= 0.5)
+        ):
+            pending.append(value)
+        if len(self._pending[0]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Evaluate the posts recorded since the last flush."""
+        if not self._pending[0]:
+            return
+        lower, upper, round1_voters, round2_voters, good = map(np.array, self._pending)
+        self._pending = ([], [], [], [], [])
+        supports = np.ones(len(good))
+        for moments, voters, users in (
+            (lower, round1_voters, self.round1_users),
+            (upper, round2_voters, self.round2_users),
+        ):
+            sizes = np.minimum(voters, users)
+            for size in np.unique(sizes[voters >= 0]):
+                rows = sizes == size
+                pmf = sampled_panel_pmfs(moments[rows], size)
+                supports[rows] *= support_probability(pmf, good[rows])
+        for accuracy in np.where(good, supports, 1 - supports).tolist():
+            self._expected.update(accuracy)
+            self._series.append(accuracy)
+
+    def print_report(self, metrics=None):
+        expected = self.expected
+        if not expected.count:
+            return
+        print(f"\nExpected decision accuracy ({expected.count} posts, exact per post):")
+        print(f"  Expected: {100 * expected.mean:.2f}% ± {100 * expected.half_width():.2f}% (95% CI)")
+        if metrics is not None and metrics.total_votes:
+            observed = metrics.accuracy
+            half_width = 1.96 * math.sqrt(observed * (1 - observed) / metrics.total_votes)
+            print(f"  Observed: {100 * observed:.2f}% ± {100 * half_width:.2f}% (95% CI)")
+            if 0 < observed < 1:
+                fraction = expected.variance / (observed * (1 - observed))
+                print(f"  Posts needed for the same precision: {fraction:.1%} of the sampled ones")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - expected accuracy without vote sampling noise"
+    )
+    parser.add_argument("--max-population", type=int, default=2000)
+    parser.add_argument(
+        "--round1-users",
+        type=int,
+        nargs="+",
+        default=[3, 5, 7],
+        help="Round 1 panel sizes to compare",
+    )
+    parser.add_argument("--round2-users", type=int, default=5)
+    parser.add_argument("--round1-split", type=int, default=70)
+    parser.add_argument("--k-factor", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--panel-goodness",
+        type=float,
+        nargs="+",
+        default=[0.1, 0.3, 0.5, 0.7, 0.9],
+        help="Goodness of an equally rated panel for the expected ELO changes",
+    )
+    args = parser.parse_args()
+
+    print(f"{'round 1':>8} {'expected':>10} {'± 95%':>8} {'observed':>10} {'± 95%':>8} {'posts':>8}")
+    for round1_users in args.round1_users:
+        analytic = AnalyticAccuracy(round1_users, args.round2_users, args.round1_split)
+        run = simulate(
+            backend="arrays",
+            seed=args.seed,
+            max_population=args.max_population,
+            round1_users=round1_users,
+            round2_users=args.round2_users,
+            round1_split=args.round1_split,
+            k_factor=args.k_factor,
+            progress=False,
+            analytic=analytic,
+        )
+        metrics = run["metrics"]
+        observed = metrics.accuracy
+        observed_half_width = 1.96 * math.sqrt(observed * (1 - observed) / metrics.total_votes)
+        print(
+            f"{round1_users:>8} {100 * analytic.expected.mean:>9.2f}% "
+            f"{100 * analytic.expected.half_width():>7.2f}% {100 * observed:>9.2f}% "
+            f"{100 * observed_half_width:>7.2f}% {analytic.expected.count:>8}"
+        )
+
+    goodness = np.asarray(args.panel_goodness)
+    # Mean mood factor of `User`
+    p = correct_vote_probability(goodness, np.full(len(goodness), 0.1))
+    elo = np.full(len(goodness), 800.0)
+    print("\nExpected ELO change per round for an equally rated panel:")
+    print(f"  {'goodness':>8} {'P(correct)':>11} {'ELO change':>11}")
+    deltas = expected_elo_deltas(elo, p, True, args.k_factor)
+    for row in zip(goodness, p, deltas):
+        print(f"  {row[0]:>8.2f} {row[1]:>11.3f} {row[2]:>+11.2f}")
+    print(
+        f"  Panel decides correctly: {100 * decision_accuracy(p, True):.1f}% (good post), "
+        f"{100 * decision_accuracy(p, False):.1f}% (bad post)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+
+# One fixed-width record per vote cast; vote is 1 for support, 0 for oppose
+AUDIT_RECORD = np.dtype(
+    [
+        ("post_id", "<i8"),
+        ("voter_id", "<i8"),
+        ("elo_before", "<f8"),
+        ("elo_after", "<f8"),
+        ("round", "u1"),
+        ("vote", "u1"),
+        ("decision", "u1"),
+    ]
+)
+
+DECISION_CODES = {"oppose": 0, "support": 1, "draw": 2}
+
+_CHUNK_PATTERN = "votes-{:06d}.bin"
+
+# Starting rating of every user, in id order, as little-endian float64
+_USERS_FILE = "users.bin"
+
+
+class AuditLog:
+    """
+    Append-only binary log of every vote and the rating change it caused.
+
+    Records are collected in a preallocated buffer and bulk-written when it
+    fills, into chunk files of at most `chunk_records` records each. Chunks
+    are raw arrays of `AUDIT_RECORD`, so they can be opened with
+    `numpy.memmap` without parsing; `audit.json` holds the record layout and
+    the run's starting rating. `users.bin` holds the rating each user
+    actually joined with (which IP inheritance can set, see
+    `ip_inheritance.py`), written by `record_users`.
+
+    A new log replaces any chunks already in `directory`; with `append=True`
+    it continues after them instead (see `truncate` for resumed runs).
+    """
+
+    def __init__(
+        self,
+        directory,
+        elo_start=800,
+        chunk_records=1 << 22,
+        buffer_records=1 << 16,
+        append=False,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_records = chunk_records
+        self.records_written = 0
+        self.users_written = 0
+        for path in _chunk_paths(directory):
+            if append:
+                self.records_written += os.path.getsize(path) // AUDIT_RECORD.itemsize
+            else:
+                os.remove(path)
+        users_path = os.path.join(directory, _USERS_FILE)
+        if os.path.exists(users_path):
+            if append:
+                self.users_written = os.path.getsize(users_path) // 8
+            else:
+                os.remove(users_path)
+        self._buffer = np.empty(buffer_records, dtype=AUDIT_RECORD)
+        self._buffered = 0
+        with open(os.path.join(directory, "audit.json"), "w") as f:
+            json.dump(
+                {
+                    "elo_start": elo_start,
+                    "chunk_records": chunk_records,
+                    "dtype": [list(field) for field in AUDIT_RECORD.descr],
+                },
+                f,
+            )
+
+    def record_users(self, elos):
+        """Log the starting ratings of users joining, in id order."""
+        elos = np.asarray(elos, dtype="<f8")
+        with open(os.path.join(self.directory, _USERS_FILE), "ab") as f:
+            elos.tofile(f)
+        self.users_written += len(elos)
+
+    def record_round(self, post_id, round_number, voter_ids, votes, elo_before, elo_after, decision):
+        """
+        Buffer the votes of one voting round.
+
+        Args:
+            votes: Boolean support mask aligned with `voter_ids`
+            elo_before / elo_after: Voter ratings around the round's ELO update
+            decision: Round decision ("support", "oppose" or "draw")
+        """
+        count = len(voter_ids)
+        if self._buffered + count > len(self._buffer):
+            self.flush()
+        records = self._buffer[self._buffered : self._buffered + count]
+        records["post_id"] = post_id
+        records["voter_id"] = voter_ids
+        records["elo_before"] = elo_before
+        records["elo_after"] = elo_after
+        records["round"] = round_number
+        records["vote"] = votes
+        records["decision"] = DECISION_CODES[decision]
+        self._buffered += count
+
+    def flush(self):
+        start = 0
+        while start < self._buffered:
+            chunk, offset = divmod(self.records_written, self.chunk_records)
+            count = min(self._buffered - start, self.chunk_records - offset)
+            path = os.path.join(self.directory, _CHUNK_PATTERN.format(chunk))
+            with open(path, "ab") as f:
+                self._buffer[start : start + count].tofile(f)
+            self.records_written += count
+            start += count
+        self._buffered = 0
+
+    def truncate(self, records, users=None):
+        """
+        Drop everything after the first `records` records and, if given, the
+        first `users` starting ratings, e.g. what a crashed run logged after
+        its last checkpoint.
+        """
+        self._buffered = 0
+        if users is not None:
+            users_path = os.path.join(self.directory, _USERS_FILE)
+            if os.path.exists(users_path):
+                os.truncate(users_path, users * 8)
+            self.users_written = min(self.users_written, users)
+        for chunk, path in enumerate(_chunk_paths(self.directory)):
+            keep = min(max(records - chunk * self.chunk_records, 0), self.chunk_records)
+            if keep:
+                os.truncate(path, keep * AUDIT_RECORD.itemsize)
+            else:
+                os.remove(path)
+        self.records_written = records
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _chunk_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, "votes-*.bin")))
+
+
+def iter_audit_chunks(directory):
+    """Yield each chunk of the log as a read-only `numpy.memmap`, in order."""
+    for path in _chunk_paths(directory):
+        if os.path.getsize(path):
+            yield np.memmap(path, dtype=AUDIT_RECORD, mode="r")
+
+
+def read_audit_log(directory):
+    """Whole log as one record array."""
+    chunks = list(iter_audit_chunks(directory))
+    if not chunks:
+        return np.empty(0, dtype=AUDIT_RECORD)
+    return np.concatenate(chunks)
+
+
+def read_starting_ratings(directory):
+    """Logged starting rating of every user, indexed by user id."""
+    path = os.path.join(directory, _USERS_FILE)
+    if not os.path.exists(path):
+        return np.empty(0)
+    return np.fromfile(path, dtype="<f8").astype(np.float64)
+
+
+def replay(directory, population_size=None):
+    """
+    Rebuild the rating state from the log without re-running any voting.
+
+    Every user starts at their logged starting rating (the run's
+    `elo_start` for users the log has none for), and every voter ends at
+    the `elo_after` of their last record. Each record's `elo_before` is also
+    checked against the rating the voter's previous record, or their
+    starting rating, left behind, which detects missing or reordered
+    records.
+
+    Returns:
+        (ratings indexed by user id, number of chain mismatches)
+    """
+    with open(os.path.join(directory, "audit.json")) as f:
+        elo_start = json.load(f)["elo_start"]
+
+    ratings = read_starting_ratings(directory)
+    if population_size and population_size > len(ratings):
+        ratings = np.concatenate(
+            [ratings, np.full(population_size - len(ratings), float(elo_start))]
+        )
+    mismatches = 0
+    for chunk in iter_audit_chunks(directory):
+        voter_ids = np.asarray(chunk["voter_id"])
+        top = int(voter_ids.max()) + 1
+        if top > len(ratings):
+            ratings = np.concatenate([ratings, np.full(top - len(ratings), float(elo_start))])
+
+        # Chain check: group each voter's records in log order
+        order = np.argsort(voter_ids, kind="stable")
+        ids = voter_ids[order]
+        before = np.asarray(chunk["elo_before"])[order]
+        after = np.asarray(chunk["elo_after"])[order]
+        first = np.ones(len(ids), dtype=bool)
+        first[1:] = ids[1:] != ids[:-1]
+        expected = np.where(first, ratings[ids], np.roll(after, 1))
+        mismatches += int(np.count_nonzero(before != expected))
+
+        last = np.ones(len(ids), dtype=bool)
+        last[:-1] = ids[1:] != ids[:-1]
+        ratings[ids[last]] = after[last]
+
+    return ratings, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a Veridonia simulation audit log into rating state"
+    )
+    parser.add_argument("directory", help="Audit log directory")
+    parser.add_argument(
+        "--population",
+        type=int,
+        default=None,
+        help="Population size (users that never voted keep their starting rating)",
+    )
+    parser.add_argument(
+        "--output", default=None, help="Write the replayed ratings to this .npy file"
+    )
+    args = parser.parse_args()
+
+    records = sum(len(chunk) for chunk in iter_audit_chunks(args.directory))
+    ratings, mismatches = replay(args.directory, args.population)
+    print(f"Records replayed: {records}")
+    print(f"Users: {len(ratings)}")
+    print(f"Rating chain mismatches: {mismatches}")
+    if len(ratings):
+        q1, q2, q3 = np.percentile(ratings, [25, 50, 75])
+        print(f"ELO range: {ratings.min():.1f} - {ratings.max():.1f}")
+        print(f"ELO average: {ratings.mean():.2f}")
+        print(f"ELO quartiles: Q1={q1:.1f}, Q2={q2:.1f}, Q3={q3:.1f}")
+    if args.output:
+        np.save(args.output, ratings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import numpy as np
+
+from population import mood_adjusted_goodness, panel_support
+
+QUALITY_BANDS = 10
+
+
+class CommunityBaseline:
+    """
+    Counterfactual one-round vote of a large random panel (whitepaper 5.3).
+
+    For every post the growth loop has decided, a panel of `panel_size`
+    users drawn uniformly from the whole community (everyone when
+    `panel_size` is None or at least the population) votes with the same
+    mood and voting model, vectorised. Nothing is written back: ratings,
+    moods and the simulation's random stream are untouched, because the
+    panel and its votes come from the baseline's own generator.
+
+    Agreement with the multi-round decision is tallied per quality band and
+    per doubling of the population, separately for both directions of
+    disagreement.
+    """
+
+    def __init__(self, panel_size=1001, seed=0):
+        self.panel_size = panel_size
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.posts = 0
+        self.agreed = 0
+        self.baseline_correct = 0
+        self.votes_used = 0
+        self.baseline_votes = 0
+        # [band or bucket] -> [posts, agreed, published by MRVP only, by baseline only]
+        self.by_quality = np.zeros((QUALITY_BANDS, 4), dtype=np.int64)
+        self.by_population = {}
+        # Goodness and mood factor of `User` objects, copied as users appear
+        self._goodness = np.empty(0)
+        self._mood_factor = np.empty(0)
+
+    def config(self):
+        """Constructor arguments, e.g. to validate a checkpoint."""
+        return {"panel_size": self.panel_size, "seed": self.seed}
+
+    def _panel(self, users):
+        N = len(users)
+        if self.panel_size is None or self.panel_size >= N:
+            ids = None
+        else:
+            ids = self.rng.choice(N, size=self.panel_size, replace=False)
+        if hasattr(users, "goodness"):  # population.Population
+            goodness, mood_factor = users.goodness, users.mood_factor
+        else:
+            goodness, mood_factor = self._user_attributes(users)
+        if ids is None:
+            return goodness, mood_factor
+        return goodness[ids], mood_factor[ids]
+
+    def _user_attributes(self, users):
+        known = len(self._goodness)
+        if len(users) > known:
+            new_users = users[known:]
+            self._goodness = np.concatenate(
+                [self._goodness, [user.goodness for user in new_users]]
+            )
+            self._mood_factor = np.concatenate(
+                [self._mood_factor, [user.mood_factor for user in new_users]]
+            )
+        return self._goodness[: len(users)], self._mood_factor[: len(users)]
+
+    def decide(self, users, quality):
+        """
+        Decision of the baseline panel on a post of `quality`.
+
+        Returns:
+            (decision, panel size)
+        """
+        goodness, mood_factor = self._panel(users)
+        adjusted = mood_adjusted_goodness(goodness, mood_factor, self.rng)
+        support = int(panel_support(adjusted, quality, self.rng).sum())
+        return ("support" if support > len(goodness) - support else "oppose"), len(goodness)
+
+    def record_post(self, users, quality, decision, votes_used):
+        """Evaluate the baseline for a post the multi-round process decided."""
+        if not len(users):
+            return
+        baseline, panel = self.decide(users, quality)
+        agreed = baseline == decision
+        mrvp_only = decision == "support" and not agreed
+        baseline_only = baseline == "support" and not agreed
+        self.posts += 1
+        self.agreed += agreed
+        self.baseline_correct += (baseline == "support") == (quality >= 0.5)
+        self.votes_used += votes_used
+        self.baseline_votes += panel
+        band = min(int(quality * QUALITY_BANDS), QUALITY_BANDS - 1)
+        self.by_quality[band] += (1, agreed, mrvp_only, baseline_only)
+        bucket = len(users).bit_length() - 1
+        row = self.by_population.setdefault(bucket, np.zeros(4, dtype=np.int64))
+        row += (1, agreed, mrvp_only, baseline_only)
+
+    def summary(self):
+        """
+        Returns:
+            Dictionary with the agreement rate, the baseline's accuracy and
+            the votes per decision of both processes
+        """
+        posts = max(self.posts, 1)
+        return {
+            "posts": self.posts,
+            "agreement": self.agreed / posts,
+            "baseline_accuracy": self.baseline_correct / posts,
+            "votes_per_decision": self.votes_used / posts,
+            "baseline_votes_per_decision": self.baseline_votes / posts,
+            "votes_saved_per_decision": (self.baseline_votes - self.votes_used) / posts,
+        }
+
+    def print_report(self):
+        if not self.posts:
+            return
+        summary = self.summary()
+        panel = "whole community" if self.panel_size is None else f"{self.panel_size}-voter panel"
+        print(f"\nCounterfactual baseline ({panel}, one round, ratings untouched):")
+        print(f"  Agreement with multi-round decisions: {100 * summary['agreement']:.2f}%")
+        print(f"  Baseline correct votes: {100 * summary['baseline_accuracy']:.2f}%")
+        print(
+            f"  Votes per decision: {summary['votes_per_decision']:.1f} multi-round vs "
+            f"{summary['baseline_votes_per_decision']:.1f} baseline "
+            f"({summary['votes_saved_per_decision']:.1f} saved)"
+        )
+        print(f"\n  {'quality':<10} {'posts':>8} {'agree':>8} {'MRVP only':>10} {'baseline only':>14}")
+        for band, (posts, agreed, mrvp_only, baseline_only) in enumerate(self.by_quality):
+            if posts:
+                print(
+                    f"  {band / QUALITY_BANDS:.1f}-{(band + 1) / QUALITY_BANDS:.1f}    {posts:>8} "
+                    f"{100 * agreed / posts:>7.1f}% {mrvp_only:>10} {baseline_only:>14}"
+                )
+        print(f"\n  {'population':<13} {'posts':>8} {'agree':>8} {'MRVP only':>10} {'baseline only':>14}")
+        for bucket, (posts, agreed, mrvp_only, baseline_only) in sorted(self.by_population.items()):
+            print(
+                f"  {2 ** bucket:>6}-{2 ** (bucket + 1) - 1:<6} {posts:>8} "
+                f"{100 * agreed / posts:>7.1f}% {mrvp_only:>10} {baseline_only:>14}"
+            )
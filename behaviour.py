@@ -0,0 +1,305 @@
+import argparse
+
+import numpy as np
+
+from simulation import simulate, summarize_run
+
+# Kinds of voter, as indexes into `VoterBehaviour.kinds`
+HONEST, BOT, RING, STRATEGIC = range(4)
+
+
+class Ballot:
+    """The post a panel is voting on, as voter kinds see it."""
+
+    def __init__(self, creator, creator_elo, panel_elo):
+        self.creator = creator  # -1 if unknown
+        self.creator_elo = creator_elo
+        self.panel_elo = panel_elo  # mean rating of the panel
+
+
+class HonestVoter:
+    """Keeps the mood-adjusted vote of `vote`."""
+
+    name = "honest"
+
+    def vote(self, behaviour, voter, honest, ballot):
+        return honest
+
+    def votes(self, behaviour, voters, honest, ballot):
+        return honest
+
+
+class BotVoter:
+    """Always supports."""
+
+    name = "bot"
+
+    def vote(self, behaviour, voter, honest, ballot):
+        return True
+
+    def votes(self, behaviour, voters, honest, ballot):
+        return np.ones(len(voters), dtype=bool)
+
+
+class RingVoter:
+    """Supports posts created by its own ring, votes honestly otherwise."""
+
+    name = "ring"
+
+    def vote(self, behaviour, voter, honest, ballot):
+        if ballot.creator < 0:
+            return honest
+        return honest or bool(behaviour.ring[ballot.creator] == behaviour.ring[voter])
+
+    def votes(self, behaviour, voters, honest, ballot):
+        if ballot.creator < 0:
+            return honest
+        return honest | (behaviour.ring[voters] == behaviour.ring[ballot.creator])
+
+
+class StrategicVoter:
+    """
+    Tries to predict the majority instead of judging the post: with
+    probability `reliance` supports exactly when the creator's rating is at
+    least the panel's mean rating, otherwise votes honestly.
+    """
+
+    name = "strategic"
+
+    def __init__(self, reliance=0.8):
+        self.reliance = reliance
+
+    def vote(self, behaviour, voter, honest, ballot):
+        if ballot.creator < 0 or behaviour.rng.random() >= self.reliance:
+            return honest
+        return ballot.creator_elo >= ballot.panel_elo
+
+    def votes(self, behaviour, voters, honest, ballot):
+        if ballot.creator < 0:
+            return honest
+        relying = behaviour.rng.random(len(voters)) < self.reliance
+        return np.where(relying, ballot.creator_elo >= ballot.panel_elo, honest)
+
+
+class VoterBehaviour:
+    """
+    Adversarial voter kinds mixed into the population.
+
+    Each new user is drawn as one of the kinds in `kinds`: honest
+    (`HonestVoter`), a bot (`BotVoter`), a member of a ring of `ring_size`
+    colluders (`RingVoter`) or strategic (`StrategicVoter`). Every panel
+    first votes with the backend's own honest model; `votes` then hands
+    each non-honest member's vote to its kind, which returns the vote it
+    casts instead. A kind implements that twice, with the same meaning:
+    `vote(behaviour, voter, honest, ballot)` for one voter, used on the
+    objects backend and on the arrays backend's small panels, and
+    `votes(behaviour, voters, honest, ballot)` for arrays of voters. The
+    kinds draw from the model's own generator, so a population without
+    adversaries votes exactly as one without a behaviour model.
+
+    Pass the model as `behaviour` to `simulate`.
+    """
+
+    def __init__(
+        self,
+        bot_fraction=0.0,
+        ring_fraction=0.0,
+        ring_size=10,
+        strategic_fraction=0.0,
+        strategic_reliance=0.8,
+        seed=0,
+    ):
+        self.bot_fraction = bot_fraction
+        self.ring_fraction = ring_fraction
+        self.ring_size = ring_size
+        self.strategic_fraction = strategic_fraction
+        self.strategic_reliance = strategic_reliance
+        self.seed = seed
+        self.kinds = (HonestVoter(), BotVoter(), RingVoter(), StrategicVoter(strategic_reliance))
+        self.adversarial = bool(bot_fraction or ring_fraction or strategic_fraction)
+        self.rng = np.random.default_rng(seed)
+        self.size = 0
+        self._kind = np.empty(1024, dtype=np.int8)
+        self._ring = np.empty(1024, dtype=np.int64)
+        self._ring_members = 0
+
+    @property
+    def kind(self):
+        return self._kind[: self.size]
+
+    @property
+    def ring(self):
+        """Ring number per user (-1 outside rings)."""
+        return self._ring[: self.size]
+
+    def config(self):
+        """Constructor arguments, e.g. to validate a checkpoint."""
+        return {
+            name: getattr(self, name)
+            for name in (
+                "bot_fraction",
+                "ring_fraction",
+                "ring_size",
+                "strategic_fraction",
+                "strategic_reliance",
+                "seed",
+            )
+        }
+
+    def add_users(self, ids):
+        """Draw the kind of new users; ids must continue the existing sequence."""
+        count = len(ids)
+        end = self.size + count
+        if end > len(self._kind):
+            capacity = max(end, 2 * len(self._kind))
+            for name in ("_kind", "_ring"):
+                old = getattr(self, name)
+                new = np.empty(capacity, dtype=old.dtype)
+                new[: self.size] = old[: self.size]
+                setattr(self, name, new)
+        draw = self.rng.random(count)
+        bounds = np.cumsum([self.bot_fraction, self.ring_fraction, self.strategic_fraction])
+        kind = np.select(
+            [draw < bounds[0], draw < bounds[1], draw < bounds[2]],
+            [BOT, RING, STRATEGIC],
+            HONEST,
+        )
+        ring = np.full(count, -1, dtype=np.int64)
+        members = kind == RING
+        ring[members] = (self._ring_members + np.arange(int(members.sum()))) // self.ring_size
+        self._ring_members += int(members.sum())
+        self._kind[self.size : end] = kind
+        self._ring[self.size : end] = ring
+        self.size = end
+
+    def user_removed(self, user_id, moved_from):
+        """Drop `user_id`; the user with id `moved_from` (the last) takes it over."""
+        self._kind[user_id] = self._kind[moved_from]
+        self._ring[user_id] = self._ring[moved_from]
+        self.size -= 1
+        capacity = len(self._kind) // 2
+        if capacity >= 1024 and self.size < capacity // 2:
+            self._kind = self._kind[:capacity].copy()
+            self._ring = self._ring[:capacity].copy()
+
+    def votes(self, ids, honest, elos, creator=-1, creator_elo=None):
+        """
+        Votes the panel `ids` casts, given its honest votes.
+
+        Args:
+            ids: Voter ids
+            honest: Honest support per voter, a list of bools (one kind
+                call per non-honest voter) or a boolean array (one call
+                per kind present)
+            elos: Ratings of the panel
+            creator / creator_elo: Creator of the post (-1 if unknown) and
+                the creator's current rating
+
+        Returns:
+            Support per voter, in the form of `honest`
+        """
+        if not self.adversarial:
+            return honest
+        if isinstance(honest, np.ndarray):
+            kind = self._kind[ids]
+            present = np.unique(kind)
+            if present[-1] == HONEST:
+                return honest
+            ballot = Ballot(creator, creator_elo, float(np.mean(elos)))
+            support = honest.copy()
+            for code in present[present != HONEST]:
+                members = kind == code
+                support[members] = self.kinds[code].votes(self, ids[members], honest[members], ballot)
+            return support
+        kinds = self._kind
+        ballot = None
+        support = list(honest)
+        for i, voter in enumerate(ids):
+            code = kinds[voter]
+            if code != HONEST:
+                if ballot is None:
+                    ballot = Ballot(creator, creator_elo, sum(elos) / len(elos))
+                support[i] = self.kinds[code].vote(self, voter, support[i], ballot)
+        return support
+
+
+def behaviour_report(run, top_tier=30, editor_tier=1):
+    """
+    Rating outcome by voter kind for a run made with a `VoterBehaviour`.
+
+    Returns:
+        {kind name: dict of users, mean final rating and the share of the
+         top `top_tier`% and `editor_tier`% seats by rating held by the kind}
+    """
+    behaviour = run["behaviour"]
+    elos = np.asarray(run["user_elos"])
+    kinds = behaviour.kind
+    tier_cutoff, editor_cutoff = np.percentile(elos, [100 - top_tier, 100 - editor_tier])
+    in_tier, in_editors = elos >= tier_cutoff, elos >= editor_cutoff
+    report = {}
+    for code, kind in enumerate(behaviour.kinds):
+        mask = kinds == code
+        if not mask.any():
+            continue
+        report[kind.name] = {
+            "users": int(mask.sum()),
+            "final_elo": float(elos[mask].mean()),
+            "top_tier_share": float(mask[in_tier].mean()),
+            "editor_share": float(mask[in_editors].mean()),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - capture resistance under adversarial voters"
+    )
+    parser.add_argument("--max-population", type=int, default=5000)
+    parser.add_argument("--bot-fraction", type=float, default=0.1)
+    parser.add_argument("--ring-fraction", type=float, default=0.1)
+    parser.add_argument("--ring-size", type=int, default=10)
+    parser.add_argument("--strategic-fraction", type=float, default=0.1)
+    parser.add_argument("--strategic-reliance", type=float, default=0.8)
+    parser.add_argument("--elo-start", type=int, default=800)
+    parser.add_argument(
+        "--backend",
+        choices=["objects", "arrays"],
+        default="arrays",
+        help="Simulation backend (default: arrays)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scenarios = {
+        "honest": VoterBehaviour(seed=args.seed),
+        "adversarial": VoterBehaviour(
+            bot_fraction=args.bot_fraction,
+            ring_fraction=args.ring_fraction,
+            ring_size=args.ring_size,
+            strategic_fraction=args.strategic_fraction,
+            strategic_reliance=args.strategic_reliance,
+            seed=args.seed,
+        ),
+    }
+    for name, behaviour in scenarios.items():
+        run = simulate(
+            backend=args.backend,
+            seed=args.seed,
+            max_population=args.max_population,
+            elo_start=args.elo_start,
+            behaviour=behaviour,
+        )
+        summary = summarize_run(run)
+        print(f"\n{name.capitalize()} population:")
+        print(f"  Correct votes: {summary['accuracy']:.2f}%")
+        print(f"  Supported posts: {summary['supported_posts']}")
+        print(f"  {'kind':<10} {'users':>7} {'final ELO':>10} {'top 30%':>8} {'top 1%':>8}")
+        for kind, row in behaviour_report(run).items():
+            print(
+                f"  {kind:<10} {row['users']:>7} {row['final_elo']:>10.1f} "
+                f"{100 * row['top_tier_share']:>7.1f}% {100 * row['editor_share']:>7.1f}%"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from posting_sampler import PostingSampler
+from rank_index import RankIndex
+from simulation import (
+    Post,
+    User,
+    elo_update_team,
+    multi_round_voting,
+    round_voting,
+    select_posting_users,
+    simulate,
+    vote,
+)
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def build_users(size, elo_start=800, elo_spread=100):
+    """`size` users with ratings spread around `elo_start`, like a grown run."""
+    elos = elo_start + np.random.normal(0, elo_spread, size)
+    return [User(i, elo) for i, elo in enumerate(elos.tolist())]
+
+
+def _bench_vote(users, params):
+    post = Post(0, users[0])
+    return lambda: vote(random.choice(users), post)
+
+
+def _bench_elo_update_team(users, params):
+    size = params["round1_users"]
+    return lambda: elo_update_team(
+        810.0, 790.0, k=params["k_factor"], winner_size=size - 2, loser_size=2
+    )
+
+
+def _bench_round_voting(users, params):
+    post = Post(0, users[0])
+    size = params["round1_users"]
+    return lambda: round_voting(
+        random.sample(users, size), post, k_factor=params["k_factor"]
+    )
+
+
+def _multi_round_params(params):
+    return {
+        "round1_users": params["round1_users"],
+        "round2_users": params["round2_users"],
+        "k_factor": params["k_factor"],
+        "round1_split": params["round1_split"],
+    }
+
+
+def _bench_multi_round_voting(users, params):
+    post = Post(0, users[0])
+    kwargs = _multi_round_params(params)
+    return lambda: multi_round_voting(post, users, **kwargs)
+
+
+def _bench_multi_round_voting_indexed(users, params):
+    post = Post(0, users[0])
+    rank_index = RankIndex.from_ratings((user.id, user.elo) for user in users)
+    kwargs = _multi_round_params(params)
+    return lambda: multi_round_voting(post, users, rank_index=rank_index, **kwargs)
+
+
+def _bench_select_posting_users(users, params):
+    return lambda: select_posting_users(users, 1, params["elo_posting_scale"])
+
+
+def _bench_posting_sampler(users, params):
+    sampler = PostingSampler(params["elo_posting_scale"])
+    sampler.add_users(range(len(users)), [user.elo for user in users])
+    sampler.refresh()
+
+    def draw():
+        # One rating change per draw, as after a vote in the growth loop
+        user = random.choice(users)
+        sampler.rating_changed(user.id, user.elo)
+        return sampler.draw(1)
+
+    return draw
+
+
+# name -> factory(users, params) returning the callable to time; each call is
+# one operation (a vote, a round, a post decision or a creator draw)
+BENCHMARKS = {
+    "vote": _bench_vote,
+    "elo_update_team": _bench_elo_update_team,
+    "round_voting": _bench_round_voting,
+    "multi_round_voting": _bench_multi_round_voting,
+    "multi_round_voting_indexed": _bench_multi_round_voting_indexed,
+    "select_posting_users": _bench_select_posting_users,
+    "posting_sampler": _bench_posting_sampler,
+    "run_simulation": None,
+}
+
+
+def time_call(func, repeat=5, min_time=0.2):
+    """
+    Per-call time of `func`: the number of calls per measurement is
+    auto-ranged as in `timeit`, and the best of `repeat` measurements kept.
+
+    Returns:
+        (seconds per call, calls per measurement)
+    """
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(number, int(math.ceil(number * min_time / max(elapsed, 1e-9))))
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number, number
+
+
+def time_simulation(size, params, seed):
+    """Wall time of one headless growth run to `size` users, per post."""
+    start = time.perf_counter()
+    run = simulate(
+        seed=seed,
+        progress=False,
+        max_population=size,
+        posts_per_user=params["posts_per_user"],
+        round1_users=params["round1_users"],
+        round2_users=params["round2_users"],
+        k_factor=params["k_factor"],
+        round1_split=params["round1_split"],
+        elo_posting_scale=params["elo_posting_scale"],
+    )
+    elapsed = time.perf_counter() - start
+    posts = run["metrics"].total_votes
+    return elapsed / posts, posts
+
+
+def scaling_exponent(sizes, times):
+    """Slope of log(time) against log(population size); 1.0 means O(N)."""
+    if len(sizes) < 2:
+        return math.nan
+    return float(np.polyfit(np.log(sizes), np.log(times), 1)[0])
+
+
+def run_benchmarks(names, sizes, params, repeat=5, min_time=0.2, seed=0, simulation_max=100_000):
+    """
+    Time every benchmark in `names` at every population size.
+
+    Returns:
+        Results dictionary (see `main` for the JSON layout)
+    """
+    results = {name: [] for name in names}
+    for size in sizes:
+        users = None
+        for name in names:
+            if name == "run_simulation":
+                if size > simulation_max:
+                    continue
+                seconds, calls = time_simulation(size, params, seed)
+            else:
+                if users is None:
+                    np.random.seed([seed, size])
+                    users = build_users(size)
+                # Seeded per point, so a benchmark does the same work (e.g.
+                # votes on a post of the same quality) whichever others run
+                random.seed(f"{seed}:{name}:{size}")
+                seconds, calls = time_call(BENCHMARKS[name](users, params), repeat, min_time)
+            results[name].append(
+                {"population": size, "seconds_per_call": seconds, "calls": calls}
+            )
+            print(f"{name:<28} N={size:<9} {seconds * 1e6:>12.2f} us/call")
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": params,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "benchmarks": {
+            name: {
+                "points": points,
+                "scaling_exponent": scaling_exponent(
+                    [p["population"] for p in points],
+                    [p["seconds_per_call"] for p in points],
+                ),
+            }
+            for name, points in results.items()
+            if points
+        },
+    }
+
+
+def compare(results, baseline, tolerance=0.25, exponent_tolerance=0.2):
+    """
+    Compare results against a baseline results file.
+
+    A benchmark regresses when its per-call time at some population size
+    exceeds the baseline by more than `tolerance` (relative), or when its
+    scaling exponent grows by more than `exponent_tolerance`.
+
+    Returns:
+        List of regression descriptions (empty when there are none)
+    """
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        previous = baseline["benchmarks"][name]
+        before = {p["population"]: p["seconds_per_call"] for p in previous["points"]}
+        for point in current["points"]:
+            old = before.get(point["population"])
+            if old is None:
+                continue
+            ratio = point["seconds_per_call"] / old
+            status = "REGRESSION" if ratio > 1 + tolerance else "ok"
+            print(f"{name:<28} N={point['population']:<9} {ratio:>6.2f}x baseline  {status}")
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{name} at N={point['population']}: {ratio:.2f}x the baseline time"
+                )
+        growth = current["scaling_exponent"] - previous["scaling_exponent"]
+        if growth > exponent_tolerance:
+            regressions.append(
+                f"{name}: scaling exponent {previous['scaling_exponent']:.2f} -> "
+                f"{current['scaling_exponent']:.2f}"
+            )
+    return regressions
+
+
+def plot_scaling(results, path, baseline=None):
+    """Log-log per-call time against population size, one line per benchmark."""
+    # A bare Figure renders headless without switching pyplot's backend
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    for name, bench in results["benchmarks"].items():
+        sizes = [p["population"] for p in bench["points"]]
+        times = [p["seconds_per_call"] for p in bench["points"]]
+        (line,) = ax.loglog(
+            sizes,
+            times,
+            marker="o",
+            label=f"{name} (slope {bench['scaling_exponent']:.2f})",
+        )
+        if baseline and name in baseline["benchmarks"]:
+            points = baseline["benchmarks"][name]["points"]
+            ax.loglog(
+                [p["population"] for p in points],
+                [p["seconds_per_call"] for p in points],
+                linestyle="--",
+                color=line.get_color(),
+                alpha=0.5,
+            )
+    ax.set_xlabel("Population size")
+    ax.set_ylabel("Seconds per call")
+    title = "Voting hot-path scaling"
+    if baseline:
+        title += " (dashed: baseline)"
+    ax.set_title(title)
+    ax.grid(True, which="both", alpha=0.3)
+    ax.legend(fontsize="small")
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - hot-path benchmarks and scaling curves"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(float(v)) for v in s.split(",")],
+        default=DEFAULT_SIZES,
+        help="Comma-separated population sizes (default: 1e3,1e4,1e5,1e6)",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        choices=list(BENCHMARKS),
+        help="Run only this benchmark (repeatable)",
+    )
+    parser.add_argument("--round1-users", type=int, default=5)
+    parser.add_argument("--round2-users", type=int, default=5)
+    parser.add_argument("--round1-split", type=int, default=70)
+    parser.add_argument("--k-factor", type=int, default=32)
+    parser.add_argument("--posts-per-user", type=int, default=2)
+    parser.add_argument("--elo-posting-scale", type=int, default=100)
+    parser.add_argument(
+        "--simulation-max",
+        type=int,
+        default=100_000,
+        help="Largest population for the full run_simulation benchmark (default: 100000)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per point (best is kept)")
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="Minimum seconds per measurement (default: 0.2)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output",
+        default="bench_results.json",
+        help="Results file (default: bench_results.json)",
+    )
+    parser.add_argument("--plot", default="bench_scaling.png", help="Scaling plot (default: bench_scaling.png)")
+    parser.add_argument("--baseline", default=None, help="Baseline results file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown against the baseline (default: 0.25)",
+    )
+    parser.add_argument(
+        "--exponent-tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed growth of a scaling exponent against the baseline (default: 0.2)",
+    )
+    args = parser.parse_args()
+
+    params = {
+        "round1_users": args.round1_users,
+        "round2_users": args.round2_users,
+        "round1_split": args.round1_split,
+        "k_factor": args.k_factor,
+        "posts_per_user": args.posts_per_user,
+        "elo_posting_scale": args.elo_posting_scale,
+    }
+    results = run_benchmarks(
+        args.only or list(BENCHMARKS),
+        sorted(args.sizes),
+        params,
+        repeat=args.repeat,
+        min_time=args.min_time,
+        seed=args.seed,
+        simulation_max=args.simulation_max,
+    )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.plot:
+        plot_scaling(results, args.plot, baseline)
+        print(f"Scaling plot written to {args.plot}")
+
+    print("\nScaling exponents (1.0 = linear in population size):")
+    for name, bench in results["benchmarks"].items():
+        print(f"  {name:<28} {bench['scaling_exponent']:.2f}")
+
+    if baseline:
+        print(f"\nComparison with {args.baseline}:")
+        regressions = compare(results, baseline, args.tolerance, args.exponent_tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from simulation import simulate, simulate_growth
+
+# Modules whose code determines the result of a run
+CODE_MODULES = (
+    "simulation.py",
+    "population.py",
+    "metrics.py",
+    "posting_sampler.py",
+    "rank_index.py",
+)
+
+# Arguments of `simulate` that make a run uncacheable when set
+HOOKS = (
+    "audit_log",
+    "profiler",
+    "ip_model",
+    "convergence",
+    "behaviour",
+    "baseline",
+    "analytic",
+    "churn",
+    "checkpoint_dir",
+    "resume",
+)
+
+# Arguments of `simulate` and the growth loop that do not change the result
+UNKEYED = ("progress", "checkpoint_interval", "checkpointer")
+
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def code_version():
+    """
+    Hash of the simulation's source code and of the numpy version (which
+    fixes the random streams), so edits to the model invalidate the cache.
+    """
+    digest = hashlib.sha256(np.__version__.encode())
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in CODE_MODULES:
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(name.encode() + b"\0" + f.read())
+    return digest.hexdigest()
+
+
+def _plain(value):
+    """NumPy scalars as the Python numbers they hold."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def run_parameters(params):
+    """
+    Every parameter of the growth loop with defaults filled in and values as
+    plain Python numbers, so runs that spell the same parameters differently
+    (explicit defaults, 5 vs 5.0, NumPy scalars) describe the same run.
+    Hooks and output-only arguments are left out.
+    """
+    signature = inspect.signature(simulate_growth)
+    bound = signature.bind_partial(
+        **{name: value for name, value in params.items() if name not in UNKEYED + HOOKS}
+    )
+    bound.apply_defaults()
+    normalised = {}
+    for name, value in bound.arguments.items():
+        if name in UNKEYED or name in HOOKS:
+            continue
+        value = _plain(value)
+        default = signature.parameters[name].default
+        if isinstance(default, float) and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        normalised[name] = value
+    return normalised
+
+
+def _hooked(value):
+    # A disabled profiler (`profiler.NULL_PROFILER`) is as good as none
+    return bool(value) and getattr(value, "enabled", True)
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of simulation results.
+
+    An entry is keyed by a hash of the backend, the seed, every simulation
+    parameter (defaults included, see `run_parameters`) and `code_version()`,
+    so the CLI, sweeps and library calls share entries. It holds what the
+    summary, the report and `plot_distributions` need: the final goodness and
+    ELO arrays and the run's `StreamingMetrics`. Only seeded runs without
+    hooks are cached, the others are not reproducible from their parameters
+    alone.
+
+    Entries are single pickle files written to a temporary name and moved
+    into place with `os.replace`, so parallel processes sharing a directory
+    only ever see complete entries; a hit refreshes the file's modification
+    time, and once the directory outgrows `max_bytes` the least recently used
+    entries are deleted. Concurrent evictions at worst delete an entry twice,
+    and an entry removed under a reader is simply a miss.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._version = code_version()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, backend, seed, params):
+        """Hex digest identifying a run."""
+        description = {
+            "backend": backend,
+            "seed": _plain(seed),
+            "params": run_parameters(params),
+            "code": self._version,
+        }
+        return hashlib.sha256(
+            json.dumps(description, sort_keys=True).encode()
+        ).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        """
+        Returns:
+            Run dictionary (with `users` set to None), or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Unreadable entry, e.g. from a different version of the classes
+            self._remove(path)
+            return None
+        return {"users": None, **entry}
+
+    def put(self, key, run):
+        """Store the cacheable part of `run` and evict if over budget."""
+        entry = {
+            "user_goodness": np.asarray(run["user_goodness"]),
+            "user_elos": np.asarray(run["user_elos"]),
+            "metrics": run["metrics"],
+        }
+        fd, staging = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(staging, self._path(key))
+        except BaseException:
+            self._remove(staging)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits `max_bytes`."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".pkl"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def simulate(self, backend="objects", seed=None, **params):
+        """
+        `simulation.simulate`, served from the cache when possible.
+
+        Returns:
+            Run dictionary; `run["cached"]` tells whether it came from disk
+        """
+        seed = _plain(seed)
+        if seed is None or any(_hooked(params.get(name)) for name in HOOKS):
+            return {**simulate(backend=backend, seed=seed, **params), "cached": False}
+        key = self.key(backend, seed, params)
+        run = self.get(key)
+        if run is not None:
+            self.hits += 1
+            return {**run, "cached": True}
+        self.misses += 1
+        run = simulate(backend=backend, seed=seed, **params)
+        self.put(key, run)
+        return {**run, "cached": False}
@@ -0,0 +1,115 @@
+import os
+import pickle
+import random
+import shutil
+import time
+
+import numpy as np
+
+
+def capture_rng():
+    """State of both random generators the simulation draws from."""
+    return {"random": random.getstate(), "numpy": np.random.get_state()}
+
+
+def restore_rng(state):
+    random.setstate(state["random"])
+    np.random.set_state(state["numpy"])
+
+
+def save_checkpoint(directory, arrays, state):
+    """
+    Write a checkpoint: each array as a memory-mapped `.npy` file plus a
+    pickle of the small loop state.
+
+    The checkpoint is assembled next to `directory` and swapped in with
+    renames, so a crash while saving leaves the previous checkpoint intact.
+    """
+    staging = directory + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, values in arrays.items():
+        mapped = np.lib.format.open_memmap(
+            os.path.join(staging, f"{name}.npy"),
+            mode="w+",
+            dtype=values.dtype,
+            shape=values.shape,
+        )
+        mapped[:] = values
+        mapped.flush()
+        del mapped
+    with open(os.path.join(staging, "state.pkl"), "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    previous = directory + ".old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(directory):
+        os.rename(directory, previous)
+    os.rename(staging, directory)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def load_checkpoint(directory):
+    """
+    Returns:
+        ({name: read-only memory-mapped array}, loop state)
+    """
+    if not os.path.exists(os.path.join(directory, "state.pkl")):
+        # A crash between the two renames of `save_checkpoint`
+        if os.path.exists(directory + ".old"):
+            directory = directory + ".old"
+        else:
+            raise FileNotFoundError(f"No checkpoint found in {directory}")
+    arrays = {}
+    for filename in os.listdir(directory):
+        if filename.endswith(".npy"):
+            arrays[filename[:-4]] = np.load(
+                os.path.join(directory, filename), mmap_mode="r"
+            )
+    with open(os.path.join(directory, "state.pkl"), "rb") as f:
+        state = pickle.load(f)
+    return arrays, state
+
+
+class Checkpointer:
+    """
+    Periodic checkpoints of a growth loop.
+
+    The loop asks `due()` at the end of every growth step and calls `save()`
+    when it returns True; both are cheap enough to run every step. Checkpoints
+    never touch the random generators, so taking them does not change results.
+    """
+
+    def __init__(self, directory, interval=300, params=None):
+        self.directory = directory
+        self.interval = interval
+        self.params = params or {}
+        self._last = time.monotonic()
+
+    def due(self):
+        return time.monotonic() - self._last >= self.interval
+
+    def save(self, arrays, state):
+        state = {**state, "params": self.params, "rng": capture_rng()}
+        save_checkpoint(self.directory, arrays, state)
+        self._last = time.monotonic()
+
+    def load(self):
+        """
+        Load the last checkpoint and restore the random generators.
+
+        Raises:
+            ValueError: If the checkpoint was written with other parameters
+        """
+        arrays, state = load_checkpoint(self.directory)
+        if state["params"] != self.params:
+            changed = sorted(
+                name
+                for name in set(state["params"]) | set(self.params)
+                if state["params"].get(name) != self.params.get(name)
+            )
+            raise ValueError(
+                f"Checkpoint in {self.directory} was written with different parameters: {', '.join(changed)}"
+            )
+        restore_rng(state["rng"])
+        return arrays, state
@@ -0,0 +1,334 @@
+import argparse
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from simulation import simulate, summarize_run
+
+# Reasons for leaving
+RANDOM, RATING, INACTIVE = "random", "rating", "inactive"
+
+
+class ChurnModel:
+    """
+    Departures from the community during the growth loop.
+
+    At the start of every growth step, before new users join, active users
+    leave for three reasons:
+
+    - random: each user with probability `random_rate`
+    - rating: with probability `rating_rate * q ** rating_power` on average,
+      q being the user's rating percentile (0 lowest, 1 highest), so the
+      best-rated reviewers are the likeliest to go
+    - inactivity: users who have not voted, posted or joined in the last
+      `inactive_posts` posts
+
+    Departures cost O(departures log N) rather than a pass over the
+    population: counts are binomial, random leavers are drawn by id,
+    rating-dependent ones by rank from the loop's `RankIndex`, and activity
+    is kept in least-recently-active order. The growth loop then
+    swap-removes every leaver from the population and from all id-keyed
+    structures (`user_removed`), so ids stay dense and memory follows the
+    active population.
+
+    The team ELO update is zero-sum, so the ratings of the active users plus
+    the ratings taken away by departures always add up to the starting
+    ratings of everyone who joined; `ledger_imbalance` checks this.
+
+    Pass the model as `churn` to `simulate(backend="arrays", ...)`. With
+    churn, `max_population` bounds how many users ever join.
+    """
+
+    def __init__(self, random_rate=0.0, rating_rate=0.0, rating_power=1.0, inactive_posts=None, seed=0):
+        self.random_rate = random_rate
+        self.rating_rate = rating_rate
+        self.rating_power = rating_power
+        self.inactive_posts = inactive_posts
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.joined = 0
+        self.departed = 0
+        self.joined_elo = 0.0
+        self.departed_elo = 0.0
+        self.by_reason = {RANDOM: 0, RATING: 0, INACTIVE: 0}
+        self.round2_departures = 0
+        # Users keep a serial number for life while their id can change
+        self._serial = []  # id -> serial
+        self._id_of = {}  # serial -> id
+        self._activity = OrderedDict()  # serial -> last active post, least recent first
+
+    def config(self):
+        """Constructor arguments, e.g. to validate a checkpoint."""
+        return {
+            name: getattr(self, name)
+            for name in ("random_rate", "rating_rate", "rating_power", "inactive_posts", "seed")
+        }
+
+    def add_users(self, ids, elos, now):
+        """Register users joining before post `now`; ids must continue the sequence."""
+        for user_id in ids.tolist():
+            serial = self.joined
+            self.joined += 1
+            self._serial.append(serial)
+            self._id_of[serial] = user_id
+            self._activity[serial] = now
+        self.joined_elo += float(np.sum(elos))
+
+    def record_post(self, now, creator, *panels):
+        """Mark the creator and the panels of post `now` as active."""
+        if self.inactive_posts is None:
+            return
+        activity, serial = self._activity, self._serial
+        for user_id in (creator, *(user_id for panel in panels for user_id in panel.tolist())):
+            activity[serial[user_id]] = now
+            activity.move_to_end(serial[user_id])
+
+    def departures(self, population, rank_index, now, round1_split=70):
+        """
+        Draw the users leaving before post `now` and account for them.
+
+        Returns:
+            Their ids in descending order, the order in which swap-removal
+            leaves the remaining ids valid
+        """
+        N = len(population)
+        leaving = {}
+        if self.random_rate:
+            count = self.rng.binomial(N, min(self.random_rate, 1.0))
+            for user_id in self.rng.choice(N, size=count, replace=False).tolist():
+                leaving.setdefault(user_id, RANDOM)
+        if self.rating_rate:
+            # Percentiles with density (power + 1) q^power
+            exponent = self.rating_power + 1
+            count = self.rng.binomial(N, min(self.rating_rate / exponent, 1.0))
+            ranks = np.minimum((N * self.rng.random(count) ** (1 / exponent)).astype(np.int64), N - 1)
+            for rank in ranks.tolist():
+                leaving.setdefault(rank_index.select(rank), RATING)
+        if self.inactive_posts is not None:
+            for serial, last_active in self._activity.items():
+                if now - last_active < self.inactive_posts:
+                    break
+                leaving.setdefault(self._id_of[serial], INACTIVE)
+
+        cut = int(round1_split / 100.0 * N)
+        for user_id, reason in leaving.items():
+            elo = float(population.elo[user_id])
+            self.departed_elo += elo
+            self.by_reason[reason] += 1
+            self.round2_departures += rank_index.count_below(elo, user_id) >= cut
+        self.departed += len(leaving)
+        return sorted(leaving, reverse=True)
+
+    def user_removed(self, user_id, moved_from):
+        """Drop `user_id`; the user with id `moved_from` (the last) takes it over."""
+        serial = self._serial[user_id]
+        del self._activity[serial]
+        del self._id_of[serial]
+        if moved_from != user_id:
+            moved = self._serial[moved_from]
+            self._serial[user_id] = moved
+            self._id_of[moved] = user_id
+        self._serial.pop()
+
+    def ledger_imbalance(self, population):
+        """
+        Active ratings plus departed ratings minus joined ratings; zero up
+        to rounding while every rating update is zero-sum.
+        """
+        return math.fsum(population.elo.tolist()) + self.departed_elo - self.joined_elo
+
+    def consistency_errors(self, population, rank_index, posting_sampler):
+        """
+        Check that swap-removal left the id-keyed structures in step with
+        the population: the rating ledger balances, and the rank index, the
+        posting sampler and the model itself hold exactly the active users
+        under their current ids.
+
+        Returns:
+            List of messages, empty when everything is consistent
+        """
+        errors = []
+        N = len(population)
+        imbalance = self.ledger_imbalance(population)
+        if abs(imbalance) > 1e-9 * max(self.joined_elo, 1.0):
+            errors.append(f"rating ledger is off by {imbalance:.3g}")
+        if len(rank_index) != N:
+            errors.append(f"rank index holds {len(rank_index)} users, population {N}")
+        else:
+            stale = sum(
+                user_id not in rank_index or rank_index.elo_of(user_id) != elo
+                for user_id, elo in enumerate(population.elo.tolist())
+            )
+            if stale:
+                errors.append(f"rank index has a different rating for {stale} users")
+        if len(posting_sampler) != N:
+            errors.append(f"posting sampler holds {len(posting_sampler)} users, population {N}")
+        elif N and not np.array_equal(posting_sampler.ratings(), population.elo):
+            errors.append("posting sampler has stale ratings")
+        if len(self._serial) != N or len(self._id_of) != N or len(self._activity) != N:
+            errors.append(f"churn model tracks {len(self._serial)} users, population {N}")
+        return errors
+
+    def print_report(self, population):
+        if not self.joined:
+            return
+        print(f"\nChurn ({self.joined} joined, {len(population)} active, {self.departed} departed):")
+        for reason, count in self.by_reason.items():
+            if count:
+                print(f"  {reason.capitalize()} departures: {count}")
+        if self.departed:
+            print(
+                f"  From the Round 2 tier: {self.round2_departures} "
+                f"({100 * self.round2_departures / self.departed:.1f}%)"
+            )
+            print(f"  Mean rating at departure: {self.departed_elo / self.departed:.1f}")
+        print(f"  Rating ledger imbalance: {self.ledger_imbalance(population):.2e}")
+
+
+# Scenarios of `regression_check`: churn settings and the hooks riding along
+CHECK_SCENARIOS = [
+    {"random_rate": 0.01},
+    {"rating_rate": 0.05, "rating_power": 4.0},
+    {"inactive_posts": 300},
+    {"random_rate": 0.005, "rating_rate": 0.02, "inactive_posts": 500, "hooks": True},
+]
+
+
+def regression_check(max_population=3000, seeds=(0, 1)):
+    """
+    Run the arrays backend with churn and check every structure that
+    swap-removal re-keys. The growth loop already checks the ledger,
+    the rank index and the posting sampler at the end of a churn run; this
+    adds the behaviour model, the tier trackers of the convergence snapshots
+    and the analytic moment sums, against values recomputed from scratch.
+
+    Returns:
+        List of failure messages, empty when every run is consistent
+    """
+    from analytic import AnalyticAccuracy, correct_vote_probability, power_moments
+    from behaviour import VoterBehaviour
+    from convergence import ConvergenceTracker
+    from rank_index import RankIndex
+
+    failures = []
+    for seed in seeds:
+        for scenario in CHECK_SCENARIOS:
+            settings = {name: value for name, value in scenario.items() if name != "hooks"}
+            hooks = {}
+            if scenario.get("hooks"):
+                hooks = {
+                    "behaviour": VoterBehaviour(bot_fraction=0.05, ring_fraction=0.05, seed=seed),
+                    "convergence": ConvergenceTracker(200),
+                    "analytic": AnalyticAccuracy(),
+                }
+            name = f"seed {seed}, {settings}{' with hooks' if hooks else ''}"
+            try:
+                run = simulate(
+                    backend="arrays",
+                    seed=seed,
+                    max_population=max_population,
+                    growth_rate=0.05,
+                    churn=ChurnModel(seed=seed, **settings),
+                    progress=False,
+                    **hooks,
+                )
+            except RuntimeError as error:
+                failures.append(f"{name}: {error}")
+                continue
+            population = run["users"]
+            N = len(population)
+            if not run["churn"].departed:
+                failures.append(f"{name}: nobody left")
+            if not hooks:
+                continue
+
+            if run["behaviour"].size != N:
+                failures.append(f"{name}: behaviour model holds {run['behaviour'].size} users")
+            # Everything below compares against a freshly built index
+            index = RankIndex.from_ratings(enumerate(population.elo.tolist()))
+            keys = sorted((elo, user_id) for user_id, elo in enumerate(population.elo.tolist()))
+            convergence = run["convergence"]
+            for tier_name, tier in convergence.tiers.items():
+                tier.update(index, convergence._dirty)
+                expected = bytearray(N)
+                for _, user_id in keys[int(tier.fraction * N):]:
+                    expected[user_id] = 1
+                if tier.member != expected:
+                    failures.append(f"{name}: {tier_name} tier membership is out of step")
+            analytic = run["analytic"]
+            analytic.record_post(population, index, 0.5)
+            moments = power_moments(
+                correct_vote_probability(population.goodness, population.mood_factor),
+                analytic.panel_size,
+            )
+            members = np.frombuffer(analytic._tier.member, dtype=np.uint8).astype(bool)
+            if analytic.size != N or not np.allclose(analytic._total, moments.sum(axis=0)):
+                failures.append(f"{name}: analytic moment totals are out of step")
+            elif not np.allclose(analytic._upper, moments[members].sum(axis=0)):
+                failures.append(f"{name}: analytic Round 2 moments are out of step")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - Round 2 tier under user churn"
+    )
+    parser.add_argument("--max-population", type=int, default=5000, help="Users who ever join")
+    parser.add_argument("--random-rate", type=float, default=0.002)
+    parser.add_argument("--rating-rate", type=float, default=0.01)
+    parser.add_argument("--rating-power", type=float, default=4.0)
+    parser.add_argument("--inactive-posts", type=int, default=None)
+    parser.add_argument("--convergence-interval", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Instead, run the swap-removal regression check and exit non-zero on failure",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        failures = regression_check()
+        for failure in failures:
+            print(f"FAIL {failure}")
+        print(f"Churn regression check: {'failed' if failures else 'passed'}")
+        raise SystemExit(1 if failures else 0)
+
+    from convergence import ConvergenceTracker
+
+    scenarios = {
+        "no churn": None,
+        "churn": ChurnModel(
+            random_rate=args.random_rate,
+            rating_rate=args.rating_rate,
+            rating_power=args.rating_power,
+            inactive_posts=args.inactive_posts,
+            seed=args.seed,
+        ),
+    }
+    for name, churn in scenarios.items():
+        convergence = ConvergenceTracker(args.convergence_interval)
+        run = simulate(
+            backend="arrays",
+            seed=args.seed,
+            max_population=args.max_population,
+            churn=churn,
+            convergence=convergence,
+        )
+        summary = summarize_run(run)
+        population = run["users"]
+        print(f"\n{name.capitalize()}:")
+        print(f"  Active users: {len(population)}")
+        print(f"  Correct votes: {summary['accuracy']:.2f}%")
+        if convergence.rows:
+            last = convergence.rows[-1]
+            print(f"  Round 2 cutoff: {last['round2_cutoff']:.1f}, editor cutoff: {last['editors_cutoff']:.1f}")
+            churn_rate = convergence.series()["round2_churn"]
+            print(f"  Round 2 tier turnover per snapshot (ratings only): {churn_rate.mean():.4f}")
+        if churn is not None:
+            churn.print_report(population)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+import scipy.stats as st
+from tqdm import tqdm
+
+from population import Population, mood_adjusted_goodness, panel_support
+from rank_index import RankIndex
+from simulation import elo_update_team
+
+
+def exposure_weight(comparisons):
+    """Pair-selection weight of a comment that has been compared `comparisons` times."""
+    return 1.0 / (1 + comparisons)
+
+
+class PairIndex:
+    """
+    Pair selector for one thread level.
+
+    Comments are bucketed by how often they have been compared, and each
+    bucket is a `RankIndex` sorted by rating. A Fenwick tree over the bucket
+    weights (bucket size times `exposure_weight`) picks a bucket in
+    O(log C) for C distinct comparison counts, and a rank lookup inside it
+    picks the comment in O(log n), so the least-compared comments are
+    favoured without scanning the thread. Partners come from the anchor's
+    rating window, counted with two `count_below` queries per bucket tried.
+    """
+
+    def __init__(self):
+        self._buckets = []  # comparison count -> RankIndex of comments
+        self._comparisons = {}
+        self._weights = [0.0]  # Fenwick tree over bucket weights
+        self.ratings = RankIndex()
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def rating_of(self, comment_id):
+        return self.ratings.elo_of(comment_id)
+
+    def comparisons_of(self, comment_id):
+        return self._comparisons[comment_id]
+
+    def _bucket(self, count):
+        while count >= len(self._buckets):
+            self._buckets.append(RankIndex())
+        if len(self._buckets) >= len(self._weights):
+            self._rebuild_weights()
+        return self._buckets[count]
+
+    def _rebuild_weights(self):
+        size = 2 * len(self._buckets) + 1
+        tree = [0.0] * size
+        for count, bucket in enumerate(self._buckets):
+            tree[count + 1] = len(bucket) * exposure_weight(count)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        self._weights = tree
+
+    def _add_weight(self, count, delta):
+        i = count + 1
+        while i < len(self._weights):
+            self._weights[i] += delta
+            i += i & -i
+
+    def _draw_count(self):
+        """Comparison count drawn with probability proportional to its bucket weight."""
+        tree = self._weights
+        target = random.random() * sum(tree[i] for i in self._fenwick_roots())
+        pos = 0
+        bit = 1 << (len(tree) - 1).bit_length()
+        while bit:
+            nxt = pos + bit
+            if nxt < len(tree) and tree[nxt] <= target:
+                pos = nxt
+                target -= tree[nxt]
+            bit >>= 1
+        if pos < len(self._buckets) and len(self._buckets[pos]):
+            return pos
+        # Rounding landed on an emptied bucket; take the nearest non-empty one
+        for count in range(pos, len(self._buckets)):
+            if len(self._buckets[count]):
+                return count
+        for count in range(min(pos, len(self._buckets)) - 1, -1, -1):
+            if len(self._buckets[count]):
+                return count
+        raise IndexError("draw from an empty PairIndex")
+
+    def _fenwick_roots(self):
+        i = len(self._weights) - 1
+        while i > 0:
+            yield i
+            i -= i & -i
+
+    def add(self, comment_id, rating):
+        self._comparisons[comment_id] = 0
+        self._bucket(0).insert(comment_id, rating)
+        self._add_weight(0, exposure_weight(0))
+        self.ratings.insert(comment_id, rating)
+
+    def record(self, comment_id, rating):
+        """Move a comment to the next comparison count with its new rating."""
+        count = self._comparisons[comment_id]
+        self._buckets[count].remove(comment_id)
+        self._add_weight(count, -exposure_weight(count))
+        self._comparisons[comment_id] = count + 1
+        self._bucket(count + 1).insert(comment_id, rating)
+        self._add_weight(count + 1, exposure_weight(count + 1))
+        self.ratings.update(comment_id, rating)
+
+    def draw_anchor(self):
+        bucket = self._buckets[self._draw_count()]
+        return bucket.select(random.randrange(len(bucket)))
+
+    def _draw_in_window(self, index, low, high, exclude):
+        start = index.count_below(low)
+        stop = index.count_below(high, math.inf)
+        if exclude in index and low <= index.elo_of(exclude) <= high:
+            if stop - start < 2:
+                return None
+            while True:
+                candidate = index.select(random.randrange(start, stop))
+                if candidate != exclude:
+                    return candidate
+        if stop == start:
+            return None
+        return index.select(random.randrange(start, stop))
+
+    def draw_partner(self, anchor, window, attempts=8):
+        """
+        Partner for `anchor` within `window` rating points, drawn like the
+        anchor from the weighted buckets; after `attempts` buckets without a
+        candidate in the window it falls back to a uniform draw over the
+        window.
+
+        Returns:
+            (comment id or None if the window holds no other comment,
+             whether the fallback was used)
+        """
+        rating = self.rating_of(anchor)
+        low, high = rating - window, rating + window
+        for _ in range(attempts):
+            bucket = self._buckets[self._draw_count()]
+            partner = self._draw_in_window(bucket, low, high, anchor)
+            if partner is not None:
+                return partner, False
+        return self._draw_in_window(self.ratings, low, high, anchor), True
+
+
+def _participant_judgements(count):
+    """
+    Whether each of `count` fresh participants picks the better of two
+    comments: with their mood-adjusted goodness they recognise it, otherwise
+    they pick at random, as in `vote`.
+    """
+    participants = Population(count)
+    participants.add_users(count)
+    adjusted = mood_adjusted_goodness(participants.goodness, participants.mood_factor)
+    # "Supporting" a post of quality 1 is picking the better comment
+    return panel_support(adjusted, 1.0)
+
+
+def simulate_thread(
+    comments=10000,
+    comparisons=None,
+    members=None,
+    k_factor=32,
+    initial_rating=800,
+    rating_window=200,
+    check_every=None,
+    stability_target=0.8,
+    stable_checks=3,
+    seed=None,
+    progress=True,
+):
+    """
+    Rank one thread level by pairwise comparison (whitepaper Section 6).
+
+    Every comparison asks a participant who has not compared at this level
+    yet which of two comments should be seen by more people, then applies
+    `elo_update_team` with a team of one on each side. Comment quality is
+    hidden and uniform on [0, 1].
+
+    Args:
+        comparisons: Comparison budget (default: 50 per comment)
+        members: Community members who can be asked (default: one per
+            comparison); each compares at most once, so the run stops early
+            when they are used up
+        rating_window: Largest rating gap between the two comments of a pair
+        check_every: Comparisons between convergence checks (default: one
+            per comment, i.e. two comparisons per comment between checks)
+        stability_target / stable_checks: The order counts as stable once
+            the Kendall tau between consecutive checks has reached
+            `stability_target` at `stable_checks` checks in a row; unlike
+            the tau against hidden quality, a live platform could observe
+            this. With a fixed update factor ratings never stop moving, and
+            between checks one comment apart the tau levels off at about
+            0.85 for K=32 (higher for smaller K), so the target must stay
+            below that
+
+    Returns:
+        Dictionary with the convergence history and summary figures
+    """
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    comparisons = comparisons or 50 * comments
+    members = members or comparisons
+    check_every = check_every or comments
+
+    quality = np.random.uniform(size=comments)
+    index = PairIndex()
+    for comment_id in range(comments):
+        index.add(comment_id, float(initial_rating))
+    ratings = np.full(comments, float(initial_rating))
+
+    history = []
+    previous = ratings.copy()
+    converged_at = None
+    streak = 0
+    fallbacks = 0
+    skipped = 0
+    done = 0
+    judgements = np.empty(0, dtype=bool)
+    judged = 0  # comparisons covered by the judgement blocks drawn so far
+    selection_time = 0.0
+    budget = min(comparisons, members)
+
+    with tqdm(total=budget, desc="Comparing comments", disable=not progress) as pbar:
+        while done < budget:
+            if done == judged:
+                judgements = _participant_judgements(min(4096, budget - done))
+                judged += len(judgements)
+
+            start = time.perf_counter()
+            anchor = index.draw_anchor()
+            partner, fell_back = index.draw_partner(anchor, rating_window)
+            selection_time += time.perf_counter() - start
+            fallbacks += fell_back
+            if partner is None:
+                # Nothing comparable in the window; the participant is not asked
+                skipped += 1
+                if skipped > 10 * comments:
+                    break
+                continue
+
+            better, worse = (
+                (anchor, partner) if quality[anchor] >= quality[partner] else (partner, anchor)
+            )
+            winner, loser = (better, worse) if judgements[done - judged + len(judgements)] else (worse, better)
+            change_winner, change_loser = elo_update_team(
+                ratings[winner], ratings[loser], k=k_factor
+            )
+            ratings[winner] += change_winner
+            ratings[loser] += change_loser
+            index.record(winner, float(ratings[winner]))
+            index.record(loser, float(ratings[loser]))
+            done += 1
+            pbar.update(1)
+
+            if done % check_every == 0 or done == budget:
+                truth = st.kendalltau(ratings, quality).correlation
+                stability = st.kendalltau(ratings, previous).correlation
+                top = min(10, comments)
+                top_overlap = len(
+                    set(np.argsort(-ratings)[:top]) & set(np.argsort(-quality)[:top])
+                ) / top
+                history.append(
+                    {
+                        "comparisons": done,
+                        "per_comment": 2 * done / comments,
+                        "kendall_tau": float(truth),
+                        "stability": float(stability),
+                        "top10_overlap": top_overlap,
+                    }
+                )
+                streak = streak + 1 if stability >= stability_target else 0
+                if converged_at is None and streak >= stable_checks:
+                    converged_at = done
+                previous = ratings.copy()
+
+    def first_reaching(threshold):
+        for point in history:
+            if point["kendall_tau"] >= threshold:
+                return point["comparisons"]
+        return None
+
+    return {
+        "comments": comments,
+        "comparisons": done,
+        "participants_exhausted": done == members < comparisons,
+        "history": history,
+        "stability_target": stability_target,
+        "stable_checks": stable_checks,
+        "converged_at": converged_at,
+        "tau_when_stable": next(
+            (point["kendall_tau"] for point in history if point["comparisons"] == converged_at),
+            None,
+        ),
+        "tau_thresholds": {t: first_reaching(t) for t in (0.3, 0.4, 0.5, 0.6, 0.7, 0.9)},
+        "final_kendall_tau": history[-1]["kendall_tau"] if history else math.nan,
+        "fallback_rate": fallbacks / max(done + skipped, 1),
+        "selection_us": 1e6 * selection_time / max(done + skipped, 1),
+        "ratings": ratings,
+        "quality": quality,
+    }
+
+
+def print_report(run, rows=20):
+    comments = run["comments"]
+    print(f"\nPairwise comment ranking: {comments} comments, {run['comparisons']} comparisons")
+    if run["participants_exhausted"]:
+        print("  Stopped early: every member has compared once at this level")
+    print(f"  Final Kendall tau (rating vs. hidden quality): {run['final_kendall_tau']:.3f}")
+    for threshold, reached in run["tau_thresholds"].items():
+        if reached is None:
+            print(f"  tau >= {threshold}: not reached")
+        else:
+            print(
+                f"  tau >= {threshold}: after {reached} comparisons "
+                f"({2 * reached / comments:.1f} per comment)"
+            )
+    criterion = (
+        f"stability >= {run['stability_target']} at {run['stable_checks']} checks in a row"
+    )
+    if run["converged_at"] is None:
+        print(f"  Order did not stabilise within the budget ({criterion})")
+    else:
+        print(
+            f"  Order stable after {run['converged_at']} comparisons "
+            f"({2 * run['converged_at'] / comments:.1f} per comment; {criterion}), "
+            f"tau {run['tau_when_stable']:.3f}"
+        )
+    print(f"  Partner fallback rate: {100 * run['fallback_rate']:.2f}%")
+    print(f"  Pair selection: {run['selection_us']:.1f} us per pair")
+
+    print(f"\n  {'comparisons':>11} {'per comment':>11} {'tau':>7} {'stability':>9} {'top-10':>7}")
+    history = run["history"]
+    for point in history[:: max(1, len(history) // rows)]:
+        print(
+            f"  {point['comparisons']:>11} {point['per_comment']:>11.1f} "
+            f"{point['kendall_tau']:>7.3f} {point['stability']:>9.3f} "
+            f"{100 * point['top10_overlap']:>6.0f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - pairwise comment ranking"
+    )
+    parser.add_argument("--comments", type=int, default=10000)
+    parser.add_argument(
+        "--comparisons",
+        type=int,
+        default=None,
+        help="Comparison budget (default: 50 per comment)",
+    )
+    parser.add_argument(
+        "--members",
+        type=int,
+        default=None,
+        help="Members who can be asked once each (default: one per comparison)",
+    )
+    parser.add_argument("--k-factor", type=int, default=32)
+    parser.add_argument("--initial-rating", type=int, default=800)
+    parser.add_argument(
+        "--rating-window",
+        type=float,
+        default=200,
+        help="Largest rating gap within a pair (default: 200)",
+    )
+    parser.add_argument("--check-every", type=int, default=None)
+    parser.add_argument(
+        "--stability-target",
+        type=float,
+        default=0.8,
+        help="Kendall tau between consecutive checks at which the order counts as stable (default: 0.8)",
+    )
+    parser.add_argument(
+        "--stable-checks",
+        type=int,
+        default=3,
+        help="Consecutive checks that must reach the stability target (default: 3)",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    run = simulate_thread(
+        comments=args.comments,
+        comparisons=args.comparisons,
+        members=args.members,
+        k_factor=args.k_factor,
+        initial_rating=args.initial_rating,
+        rating_window=args.rating_window,
+        check_every=args.check_every,
+        stability_target=args.stability_target,
+        stable_checks=args.stable_checks,
+        seed=args.seed,
+    )
+    print_report(run)
+
+
+if __name__ == "__main__":
+    main()
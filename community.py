@@ -0,0 +1,478 @@
+import argparse
+import math
+import multiprocessing
+import random
+import time
+
+import numpy as np
+
+from population import Population, PostStore, multi_round_voting_panel
+from posting_sampler import PostingSampler
+from rank_index import RankIndex
+from simulation import progress_bar
+
+# One membership request, routed to the shard that owns the community
+JOIN_RECORD = np.dtype(
+    [
+        ("community", "<i8"),
+        ("user", "<i8"),
+        ("elo", "<f8"),
+        ("goodness", "<f8"),
+        ("mood_factor", "<f8"),
+    ]
+)
+
+
+def community_weights(communities, exponent=1.0):
+    """Zipf popularity of each community: weight of rank r is r**-exponent."""
+    weights = np.arange(1, communities + 1, dtype=np.float64) ** -exponent
+    return weights / weights.sum()
+
+
+def _seed_globals(seed, community_id, step):
+    """
+    Seed `random` and `numpy.random` for one community's work in one step, so
+    a community's votes do not depend on which shard runs it or what ran first.
+    """
+    state = np.random.SeedSequence([seed, community_id, step]).generate_state(2)
+    np.random.seed(state)
+    random.seed(int(state[0]))
+
+
+class Community:
+    """
+    One community's voting state: local ratings and traits of its members in
+    a `Population` (indexed by local member id), with its own rank index and
+    posting sampler, exactly as in the single-population growth loop.
+    """
+
+    def __init__(self, community_id, elo_posting_scale=100):
+        self.id = community_id
+        self.members = []  # local id -> global user id
+        self.population = Population(16)
+        self.rank_index = RankIndex()
+        self.posting_sampler = PostingSampler(elo_posting_scale)
+        self.posts = 0
+        self.correct = 0
+        self.supported = 0
+
+    def __len__(self):
+        return len(self.members)
+
+    def add_members(self, users, elo, goodness, mood_factor):
+        ids = self.population.append_users(elo, goodness, mood_factor)
+        self.members.extend(users.tolist())
+        for local_id, rating in zip(ids.tolist(), self.population.elo[ids].tolist()):
+            self.rank_index.insert(local_id, rating)
+        self.posting_sampler.add_users(ids, self.population.elo[ids])
+        return ids
+
+    def summary(self):
+        elo = self.population.elo
+        return {
+            "community": self.id,
+            "members": len(self),
+            "posts": self.posts,
+            "accuracy": 100 * self.correct / self.posts if self.posts else math.nan,
+            "supported_posts": self.supported,
+            "elo_min": float(elo.min()) if len(elo) else math.nan,
+            "elo_mean": float(elo.mean()) if len(elo) else math.nan,
+            "elo_max": float(elo.max()) if len(elo) else math.nan,
+        }
+
+
+class Shard:
+    """
+    The communities owned by one worker process.
+
+    Each step applies a batch of joins, runs the posts those joins bring
+    through every affected community's `multi_round_voting_panel` pipeline,
+    and reports back the lowest rating each touched user now holds in this
+    shard, from which the coordinator derives cross-community floors.
+    """
+
+    def __init__(self, params, seed):
+        self.params = params
+        self.seed = seed
+        self.communities = {}
+        self.memberships = {}  # global user id -> [(community, local id)]
+
+    def step(self, step, joins):
+        """
+        Args:
+            joins: `JOIN_RECORD` array for communities owned by this shard
+
+        Returns:
+            (touched user ids, their minimum rating in this shard,
+             posts judged, correct decisions, supported posts)
+        """
+        params = self.params
+        order = np.argsort(joins["community"], kind="stable")
+        joins = joins[order]
+        boundaries = np.flatnonzero(np.diff(joins["community"])) + 1
+        touched = set()
+        posts = correct = supported = 0
+        for batch in np.split(joins, boundaries):
+            if not len(batch):
+                continue
+            community_id = int(batch["community"][0])
+            community = self.communities.get(community_id)
+            if community is None:
+                community = self.communities[community_id] = Community(
+                    community_id, params["elo_posting_scale"]
+                )
+            ids = community.add_members(
+                batch["user"], batch["elo"], batch["goodness"], batch["mood_factor"]
+            )
+            for user, local_id in zip(batch["user"].tolist(), ids.tolist()):
+                self.memberships.setdefault(user, []).append((community_id, local_id))
+                touched.add(user)
+
+            _seed_globals(self.seed, community_id, step)
+            creators = community.posting_sampler.draw(params["posts_per_user"] * len(batch))
+            store = PostStore(len(creators))
+            store.add_posts(creators, community.population)
+            members = community.members
+            for quality in store.quality:
+                _, decision, _, round1_ids, round2_ids = multi_round_voting_panel(
+                    community.population,
+                    quality,
+                    params["round1_users"],
+                    params["round2_users"],
+                    params["k_factor"],
+                    params["round1_split"],
+                    rank_index=community.rank_index,
+                    rating_observers=(community.posting_sampler,),
+                    single_round_threshold=params["single_round_threshold"],
+                )
+                is_correct = (decision == "support") == (quality >= 0.5)
+                community.posts += 1
+                community.correct += is_correct
+                community.supported += decision == "support"
+                correct += is_correct
+                supported += decision == "support"
+                for local_id in round1_ids.tolist() + round2_ids.tolist():
+                    touched.add(members[local_id])
+            posts += len(store)
+
+        users = np.array(sorted(touched), dtype=np.int64)
+        minima = np.array(
+            [
+                min(
+                    self.communities[community_id].population.elo[local_id]
+                    for community_id, local_id in self.memberships[user]
+                )
+                for user in users.tolist()
+            ]
+        )
+        return users, minima, posts, correct, supported
+
+    def summaries(self):
+        return [community.summary() for community in self.communities.values()]
+
+
+def _shard_worker(conn, params, seed):
+    shard = Shard(params, seed)
+    while True:
+        message = conn.recv()
+        if message[0] == "step":
+            conn.send(shard.step(message[1], message[2]))
+        elif message[0] == "summaries":
+            conn.send(shard.summaries())
+        else:
+            break
+    conn.close()
+
+
+class _ProcessShard:
+    """Coordinator-side handle of a `Shard` running in its own process."""
+
+    def __init__(self, context, params, seed):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=_shard_worker, args=(child, params, seed), daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def send_step(self, step, joins):
+        self.conn.send(("step", step, joins))
+
+    def receive(self):
+        return self.conn.recv()
+
+    def summaries(self):
+        self.conn.send(("summaries",))
+        return self.conn.recv()
+
+    def close(self):
+        self.conn.send(("stop",))
+        self.process.join()
+
+
+class _LocalShard:
+    """Same interface as `_ProcessShard`, run in the coordinator process."""
+
+    def __init__(self, params, seed):
+        self.shard = Shard(params, seed)
+        self._result = None
+
+    def send_step(self, step, joins):
+        self._result = self.shard.step(step, joins)
+
+    def receive(self):
+        return self._result
+
+    def summaries(self):
+        return self.shard.summaries()
+
+    def close(self):
+        pass
+
+
+def simulate_communities(
+    communities=1000,
+    max_population=20000,
+    memberships_per_user=3.0,
+    join_rate=0.01,
+    zipf_exponent=1.0,
+    posts_per_user=2,
+    growth_rate=0.01,
+    round1_users=5,
+    round2_users=5,
+    elo_start=800,
+    k_factor=32,
+    round1_split=70,
+    elo_posting_scale=100,
+    single_round_threshold=20,
+    workers=0,
+    seed=0,
+    progress=True,
+):
+    """
+    Growth loop of a platform of many communities with local ratings.
+
+    Users arrive as in `run_simulation` and each joins about
+    `memberships_per_user` communities chosen by Zipf popularity; every step
+    a further `join_rate` share of existing users joins one more community.
+    Each membership has its own rating, changed only by voting inside that
+    community. The only cross-community effect is the whitepaper's downward
+    floor: a new membership starts at the lowest rating the user holds
+    anywhere, if that is below `elo_start`.
+
+    Communities are sharded across `workers` processes by id (0 runs one
+    shard in-process). Each step the coordinator sends every shard one batch
+    of joins and gets back one batch of per-user minimum ratings, so floors
+    reflect ratings as of the end of the previous step. Every community seeds
+    its own random stream per step, so results depend only on the seed, not
+    on the number of workers.
+
+    Returns:
+        Dictionary with per-community summaries and platform-wide totals
+    """
+    params = dict(
+        posts_per_user=posts_per_user,
+        round1_users=round1_users,
+        round2_users=round2_users,
+        k_factor=k_factor,
+        round1_split=round1_split,
+        elo_posting_scale=elo_posting_scale,
+        single_round_threshold=single_round_threshold,
+    )
+    rng = np.random.default_rng(seed)
+    popularity = community_weights(communities, zipf_exponent)
+    traits = Population()
+    joined = set()  # user * communities + community
+    shard_count = max(workers, 1)
+    shard_minima = [dict() for _ in range(shard_count)]
+    totals = dict(posts=0, correct=0, supported=0, joins=0, floored_joins=0, floor_depth=0.0)
+
+    if workers:
+        context = multiprocessing.get_context()
+        shards = [_ProcessShard(context, params, seed) for _ in range(shard_count)]
+    else:
+        shards = [_LocalShard(params, seed)]
+
+    def floor(user):
+        lowest = min(
+            (minima.get(user, math.inf) for minima in shard_minima), default=math.inf
+        )
+        return min(float(elo_start), lowest)
+
+    def plan_joins(users, chosen):
+        records = np.empty(len(users), dtype=JOIN_RECORD)
+        records["community"] = chosen
+        records["user"] = users
+        records["elo"] = [floor(user) for user in users.tolist()]
+        records["goodness"] = traits.goodness[users]
+        records["mood_factor"] = traits.mood_factor[users]
+        return records
+
+    start = time.perf_counter()
+    try:
+        with progress_bar(max_population, "Growing platform", progress) as pbar:
+            population_increment = 1.0
+            step = 0
+            while len(traits) < max_population:
+                new_count = min(int(population_increment), max_population - len(traits))
+                existing = len(traits)
+                new_users = traits.add_users(new_count, elo=elo_start, rng=rng)
+
+                users, chosen = [], []
+                for user in new_users.tolist():
+                    count = min(communities, 1 + int(rng.poisson(memberships_per_user - 1)))
+                    for community_id in rng.choice(
+                        communities, size=count, replace=False, p=popularity
+                    ).tolist():
+                        joined.add(user * communities + community_id)
+                        users.append(user)
+                        chosen.append(community_id)
+                for user in rng.integers(0, existing, size=rng.poisson(join_rate * existing)).tolist():
+                    community_id = int(rng.choice(communities, p=popularity))
+                    # Marked at once, so a pair drawn twice in one step joins once
+                    if user * communities + community_id not in joined:
+                        joined.add(user * communities + community_id)
+                        users.append(user)
+                        chosen.append(community_id)
+
+                joins = plan_joins(np.array(users, dtype=np.int64), np.array(chosen, dtype=np.int64))
+                totals["joins"] += len(joins)
+                below = joins["elo"] < elo_start
+                totals["floored_joins"] += int(below.sum())
+                totals["floor_depth"] += float((elo_start - joins["elo"][below]).sum())
+
+                owner = joins["community"] % shard_count
+                for i, shard in enumerate(shards):
+                    shard.send_step(step, joins[owner == i])
+                for i, shard in enumerate(shards):
+                    touched, minima, posts, correct, supported = shard.receive()
+                    shard_minima[i].update(zip(touched.tolist(), minima.tolist()))
+                    totals["posts"] += posts
+                    totals["correct"] += correct
+                    totals["supported"] += supported
+
+                pbar.update(new_count)
+                pbar.set_postfix(posts=totals["posts"])
+                population_increment *= 1 + growth_rate
+                step += 1
+
+        summaries = sorted(
+            (summary for shard in shards for summary in shard.summaries()),
+            key=lambda summary: summary["community"],
+        )
+    finally:
+        for shard in shards:
+            shard.close()
+
+    if totals["joins"] != len(joined):
+        raise RuntimeError(f"{totals['joins']} joins but {len(joined)} memberships")
+    members = sum(summary["members"] for summary in summaries)
+    if members != len(joined):
+        raise RuntimeError(f"{len(joined)} memberships but {members} community members")
+
+    return {
+        "communities": summaries,
+        "users": len(traits),
+        "memberships": len(joined),
+        "wall_time": time.perf_counter() - start,
+        **totals,
+    }
+
+
+def print_report(run, top=10):
+    summaries = run["communities"]
+    print("\nMulti-community simulation:")
+    print(f"  Users: {run['users']}")
+    print(f"  Communities with members: {len(summaries)}")
+    print(
+        f"  Memberships: {run['memberships']} "
+        f"({run['memberships'] / max(run['users'], 1):.2f} per user)"
+    )
+    print(f"  Posts judged: {run['posts']}")
+    if run["posts"]:
+        print(f"  Correct votes: {100 * run['correct'] / run['posts']:.2f}%")
+        print(f"  Supported posts: {run['supported']}")
+    if run["joins"]:
+        print(
+            f"  Joins floored below the starting rating: {run['floored_joins']} "
+            f"({100 * run['floored_joins'] / run['joins']:.2f}% of {run['joins']})"
+        )
+    if run["floored_joins"]:
+        print(f"  Average floor depth: {run['floor_depth'] / run['floored_joins']:.1f} ELO points")
+    print(f"  Wall time: {run['wall_time']:.2f}s")
+
+    largest = sorted(summaries, key=lambda summary: -summary["members"])[:top]
+    print(f"\n  {'community':>9} {'members':>8} {'posts':>7} {'accuracy':>9} {'ELO min':>8} {'ELO mean':>9} {'ELO max':>8}")
+    for summary in largest:
+        print(
+            f"  {summary['community']:>9} {summary['members']:>8} {summary['posts']:>7} "
+            f"{summary['accuracy']:>8.2f}% {summary['elo_min']:>8.1f} "
+            f"{summary['elo_mean']:>9.1f} {summary['elo_max']:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - many communities with local ratings"
+    )
+    parser.add_argument("--communities", type=int, default=1000)
+    parser.add_argument("--max-population", type=int, default=20000)
+    parser.add_argument(
+        "--memberships-per-user",
+        type=float,
+        default=3.0,
+        help="Average number of communities a new user joins (default: 3)",
+    )
+    parser.add_argument(
+        "--join-rate",
+        type=float,
+        default=0.01,
+        help="Share of existing users joining another community each step (default: 0.01)",
+    )
+    parser.add_argument(
+        "--zipf-exponent",
+        type=float,
+        default=1.0,
+        help="Skew of community popularity (default: 1.0)",
+    )
+    parser.add_argument("--posts-per-user", type=int, default=2)
+    parser.add_argument("--growth-rate", type=float, default=0.01)
+    parser.add_argument("--round1-users", type=int, default=5)
+    parser.add_argument("--round2-users", type=int, default=5)
+    parser.add_argument("--elo-start", type=int, default=800)
+    parser.add_argument("--k-factor", type=int, default=32)
+    parser.add_argument("--elo-posting-scale", type=int, default=100)
+    parser.add_argument("--round1-split", type=int, default=70)
+    parser.add_argument("--single-round-threshold", type=int, default=20)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help="Shard processes (0 = run in-process; default: number of CPUs)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    run = simulate_communities(
+        communities=args.communities,
+        max_population=args.max_population,
+        memberships_per_user=args.memberships_per_user,
+        join_rate=args.join_rate,
+        zipf_exponent=args.zipf_exponent,
+        posts_per_user=args.posts_per_user,
+        growth_rate=args.growth_rate,
+        round1_users=args.round1_users,
+        round2_users=args.round2_users,
+        elo_start=args.elo_start,
+        k_factor=args.k_factor,
+        round1_split=args.round1_split,
+        elo_posting_scale=args.elo_posting_scale,
+        single_round_threshold=args.single_round_threshold,
+        workers=args.workers,
+        seed=args.seed,
+    )
+    print_report(run)
+
+
+if __name__ == "__main__":
+    main()
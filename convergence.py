@@ -0,0 +1,214 @@
+import json
+
+import numpy as np
+
+from metrics import QuantileSketch
+
+POPULATION_QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+class TierTracker:
+    """
+    Membership of the users ranked at or above `fraction` of the population,
+    e.g. 0.70 for the Round 2 tier and 0.99 for editors.
+
+    Membership is kept per user and updated incrementally. A user's tier can
+    only have changed if their rating changed, if they are new, or if their
+    (elo, id) key lies between the previous and the current cutoff key, so
+    only those users are looked at. The ids whose membership flipped in the
+    last update, new members included, are kept in `changed`. Departures are
+    swap-removed with `user_removed` and are not counted as leaving the tier.
+    """
+
+    def __init__(self, fraction):
+        self.fraction = fraction
+        self.member = bytearray()
+        self.size = 0
+        self.cutoff = None  # (elo, id) key of the lowest member
+        self.changed = []
+        self._moved = set()  # ids taken over by another user since the last update
+        self._untracked = set()  # ... by a user that joined after the last update
+
+    def update(self, rank_index, dirty):
+        """
+        Bring membership up to date with `rank_index`.
+
+        Args:
+            dirty: Ids of users whose rating changed since the last update
+
+        Returns:
+            (users who entered, users who left) among users already tracked
+        """
+        N = len(rank_index)
+        cut = int(self.fraction * N)
+        if cut >= N:
+            cutoff = (float("inf"), 0)
+        else:
+            user_id = rank_index.select(cut)
+            cutoff = (rank_index.elo_of(user_id), user_id)
+
+        known = len(self.member)
+        candidates = set(dirty)
+        candidates.update(range(known, N))
+        candidates.update(self._moved)
+        self.member.extend(bytes(N - known))
+        if self.cutoff is not None and cutoff != self.cutoff:
+            low, high = sorted((self.cutoff, cutoff))
+            start = rank_index.count_below(*low)
+            stop = min(rank_index.count_below(*high), N)
+            candidates.update(rank_index.select(rank) for rank in range(start, stop))
+        self.cutoff = cutoff
+
+        entered = left = 0
+        self.changed = []
+        for user_id in candidates:
+            member = (rank_index.elo_of(user_id), user_id) >= cutoff
+            if member != self.member[user_id]:
+                if user_id < known and user_id not in self._untracked:
+                    entered += member
+                    left += not member
+                self.member[user_id] = member
+                self.changed.append(user_id)
+        self._moved.clear()
+        self._untracked.clear()
+        self.size = N - cut
+        return entered, left
+
+    def user_removed(self, user_id, moved_from):
+        """Drop `user_id`; the user with id `moved_from` (the last) takes it over."""
+        known = len(self.member)
+        untracked = moved_from >= known or moved_from in self._untracked
+        for ids in (self._moved, self._untracked):
+            ids.discard(user_id)
+            ids.discard(moved_from)
+        if moved_from < known:
+            self.member[user_id] = self.member[moved_from]
+            # Deleting from the end of a bytearray releases its memory once it
+            # is less than half full, so membership follows the active users
+            del self.member[moved_from]
+        elif user_id < known:
+            self.member[user_id] = 0
+        if user_id < len(self.member):
+            # Its (elo, id) key changed with the id
+            self._moved.add(user_id)
+            if untracked:
+                self._untracked.add(user_id)
+
+
+class ConvergenceTracker:
+    """
+    Periodic snapshots of the rating distribution during the growth loop.
+
+    Every `interval` posts it records exact population quantiles (from the
+    loop's `RankIndex`, O(log N) each), the ELO of the Round 2 and editor
+    cutoffs, quantiles of the creators of the posts since the previous
+    snapshot (a mergeable `QuantileSketch` per interval) and how many users
+    entered and left each tier. Registered as a rating observer, it only
+    remembers which users changed rating between snapshots, so a snapshot
+    costs O((changed users + cutoff movement) log N) rather than a sort.
+    """
+
+    def __init__(self, interval=1000, round1_split=70, editor_fraction=0.99):
+        self.interval = interval
+        self.tiers = {
+            "round2": TierTracker(round1_split / 100.0),
+            "editors": TierTracker(editor_fraction),
+        }
+        self._dirty = set()
+        self._creators = QuantileSketch()
+        self.creator_elo = QuantileSketch()
+        self.posts = 0
+        self.rows = []
+
+    def rating_changed(self, user_id, elo):
+        self._dirty.add(user_id)
+
+    def user_removed(self, user_id, moved_from):
+        # The tiers recheck whoever takes over `user_id`
+        self._dirty.discard(user_id)
+        self._dirty.discard(moved_from)
+        for tier in self.tiers.values():
+            tier.user_removed(user_id, moved_from)
+
+    def record_post(self, rank_index, creator_elo):
+        self.posts += 1
+        self._creators.update(creator_elo)
+        if self.posts % self.interval == 0:
+            self.snapshot(rank_index)
+
+    def snapshot(self, rank_index):
+        N = len(rank_index)
+        if not N:
+            return
+        row = {"posts": self.posts, "population": N}
+        for q in POPULATION_QUANTILES:
+            row[f"p{round(100 * q)}"] = rank_index.elo_of(rank_index.select(int(q * (N - 1))))
+        creators = self._creators
+        if creators.count:
+            c25, c50, c75 = creators.quantiles([0.25, 0.5, 0.75])
+            row.update(creator_p25=float(c25), creator_p50=float(c50), creator_p75=float(c75))
+            row["creator_gap"] = row["creator_p50"] - row["p50"]
+        for name, tier in self.tiers.items():
+            entered, left = tier.update(rank_index, self._dirty)
+            cutoff = tier.cutoff[0]
+            row[f"{name}_cutoff"] = cutoff if cutoff != float("inf") else None
+            row[f"{name}_entered"] = entered
+            row[f"{name}_left"] = left
+            row[f"{name}_churn"] = (entered + left) / (2 * tier.size) if tier.size else 0.0
+        self.creator_elo.merge(creators)
+        self._creators = QuantileSketch()
+        self._dirty.clear()
+        self.rows.append(row)
+
+    def series(self):
+        """Snapshots as {column: numpy array} (missing values are NaN)."""
+        columns = {}
+        for row in self.rows:
+            for name in row:
+                columns.setdefault(name, None)
+        return {
+            name: np.array(
+                [np.nan if row.get(name) is None else row[name] for row in self.rows],
+                dtype=float,
+            )
+            for name in columns
+        }
+
+    def stabilised_at(self, column, tolerance=2.0):
+        """
+        Post count from which `column` stays within `tolerance` of its final
+        value, or None before any snapshot.
+        """
+        series = self.series()
+        values = series.get(column)
+        if values is None or not len(values):
+            return None
+        off = np.flatnonzero(~(np.abs(values - values[-1]) <= tolerance))
+        first = off[-1] + 1 if len(off) else 0
+        return int(series["posts"][first])
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"interval": self.interval, "snapshots": self.rows}, f)
+
+    def print_report(self, tolerance=2.0):
+        if not self.rows:
+            return
+        last = self.rows[-1]
+        print(f"\nRating convergence ({len(self.rows)} snapshots every {self.interval} posts):")
+        for name, label in (("round2", "Round 2"), ("editors", "editor")):
+            cutoff = last[f"{name}_cutoff"]
+            if cutoff is None:
+                continue
+            print(
+                f"  {label} cutoff {cutoff:.1f}, within {tolerance:g} ELO of it "
+                f"since post {self.stabilised_at(f'{name}_cutoff', tolerance)}"
+            )
+        churn = self.series()["round2_churn"]
+        tail = churn[-max(1, len(churn) // 10):]
+        print(
+            f"  Round 2 churn per snapshot: first {churn[0]:.4f}, "
+            f"last 10% mean {tail.mean():.4f}"
+        )
+        if "creator_gap" in last:
+            print(f"  Creator - population median ELO: {last['creator_gap']:+.1f}")
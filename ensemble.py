@@ -0,0 +1,228 @@
+import argparse
+import csv
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from metrics import RunningStats
+from sweep import METRICS, execute_run, parse_values
+
+
+# Default confidence-interval half-width per metric, in the metric's own
+# unit or, with a "%" suffix, relative to its running mean. The supported
+# post count grows with the population, so it gets a relative width.
+DEFAULT_TOLERANCES = {
+    "accuracy": "0.5",
+    "supported_posts": "5%",
+    "elo_bias": "2",
+    "elo_q1": "1",
+    "elo_q2": "1",
+    "elo_q3": "1",
+}
+
+
+def parse_tolerance(spec):
+    """
+    Parse a tolerance: a half-width such as 0.5 or "0.5", or a percentage
+    of the running mean such as "5%".
+
+    Returns:
+        (width, relative), with `width` a fraction of the mean when relative
+    """
+    spec = str(spec).strip()
+    if spec.endswith("%"):
+        return float(spec[:-1]) / 100, True
+    return float(spec), False
+
+
+def tolerance_met(stats, tolerance, confidence=0.95):
+    """Whether the confidence interval of `stats` is within `tolerance`."""
+    width, relative = parse_tolerance(tolerance)
+    if relative:
+        width *= abs(stats.mean)
+    return stats.half_width(confidence) <= width
+
+
+def replica_seed(seed, replica):
+    """Seed of replica `replica`; matches run `replica` of `sweep.plan_runs`."""
+    return int(
+        np.random.SeedSequence(seed, spawn_key=(replica,)).generate_state(1)[0]
+    )
+
+
+def run_ensemble(
+    base_params,
+    tolerances,
+    confidence=0.95,
+    min_replicas=3,
+    max_replicas=100,
+    seed=0,
+    workers=None,
+    backend="objects",
+    output=None,
+    cache_dir=None,
+):
+    """
+    Run seeded replicas until every metric's confidence interval is narrower
+    than its tolerance, or the replica budget runs out.
+
+    Replicas execute in parallel, but their results are folded into the
+    running statistics in replica order, so the stopping point and the
+    reported numbers depend only on the seed, not on scheduling.
+
+    Args:
+        tolerances: {metric: tolerance} for the metrics to converge, each a
+            maximum half-width or a percentage of the mean (see
+            `parse_tolerance`); `DEFAULT_TOLERANCES` covers every metric
+        min_replicas: Replicas to run before the stopping rule is checked
+        cache_dir: Result cache to reuse replicas from (see `cache.py`)
+
+    Returns:
+        ({metric: RunningStats}, whether every tolerance was met)
+    """
+    workers = workers or os.cpu_count()
+    stats = {metric: RunningStats() for metric in METRICS}
+    writer = None
+    if output:
+        f = open(output, "w", newline="")
+        writer = csv.DictWriter(f, fieldnames=["run_id", "replica", "seed", *METRICS, "wall_time"])
+        writer.writeheader()
+
+    def converged():
+        return stats[METRICS[0]].count >= min_replicas and all(
+            tolerance_met(stats[metric], tolerance, confidence)
+            for metric, tolerance in tolerances.items()
+        )
+
+    pending = {}
+    finished = {}
+    next_replica = 0
+    folded = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while folded < max_replicas and not converged():
+                while next_replica < max_replicas and len(pending) < workers:
+                    run = {
+                        "run_id": next_replica,
+                        "replica": next_replica,
+                        "seed": replica_seed(seed, next_replica),
+                        "params": {},
+                    }
+                    pending[pool.submit(execute_run, run, base_params, backend, cache_dir)] = (
+                        next_replica
+                    )
+                    next_replica += 1
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished[pending.pop(future)] = future.result()
+
+                while folded in finished and not converged():
+                    row = finished.pop(folded)
+                    for metric in METRICS:
+                        stats[metric].update(row[metric])
+                    if writer:
+                        writer.writerow(row)
+                        f.flush()
+                    folded += 1
+                    intervals = " ".join(
+                        f"{metric}={stats[metric].mean:.2f}±{stats[metric].half_width(confidence):.2f}"
+                        for metric in tolerances
+                    )
+                    print(f"[replica {folded}] {intervals}")
+
+            for future in pending:
+                future.cancel()
+    finally:
+        if writer:
+            f.close()
+
+    return stats, converged()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - Monte Carlo ensemble with sequential stopping"
+    )
+    parser.add_argument(
+        "--tolerance",
+        action="append",
+        default=[],
+        metavar="METRIC=WIDTH",
+        help="Maximum confidence-interval half-width of a metric, absolute or as a "
+        "percentage of its mean (repeatable; defaults: "
+        # argparse %-formats help strings
+        + ", ".join(
+            f"{metric}={width}".replace("%", "%%")
+            for metric, width in DEFAULT_TOLERANCES.items()
+        )
+        + ")",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level of the intervals (default: 0.95)",
+    )
+    parser.add_argument("--min-replicas", type=int, default=3)
+    parser.add_argument(
+        "--max-replicas",
+        type=int,
+        default=100,
+        help="Replica budget (default: 100)",
+    )
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Simulation parameter for every replica (repeatable)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Ensemble seed (default: 0)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--backend", choices=["objects", "arrays"], default="objects")
+    parser.add_argument("--output", default=None, help="Optional CSV of replica results")
+    parser.add_argument("--cache", default=None, metavar="DIR", help="Result cache directory")
+    args = parser.parse_args()
+
+    tolerances = dict(DEFAULT_TOLERANCES)
+    for spec in args.tolerance:
+        metric, _, width = spec.partition("=")
+        if metric not in tolerances:
+            parser.error(f"unknown metric: {metric}")
+        try:
+            parse_tolerance(width)
+        except ValueError:
+            parser.error(f"invalid tolerance: {spec}")
+        tolerances[metric] = width
+    base_params = {name: values[0] for name, values in parse_values(args.set).items()}
+
+    stats, converged = run_ensemble(
+        base_params,
+        tolerances,
+        confidence=args.confidence,
+        min_replicas=args.min_replicas,
+        max_replicas=args.max_replicas,
+        seed=args.seed,
+        workers=args.workers,
+        backend=args.backend,
+        output=args.output,
+        cache_dir=args.cache,
+    )
+
+    replicas = stats[METRICS[0]].count
+    status = "converged" if converged else "replica budget exhausted"
+    print(f"\nEnsemble of {replicas} replicas ({status}):")
+    for metric in METRICS:
+        s = stats[metric]
+        print(
+            f"  {metric:<16} {s.mean:>10.2f} ± {s.half_width(args.confidence):.2f}"
+            f"  (sd {math.sqrt(s.variance) if replicas > 1 else 0:.2f}, "
+            f"tolerance {tolerances[metric]})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from population import Population, PostStore
+from metrics import StreamingMetrics
+from posting_sampler import PostingSampler
+from simulation import elo_update_team, progress_bar, simulate, summarize_run
+
+_FIELDS = (
+    ("elo", np.float64),
+    ("goodness", np.float64),
+    ("mood_factor", np.float64),
+    ("order", np.int64),
+)
+
+
+def _snapshot_views(buf, capacity):
+    views = {}
+    for i, (name, dtype) in enumerate(_FIELDS):
+        views[name] = np.ndarray(
+            (capacity,), dtype=dtype, buffer=buf, offset=i * capacity * 8
+        )
+    return views
+
+
+class RatingSnapshot:
+    """
+    Epoch-start ratings, voter traits and the ELO ordering held in one
+    `multiprocessing.shared_memory` block, so worker processes can draw and
+    vote panels without copying the population.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=len(_FIELDS) * capacity * 8
+        )
+        self.arrays = _snapshot_views(self.shm.buf, capacity)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, population):
+        n = len(population)
+        self.arrays["elo"][:n] = population.elo
+        self.arrays["goodness"][:n] = population.goodness
+        self.arrays["mood_factor"][:n] = population.mood_factor
+        self.arrays["order"][:n] = np.argsort(population.elo, kind="stable")
+
+    def close(self):
+        self.arrays = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Worker-side attachment to the current snapshot block
+_attached = {"name": None, "shm": None, "arrays": None}
+
+
+def _attach(name, capacity):
+    if _attached["name"] != name:
+        if _attached["shm"] is not None:
+            _attached["arrays"] = None
+            _attached["shm"].close()
+        shm = shared_memory.SharedMemory(name=name)
+        _attached.update(
+            name=name, shm=shm, arrays=_snapshot_views(shm.buf, capacity)
+        )
+    return _attached["arrays"]
+
+
+# Uniform draws per voter: one panel pick, then the mood, mood adjustment,
+# mood direction, informed and coin-flip draws of `mood_adjusted_goodness`
+# and `panel_support`
+_DRAWS_PER_VOTER = 6
+
+
+def _draw_panels(order, start, stop, uniforms):
+    """
+    One panel of distinct users from `order[start:stop]` per row of
+    `uniforms`, drawn without replacement: the j-th pick takes the
+    r-th of the users not picked yet, with r drawn from the j-th column.
+
+    Returns:
+        (rows, panel size) array of user ids
+    """
+    rows, size = uniforms.shape
+    n = stop - start
+    if n <= size:
+        return np.broadcast_to(order[start:stop], (rows, n))
+    picks = np.empty((rows, size), dtype=np.int64)
+    for j in range(size):
+        pick = (uniforms[:, j] * (n - j)).astype(np.int64)
+        for taken in np.sort(picks[:, :j], axis=1).T:
+            pick += taken <= pick
+        picks[:, j] = pick
+    return order[start + picks]
+
+
+def _vote_panels(ids, qualities, elo, goodness, mood_factor, uniforms, k_factor):
+    """
+    `mood_adjusted_goodness`, `panel_support` and `team_elo_deltas` for a
+    batch of panels of equal size, one per row of `ids`.
+
+    Args:
+        uniforms: (5, rows, panel size) uniform draws
+
+    Returns:
+        (support decisions, (rows, panel size) array of ELO deltas)
+    """
+    moody, adjustment, raise_mood, informed, coin_flip = uniforms
+    panel_goodness = goodness[ids]
+    adjusted = np.where(
+        raise_mood < 0.5,
+        np.minimum(1, panel_goodness * (1 + 0.25 * adjustment)),
+        np.maximum(0, panel_goodness * (1 - 0.25 * adjustment)),
+    )
+    adjusted = np.where(moody < mood_factor[ids], adjusted, panel_goodness)
+    support = np.where(
+        informed < adjusted, (qualities >= 0.5)[:, None], coin_flip < 0.5
+    )
+
+    size = ids.shape[1]
+    support_count = support.sum(axis=1)
+    oppose_count = size - support_count
+    supported = support_count > oppose_count
+    winners = support == supported[:, None]
+    winner_size = np.where(supported, support_count, oppose_count)
+    loser_size = size - winner_size
+    panel_elo = elo[ids]
+    winner_total = np.where(winners, panel_elo, 0).sum(axis=1)
+    loser_total = panel_elo.sum(axis=1) - winner_total
+    # Draws and unanimous panels leave ratings unchanged
+    contested = (support_count != oppose_count) & (winner_size > 0) & (loser_size > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_per_winner, change_per_loser = elo_update_team(
+            winner_total / winner_size,
+            loser_total / loser_size,
+            k=k_factor,
+            winner_size=winner_size,
+            loser_size=loser_size,
+        )
+    deltas = np.where(winners, change_per_winner[:, None], change_per_loser[:, None])
+    deltas[~contested] = 0.0
+    return supported, deltas
+
+
+def judge_posts(arrays, N, post_ids, qualities, seed, params):
+    """
+    Run the two-round voting of `multi_round_voting` for a batch of posts
+    against a frozen rating snapshot, without mutating it.
+
+    The batch draws from one Philox generator keyed by `seed` in which every
+    post owns a fixed block of the stream at its post id, so the outcome of
+    a post does not depend on how posts are split across workers. All
+    panels of a round are drawn and voted as one array.
+
+    Returns:
+        (support decisions, concatenated voter ids, concatenated ELO deltas),
+        with each post's voters in post order
+    """
+    elo = arrays["elo"][:N]
+    goodness = arrays["goodness"][:N]
+    mood_factor = arrays["mood_factor"][:N]
+    order = arrays["order"][:N]
+    k_factor = params["k_factor"]
+    round1_users = params["round1_users"]
+    round2_users = params["round2_users"]
+    post_ids = np.asarray(post_ids)
+    qualities = np.asarray(qualities)
+    if len(post_ids) == 0:
+        return np.zeros(0, dtype=bool), np.empty(0, dtype=np.int64), np.empty(0)
+
+    # Philox yields four draws per counter step, so blocks start on a step
+    block = -(-_DRAWS_PER_VOTER * (round1_users + round2_users) // 4) * 4
+    first = int(post_ids.min())
+    bit_generator = np.random.Philox(np.random.SeedSequence(seed))
+    bit_generator.advance(first * block // 4)
+    span = int(post_ids.max()) - first + 1
+    uniforms = np.random.Generator(bit_generator).random((span, block))[post_ids - first]
+
+    def vote_round(rows, start, stop, size, offset):
+        draws = uniforms[rows, offset : offset + _DRAWS_PER_VOTER * size]
+        ids = _draw_panels(order, start, stop, draws[:, :size])
+        votes = draws[:, size:].reshape(len(rows), 5, size)[:, :, : ids.shape[1]]
+        supported, deltas = _vote_panels(
+            ids,
+            qualities[rows],
+            elo,
+            goodness,
+            mood_factor,
+            votes.transpose(1, 0, 2),
+            k_factor,
+        )
+        return supported, ids, deltas
+
+    everyone = np.arange(len(post_ids))
+    if N < params["single_round_threshold"]:
+        decisions, ids, deltas = vote_round(everyone, 0, N, round1_users, 0)
+        return decisions, ids.ravel(), deltas.ravel()
+
+    cut = int(params["round1_split"] / 100.0 * N)
+    decisions, ids1, deltas1 = vote_round(everyone, 0, cut, round1_users, 0)
+    advanced = np.flatnonzero(decisions)
+    size1 = ids1.shape[1]
+    size2 = min(round2_users, N - cut) if len(advanced) else 0
+
+    # Each post's Round 1 voters, then its Round 2 voters if it advanced
+    voter_ids = np.zeros((len(post_ids), size1 + size2), dtype=np.int64)
+    voter_deltas = np.zeros((len(post_ids), size1 + size2))
+    voted = np.zeros((len(post_ids), size1 + size2), dtype=bool)
+    voter_ids[:, :size1] = ids1
+    voter_deltas[:, :size1] = deltas1
+    voted[:, :size1] = True
+    if len(advanced):
+        decisions[advanced], ids2, deltas2 = vote_round(
+            advanced, cut, N, round2_users, _DRAWS_PER_VOTER * round1_users
+        )
+        voter_ids[advanced, size1:] = ids2
+        voter_deltas[advanced, size1:] = deltas2
+        voted[advanced, size1:] = True
+    return decisions, voter_ids[voted], voter_deltas[voted]
+
+
+def _judge_posts_worker(task):
+    name, capacity, N, post_ids, qualities, seed, params = task
+    arrays = _attach(name, capacity)
+    return judge_posts(arrays, N, post_ids, qualities, seed, params)
+
+
+def simulate_epochs(
+    max_population=5000,
+    posts_per_user=2,
+    growth_rate=0.01,
+    round1_users=5,
+    round2_users=5,
+    elo_start=800,
+    k_factor=32,
+    round1_split=70,
+    elo_posting_scale=100,
+    single_round_threshold=20,
+    workers=None,
+    seed=0,
+    min_parallel_posts=256,
+):
+    """
+    Epoch-synchronous variant of the array growth loop.
+
+    All posts created in one growth step are judged against the ratings as
+    they stood at the start of the step. Batches of at least
+    `min_parallel_posts` posts are split across `workers` processes reading a
+    shared-memory snapshot; smaller ones are judged in-process. The ELO deltas
+    are merged in post order at the end of the epoch, so results depend only
+    on the seed, not on the number of workers.
+
+    Returns:
+        Run dictionary in the same shape as `simulation.simulate_growth`
+    """
+    workers = workers or os.cpu_count()
+    params = dict(
+        round1_users=round1_users,
+        round2_users=round2_users,
+        k_factor=k_factor,
+        round1_split=round1_split,
+        single_round_threshold=single_round_threshold,
+    )
+    np.random.seed(seed)
+    random.seed(seed)
+
+    population = Population()
+    posting_sampler = PostingSampler(elo_posting_scale)
+    snapshot = RatingSnapshot(1024)
+    metrics = StreamingMetrics()
+    posts_created = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool, progress_bar(
+            max_population, "Growing user population (epochs)"
+        ) as pbar:
+            population_increment = 1.0
+            epoch = 0
+            while len(population) < max_population:
+                new_count = min(
+                    int(population_increment), max_population - len(population)
+                )
+                if new_count > 0:
+                    new_ids = population.add_users(new_count, elo=elo_start)
+                    posting_sampler.add_users(new_ids, elo_start)
+                    creators = posting_sampler.draw(posts_per_user * new_count)
+                    posts = PostStore(len(creators))
+                    posts.add_posts(creators, population)
+                    post_ids = posts_created + np.arange(len(posts))
+                    posts_created += len(posts)
+                    qualities = posts.quality
+                    for creator_elo in posts.creator_elo_at_creation:
+                        metrics.record_creation(float(creator_elo))
+
+                    N = len(population)
+                    if N > snapshot.capacity:
+                        snapshot.close()
+                        snapshot = RatingSnapshot(max(N, 2 * snapshot.capacity))
+                    snapshot.publish(population)
+                    epoch_seed = seed * 1_000_003 + epoch
+
+                    if len(post_ids) < min_parallel_posts:
+                        results = [
+                            judge_posts(
+                                snapshot.arrays, N, post_ids, qualities, epoch_seed, params
+                            )
+                        ]
+                    else:
+                        chunks = np.array_split(np.arange(len(post_ids)), workers)
+                        tasks = [
+                            (
+                                snapshot.name,
+                                snapshot.capacity,
+                                N,
+                                post_ids[chunk],
+                                qualities[chunk],
+                                epoch_seed,
+                                params,
+                            )
+                            for chunk in chunks
+                            if len(chunk)
+                        ]
+                        results = list(pool.map(_judge_posts_worker, tasks))
+
+                    decisions = np.concatenate([r[0] for r in results])
+                    voter_ids = np.concatenate([r[1] for r in results])
+                    deltas = np.concatenate([r[2] for r in results])
+                    np.add.at(population.elo, voter_ids, deltas)
+                    elo = population.elo
+                    for user_id in np.unique(voter_ids):
+                        posting_sampler.rating_changed(int(user_id), float(elo[user_id]))
+
+                    for is_correct, supported in zip(
+                        decisions == (qualities >= 0.5), decisions
+                    ):
+                        metrics.record_decision(is_correct, supported)
+
+                    metrics.record_population(N)
+                    pbar.update(new_count)
+                    pbar.set_postfix(current=N)
+                    epoch += 1
+
+                population_increment *= 1 + growth_rate
+    finally:
+        snapshot.close()
+
+    return {
+        "users": population,
+        "user_goodness": population.goodness.copy(),
+        "user_elos": population.elo.copy(),
+        "metrics": metrics,
+    }
+
+
+def run_statistics(run):
+    """`simulation.summarize_run` plus the spread of the rating distribution."""
+    stats = summarize_run(run)
+    stats["elo_std"] = float(np.std(run["user_elos"]))
+    stats["elo_p99"] = float(np.percentile(run["user_elos"], 99))
+    return stats
+
+
+def compare_modes(workers=None, seed=0, min_parallel_posts=256, **params):
+    """
+    Run the sequential array backend and the epoch mode with the same
+    parameters and print their accuracy and rating-distribution statistics
+    side by side, with the wall-clock speedup.
+    """
+    start = time.perf_counter()
+    sequential = simulate(backend="arrays", seed=seed, **params)
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    epoch = simulate_epochs(
+        workers=workers, seed=seed, min_parallel_posts=min_parallel_posts, **params
+    )
+    epoch_time = time.perf_counter() - start
+
+    sequential_stats = run_statistics(sequential)
+    epoch_stats = run_statistics(epoch)
+    print(f"\n{'Metric':<20}{'Sequential':>14}{'Epoch':>14}{'Difference':>14}")
+    for key in sequential_stats:
+        a, b = sequential_stats[key], epoch_stats[key]
+        print(f"{key:<20}{a:>14.2f}{b:>14.2f}{b - a:>+14.2f}")
+    print(f"{'wall time (s)':<20}{sequential_time:>14.2f}{epoch_time:>14.2f}")
+    print(f"Speedup: {sequential_time / epoch_time:.2f}x with {workers or os.cpu_count()} workers")
+    return sequential_stats, epoch_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - epoch-synchronous multi-core mode"
+    )
+    parser.add_argument("--max-population", type=int, default=5000)
+    parser.add_argument("--posts-per-user", type=int, default=2)
+    parser.add_argument("--growth-rate", type=float, default=0.05)
+    parser.add_argument("--round1-users", type=int, default=5)
+    parser.add_argument("--round2-users", type=int, default=5)
+    parser.add_argument("--elo-start", type=int, default=800)
+    parser.add_argument("--k-factor", type=int, default=32)
+    parser.add_argument("--elo-posting-scale", type=int, default=100)
+    parser.add_argument("--round1-split", type=int, default=70)
+    parser.add_argument("--single-round-threshold", type=int, default=20)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: number of CPUs)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument(
+        "--min-parallel-posts",
+        type=int,
+        default=256,
+        help="Smallest epoch that is dispatched to the worker pool (default: 256)",
+    )
+    args = parser.parse_args()
+
+    compare_modes(
+        workers=args.workers,
+        seed=args.seed,
+        min_parallel_posts=args.min_parallel_posts,
+        max_population=args.max_population,
+        posts_per_user=args.posts_per_user,
+        growth_rate=args.growth_rate,
+        round1_users=args.round1_users,
+        round2_users=args.round2_users,
+        elo_start=args.elo_start,
+        k_factor=args.k_factor,
+        round1_split=args.round1_split,
+        elo_posting_scale=args.elo_posting_scale,
+        single_round_threshold=args.single_round_threshold,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import argparse
+import heapq
+
+import numpy as np
+
+from simulation import simulate, summarize_run
+
+# Kinds of IP a user can register from
+UNIQUE, HOUSEHOLD, NAT, BOT_FARM = range(4)
+KIND_NAMES = {UNIQUE: "unique", HOUSEHOLD: "household", NAT: "NAT", BOT_FARM: "bot farm"}
+
+
+class IPMinIndex:
+    """
+    Lowest current rating among the users of each IP address.
+
+    Each IP keeps a min-heap of (elo, user id) entries. A rating change
+    pushes a new entry instead of searching for the old one; entries whose
+    rating no longer matches the user's current one are discarded lazily
+    when they reach the top, and a heap is rebuilt once stale entries
+    outnumber its users. Registered as a rating observer, the index is
+    touched only for the voters whose rating changed, so keeping it costs
+    O(log k) per vote cast, whatever the population size.
+    """
+
+    def __init__(self):
+        self._heaps = {}
+        self._users = {}  # ip -> number of users
+        self._ip_of = {}
+        self._elo = {}
+
+    def __contains__(self, ip):
+        return ip in self._heaps
+
+    def add_user(self, user_id, ip, elo):
+        self._ip_of[user_id] = ip
+        self._users[ip] = self._users.get(ip, 0) + 1
+        self.rating_changed(user_id, elo)
+
+    def rating_changed(self, user_id, elo):
+        ip = self._ip_of.get(user_id)
+        if ip is None:
+            return
+        self._elo[user_id] = elo
+        heap = self._heaps.setdefault(ip, [])
+        heapq.heappush(heap, (elo, user_id))
+        if len(heap) > 2 * self._users[ip] + 16:
+            self._compact(ip)
+
+    def _compact(self, ip):
+        heap = self._heaps[ip]
+        current = {user_id for elo, user_id in heap if self._elo[user_id] == elo}
+        heap[:] = [(self._elo[user_id], user_id) for user_id in current]
+        heapq.heapify(heap)
+
+    def min_rating(self, ip):
+        """Lowest current rating on `ip`, or None for an IP without users."""
+        heap = self._heaps.get(ip)
+        if not heap:
+            return None
+        while heap[0][0] != self._elo[heap[0][1]]:
+            heapq.heappop(heap)
+        return heap[0][0]
+
+
+class IPModel:
+    """
+    IP assignment and rating inheritance at onboarding (whitepaper 5.2.1).
+
+    New users register from a fresh IP, from a household IP shared with a
+    few others, or from one of a handful of carrier-grade NAT addresses
+    shared by many. Once the population reaches `bot_start` users, a
+    `bot_fraction` share of new users are bots registering from `bot_ips`
+    farm addresses; bots judge with `bot_goodness` (0 = random votes).
+
+    With `inherit`, a new user starts at the lowest current rating on their
+    IP, capped at the starting rating; otherwise everyone starts at the
+    starting rating. IP draws use their own generator, so the simulation's
+    random stream is unchanged.
+    """
+
+    def __init__(
+        self,
+        household_fraction=0.2,
+        household_size=3,
+        nat_fraction=0.1,
+        nat_ips=20,
+        bot_fraction=0.0,
+        bot_ips=5,
+        bot_start=0,
+        bot_goodness=0.0,
+        inherit=True,
+        seed=0,
+    ):
+        self.household_fraction = household_fraction
+        self.household_size = household_size
+        self.nat_fraction = nat_fraction
+        self.nat_ips = nat_ips
+        self.bot_fraction = bot_fraction
+        self.bot_ips = bot_ips
+        self.bot_start = bot_start
+        self.bot_goodness = bot_goodness
+        self.inherit = inherit
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.index = IPMinIndex()
+        self._next_ip = nat_ips + bot_ips  # 0.. are NAT, then bot farm addresses
+        self._households = []
+        self.ip = []  # per user id
+        self.kind = []
+        self.start_elo = []
+
+    def config(self):
+        """Constructor arguments, e.g. to validate a checkpoint."""
+        return {
+            name: getattr(self, name)
+            for name in (
+                "household_fraction",
+                "household_size",
+                "nat_fraction",
+                "nat_ips",
+                "bot_fraction",
+                "bot_ips",
+                "bot_start",
+                "bot_goodness",
+                "inherit",
+                "seed",
+            )
+        }
+
+    def _fresh_ip(self):
+        self._next_ip += 1
+        return self._next_ip
+
+    def _draw_ip(self, user_id):
+        rng = self.rng
+        if user_id >= self.bot_start and rng.random() < self.bot_fraction:
+            return self.nat_ips + int(rng.integers(self.bot_ips)), BOT_FARM
+        draw = rng.random()
+        if draw < self.nat_fraction:
+            return int(rng.integers(self.nat_ips)), NAT
+        if draw < self.nat_fraction + self.household_fraction:
+            # A new household with probability 1/size, else join an existing one
+            if not self._households or rng.random() < 1 / self.household_size:
+                self._households.append(self._fresh_ip())
+                return self._households[-1], HOUSEHOLD
+            return self._households[int(rng.integers(len(self._households)))], HOUSEHOLD
+        return self._fresh_ip(), UNIQUE
+
+    def onboard(self, user_ids, elo_start):
+        """
+        Assign IPs to new users (consecutive ids) and work out their
+        starting ratings.
+
+        Returns:
+            (list of starting ratings, list of bot flags)
+        """
+        elos, bots = [], []
+        for user_id in user_ids:
+            ip, kind = self._draw_ip(user_id)
+            elo = elo_start
+            if self.inherit:
+                inherited = self.index.min_rating(ip)
+                if inherited is not None:
+                    elo = min(inherited, elo_start)
+            self.index.add_user(user_id, ip, elo)
+            self.ip.append(ip)
+            self.kind.append(kind)
+            self.start_elo.append(elo)
+            elos.append(elo)
+            bots.append(kind == BOT_FARM)
+        return elos, bots
+
+
+def inheritance_report(run, elo_start=800, top_tier=30):
+    """
+    Rating outcome by IP kind for a run made with an `IPModel`.
+
+    Returns:
+        {kind name: dict of users, share inheriting a penalty, mean starting
+         and final rating, share in the top `top_tier`% by rating}
+    """
+    ip_model = run["ip_model"]
+    elos = np.asarray(run["user_elos"])
+    kinds = np.asarray(ip_model.kind)
+    starts = np.asarray(ip_model.start_elo)
+    cutoff = np.percentile(elos, 100 - top_tier)
+    report = {}
+    for kind, name in KIND_NAMES.items():
+        mask = kinds == kind
+        if not mask.any():
+            continue
+        report[name] = {
+            "users": int(mask.sum()),
+            "penalised": float(np.mean(starts[mask] < elo_start)),
+            "start_elo": float(starts[mask].mean()),
+            "final_elo": float(elos[mask].mean()),
+            "top_tier_share": float(np.mean(elos[mask] >= cutoff)),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - IP-based rating inheritance under bot influx"
+    )
+    parser.add_argument("--max-population", type=int, default=5000)
+    parser.add_argument("--household-fraction", type=float, default=0.2)
+    parser.add_argument("--household-size", type=float, default=3)
+    parser.add_argument("--nat-fraction", type=float, default=0.1)
+    parser.add_argument("--nat-ips", type=int, default=20)
+    parser.add_argument(
+        "--bot-fraction",
+        type=float,
+        default=0.3,
+        help="Share of new users that are bots once the influx starts (default: 0.3)",
+    )
+    parser.add_argument("--bot-ips", type=int, default=5)
+    parser.add_argument(
+        "--bot-start",
+        type=int,
+        default=1000,
+        help="Population size at which the bot influx starts (default: 1000)",
+    )
+    parser.add_argument("--bot-goodness", type=float, default=0.0)
+    parser.add_argument("--backend", choices=["objects", "arrays"], default="objects")
+    parser.add_argument("--elo-start", type=int, default=800)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = {}
+    for inherit in (False, True):
+        ip_model = IPModel(
+            household_fraction=args.household_fraction,
+            household_size=args.household_size,
+            nat_fraction=args.nat_fraction,
+            nat_ips=args.nat_ips,
+            bot_fraction=args.bot_fraction,
+            bot_ips=args.bot_ips,
+            bot_start=args.bot_start,
+            bot_goodness=args.bot_goodness,
+            inherit=inherit,
+            seed=args.seed,
+        )
+        run = simulate(
+            backend=args.backend,
+            seed=args.seed,
+            max_population=args.max_population,
+            elo_start=args.elo_start,
+            ip_model=ip_model,
+        )
+        results[inherit] = (summarize_run(run), inheritance_report(run, args.elo_start))
+
+    for inherit, (summary, report) in results.items():
+        print(f"\nRating inheritance {'ON' if inherit else 'OFF'}:")
+        print(f"  Correct votes: {summary['accuracy']:.2f}%")
+        print(
+            f"  ELO quartiles: Q1={summary['elo_q1']:.1f}, "
+            f"Q2={summary['elo_q2']:.1f}, Q3={summary['elo_q3']:.1f}"
+        )
+        print(
+            f"  {'IP kind':<10} {'users':>7} {'penalised':>10} {'start ELO':>10} "
+            f"{'final ELO':>10} {'top 30%':>8}"
+        )
+        for name, row in report.items():
+            print(
+                f"  {name:<10} {row['users']:>7} {100 * row['penalised']:>9.1f}% "
+                f"{row['start_elo']:>10.1f} {row['final_elo']:>10.1f} "
+                f"{100 * row['top_tier_share']:>7.1f}%"
+            )
+
+
+if __name__ == "__main__":
+    main()
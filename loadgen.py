@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+from metrics import QuantileSketch
+from simulation import User, vote
+
+OPS = ("submit_post", "fetch_assignment", "cast_vote", "read_feed")
+
+
+class Connection:
+    """One client connection; records per-operation latency."""
+
+    def __init__(self, reader, writer, latencies):
+        self.reader = reader
+        self.writer = writer
+        self.latencies = latencies
+
+    @classmethod
+    async def open(cls, host, port, latencies):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, latencies)
+
+    async def call(self, op, **params):
+        start = time.perf_counter()
+        self.writer.write(json.dumps({"op": op, **params}).encode() + b"\n")
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        if op in self.latencies:
+            self.latencies[op].update(time.perf_counter() - start)
+        return response
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def _client(connection, users, deadline, post_share, feed_share):
+    """
+    Closed-loop client: submit a post, read the feed, or take the next open
+    review assignment and vote on it as the assigned user would.
+    """
+    while time.perf_counter() < deadline:
+        draw = random.random()
+        if draw < post_share:
+            await connection.call("submit_post")
+        elif draw < post_share + feed_share:
+            await connection.call("read_feed", limit=20)
+        else:
+            assignment = await connection.call("fetch_assignment")
+            if assignment["post"] is None:
+                continue
+            decision = vote(users[assignment["user"]], SimpleNamespace(quality=assignment["quality"]))
+            await connection.call(
+                "cast_vote", user=assignment["user"], post=assignment["post"], vote=decision
+            )
+
+
+async def run_load(host, port, connections=16, duration=10.0, post_share=0.1, feed_share=0.2, seed=0):
+    """
+    Drive a running `service.py` for `duration` seconds.
+
+    Voting behaviour mirrors `simulation.vote`: the generator fetches the
+    users' hidden traits once and restores matching `User` objects.
+
+    Returns:
+        Dictionary with request totals, requests/sec, per-operation latency
+        sketches and the service's own statistics at the end
+    """
+    random.seed(seed)
+    latencies = {op: QuantileSketch() for op in OPS}
+    control = await Connection.open(host, port, {})
+    traits = (await control.call("users"))["users"]
+    users = [
+        User.restore(user_id, 0, goodness, mood_factor, goodness)
+        for user_id, (goodness, mood_factor) in enumerate(traits)
+    ]
+    clients = [await Connection.open(host, port, latencies) for _ in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(client, users, start + duration, post_share, feed_share)
+            for client in clients
+        )
+    )
+    elapsed = time.perf_counter() - start
+    server = await control.call("stats")
+    for client in clients + [control]:
+        await client.close()
+    requests = sum(sketch.count for sketch in latencies.values())
+    return {
+        "requests": requests,
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed,
+        "latencies": latencies,
+        "server": server,
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_service(port, population, seed, timeout=30.0):
+    """Start `service.py` in a child process and wait until it accepts connections."""
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "service.py"),
+            "--port",
+            str(port),
+            "--population",
+            str(population),
+            "--seed",
+            str(seed),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("service.py did not start")
+
+
+def print_report(result):
+    print(
+        f"\n{result['requests']} requests in {result['seconds']:.1f}s "
+        f"({result['requests_per_second']:.0f} requests/s)"
+    )
+    print(f"  {'operation':<18} {'requests':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for op, sketch in result["latencies"].items():
+        if not sketch.count:
+            continue
+        p50, p99 = sketch.quantiles([0.5, 0.99])
+        print(f"  {op:<18} {sketch.count:>10} {1e3 * p50:>10.3f} {1e3 * p99:>10.3f}")
+    server = result["server"]
+    lock = server["rating_lock"]
+    print(
+        f"\n  Service: {server['posts']} posts, {server['decided']} decided, "
+        f"{server['published']} published, {server['in_flight']} in flight, "
+        f"{server['open_assignments']} open assignments"
+    )
+    print(
+        f"  Rating lock: {lock['acquisitions']} acquisitions, "
+        f"{100 * lock['contended'] / max(lock['acquisitions'], 1):.1f}% contended, "
+        f"wait p50={1e3 * lock['wait_p50']:.3f}ms p99={1e3 * lock['wait_p99']:.3f}ms "
+        f"max={1e3 * lock['wait_max']:.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - load generator for service.py"
+    )
+    parser.add_argument(
+        "--connect",
+        metavar="HOST:PORT",
+        help="Use a running service instead of starting one",
+    )
+    parser.add_argument("--population", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load (default: 10)")
+    parser.add_argument(
+        "--post-share",
+        type=float,
+        default=0.1,
+        help="Share of client actions that submit a post (default: 0.1)",
+    )
+    parser.add_argument(
+        "--feed-share",
+        type=float,
+        default=0.2,
+        help="Share of client actions that read the feed (default: 0.2)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    process = None
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        port = int(port)
+    else:
+        host, port = "127.0.0.1", _free_port()
+        process = spawn_service(port, args.population, args.seed)
+    try:
+        result = asyncio.run(
+            run_load(
+                host,
+                port,
+                connections=args.connections,
+                duration=args.duration,
+                post_share=args.post_share,
+                feed_share=args.feed_share,
+                seed=args.seed,
+            )
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print_report(result)
+
+
+if __name__ == "__main__":
+    main()
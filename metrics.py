@@ -0,0 +1,253 @@
+import math
+
+import numpy as np
+
+
+class RunningStats:
+    """Streaming count, mean, variance (Welford's algorithm), min and max."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        """Fold in the statistics of another stream (Chan et al.)."""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else math.inf
+
+    def half_width(self, confidence=0.95):
+        """Half-width of the Student-t confidence interval of the mean."""
+        if self.count < 2:
+            return math.inf
+        import scipy.stats as st
+
+        t = st.t.ppf(0.5 + confidence / 2, self.count - 1)
+        return t * math.sqrt(self.variance / self.count)
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch (KLL-style compactor hierarchy).
+
+    Level h holds items of weight 2**h; a full level is sorted and every other
+    item promoted to the next level. Memory stays around 3k items whatever the
+    stream length. Until the first compaction (fewer than k items) quantiles
+    are exact and match `numpy.percentile`. Compaction alternates its offset
+    deterministically instead of drawing from `random`, so keeping a sketch
+    never perturbs the simulation's random stream.
+    """
+
+    def __init__(self, k=4096):
+        self.k = k
+        self.count = 0
+        self._levels = [[]]
+        self._offset = 0
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, value):
+        self._levels[0].append(value)
+        self.count += 1
+        if len(self._levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def update_many(self, values):
+        for value in values:
+            self.update(float(value))
+
+    def _compress(self):
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append([])
+                items.sort()
+                leftover = items[-1:] if len(items) % 2 else []
+                pairs = items[: len(items) - len(leftover)]
+                self._offset ^= 1
+                self._levels[level + 1].extend(pairs[self._offset :: 2])
+                self._levels[level] = leftover
+            level += 1
+
+    def merge(self, other):
+        while len(self._levels) < len(other._levels):
+            self._levels.append([])
+        for level, items in enumerate(other._levels):
+            self._levels[level].extend(items)
+        self.count += other.count
+        self._compress()
+
+    def quantiles(self, qs):
+        """
+        Approximate quantiles for the fractions in `qs` (0..1).
+
+        Returns:
+            Array of values, one per requested fraction
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if not self.count:
+            return np.full(qs.shape, np.nan)
+        if len(self._levels) == 1:
+            return np.percentile(self._levels[0], qs * 100)
+        values, weights = self.weighted_items()
+        cumulative = np.cumsum(weights) - weights / 2
+        return np.interp(qs * weights.sum(), cumulative, values)
+
+    def weighted_items(self):
+        """
+        The retained items, sorted, with the number of stream items each
+        stands for; the weights sum to `count`.
+
+        Returns:
+            (values, weights) arrays
+        """
+        values = np.concatenate(
+            [np.asarray(items, dtype=np.float64) for items in self._levels]
+        )
+        weights = np.concatenate(
+            [np.full(len(items), 2.0**level) for level, items in enumerate(self._levels)]
+        )
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+
+class DownsampledSeries:
+    """
+    Fixed-budget time series: each point is the mean of `stride` consecutive
+    raw values, and whenever the budget fills up adjacent points are averaged
+    pairwise and the stride doubles.
+    """
+
+    def __init__(self, budget=4096):
+        self.budget = budget + budget % 2
+        self.stride = 1
+        self.count = 0
+        self._points = []
+        self._sum = 0.0
+        self._pending = 0
+
+    def append(self, value):
+        self.count += 1
+        self._sum += value
+        self._pending += 1
+        if self._pending == self.stride:
+            self._points.append(self._sum / self.stride)
+            self._sum = 0.0
+            self._pending = 0
+            if len(self._points) == self.budget:
+                points = self._points
+                self._points = [(a + b) / 2 for a, b in zip(points[::2], points[1::2])]
+                self.stride *= 2
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def values(self):
+        """Completed points (the partially filled last point is left out)."""
+        return np.array(self._points)
+
+
+class RollingAccuracy:
+    """Correct-decision rate over the last `window` posts."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._ring = [0] * window
+        self._next = 0
+        self._filled = 0
+        self._sum = 0
+
+    def update(self, correct):
+        self._sum += correct - self._ring[self._next]
+        self._ring[self._next] = correct
+        self._next = (self._next + 1) % self.window
+        self._filled = min(self._filled + 1, self.window)
+
+    @property
+    def value(self):
+        return self._sum / self._filled if self._filled else math.nan
+
+
+class StreamingMetrics:
+    """
+    Constant-memory run metrics.
+
+    Replaces the per-post Python lists of the growth loop: online counters for
+    votes and tier participation, a windowed rolling accuracy, running moments
+    plus a mergeable quantile sketch of creator ELO at creation, and
+    downsampled correctness and population series for plotting.
+    """
+
+    def __init__(self, window=1000, series_budget=4096, sketch_k=4096):
+        self.total_votes = 0
+        self.correct_votes = 0
+        self.supported_posts_count = 0
+        self.round1_participants = 0
+        self.round2_participants = 0
+        self.round1_population = 0
+        self.round2_population = 0
+        self.rolling_accuracy = RollingAccuracy(window)
+        self.creator_elo = RunningStats()
+        self.creator_elo_sketch = QuantileSketch(sketch_k)
+        self.correct_series = DownsampledSeries(series_budget)
+        self.population_series = DownsampledSeries(series_budget)
+
+    def record_creation(self, creator_elo):
+        self.creator_elo.update(creator_elo)
+        self.creator_elo_sketch.update(creator_elo)
+
+    def record_decision(
+        self,
+        is_correct,
+        supported,
+        round1_participants=0,
+        round2_participants=0,
+        round1_population=0,
+        round2_population=0,
+    ):
+        is_correct = int(is_correct)
+        self.total_votes += 1
+        self.correct_votes += is_correct
+        self.supported_posts_count += int(supported)
+        self.round1_participants += round1_participants
+        self.round2_participants += round2_participants
+        self.round1_population += round1_population
+        self.round2_population += round2_population
+        self.rolling_accuracy.update(is_correct)
+        self.correct_series.append(is_correct)
+
+    def record_population(self, size):
+        self.population_series.append(size)
+
+    @property
+    def accuracy(self):
+        return self.correct_votes / self.total_votes if self.total_votes else math.nan
+
+    def creator_elo_quantiles(self, qs):
+        return self.creator_elo_sketch.quantiles(qs)
@@ -0,0 +1,456 @@
+import argparse
+import heapq
+import math
+import random
+import time
+from collections import deque
+
+import numpy as np
+from tqdm import tqdm
+
+from metrics import QuantileSketch, RunningStats
+from population import Population, PostStore, round_voting_panel
+from posting_sampler import PostingSampler
+from rank_index import RankIndex
+
+# Event kinds
+VOTE, EXTERNAL = range(2)
+
+
+class ReviewerPool:
+    """
+    Concurrent review assignments per user.
+
+    A user holds at most `max_concurrent` open assignments. Users with spare
+    capacity are kept in their own `RankIndex`, so a panel is drawn from the
+    available reviewers of a tier without scanning anyone who is saturated.
+    Registered as a rating observer to keep that index ordered.
+    """
+
+    def __init__(self, max_concurrent=1):
+        self.max_concurrent = max_concurrent
+        self.available = RankIndex()
+        self.load = []
+        self.reviews = []
+
+    def add_user(self, user_id, elo):
+        self.load.append(0)
+        self.reviews.append(0)
+        self.available.insert(user_id, elo)
+
+    def rating_changed(self, user_id, elo):
+        if user_id in self.available:
+            self.available.update(user_id, elo)
+
+    def assign(self, ids):
+        for user_id in ids:
+            self.load[user_id] += 1
+            if self.load[user_id] == self.max_concurrent:
+                self.available.remove(user_id)
+
+    def finish(self, user_id, elo):
+        """
+        Close one assignment of `user_id`.
+
+        Returns:
+            True if the user had been saturated and is available again
+        """
+        freed = self.load[user_id] == self.max_concurrent
+        if freed:
+            self.available.insert(user_id, elo)
+        self.load[user_id] -= 1
+        self.reviews[user_id] += 1
+        return freed
+
+
+def _population_bucket(size):
+    """Doubling buckets of population size: 1, 2-3, 4-7, ..."""
+    return size.bit_length() - 1
+
+
+def censored_quantiles(sketch, censored, qs):
+    """
+    Kaplan-Meier quantiles of durations observed in `sketch`, with
+    right-censored durations (known only to exceed the given values).
+
+    Args:
+        sketch: `QuantileSketch` of the completed durations
+        censored: Durations that had not completed when the run ended
+        qs: Fractions (0..1)
+
+    Returns:
+        Array of values, one per fraction; inf where the estimate lies
+        beyond the longest censored duration
+    """
+    qs = np.asarray(qs, dtype=np.float64)
+    censored = np.asarray(censored, dtype=np.float64)
+    if not len(censored):
+        return sketch.quantiles(qs)
+    if sketch.count:
+        values, weights = sketch.weighted_items()
+    else:
+        values, weights = np.empty(0), np.empty(0)
+    times = np.concatenate([values, censored])
+    completed = np.concatenate([np.ones(len(values), dtype=bool), np.zeros(len(censored), dtype=bool)])
+    weights = np.concatenate([weights, np.ones(len(censored))])
+    # Completions before censorings at equal times, as Kaplan-Meier assumes
+    order = np.lexsort((~completed, times))
+    times, completed, weights = times[order], completed[order], weights[order]
+    at_risk = weights.sum() - np.cumsum(weights) + weights
+    survival = np.cumprod(np.where(completed, 1 - weights / at_risk, 1.0))
+    index = np.searchsorted(1 - survival, qs - 1e-12)
+    result = np.full(qs.shape, np.inf)
+    reached = index < len(times)
+    result[reached] = times[index[reached]]
+    return result
+
+
+def simulate_pipeline(
+    initial_population=100,
+    max_population=20000,
+    growth_rate=0.2,
+    posts_per_user_day=1.0,
+    review_minutes=100.0,
+    review_sigma=1.0,
+    max_concurrent=1,
+    round1_users=5,
+    round2_users=5,
+    elo_start=800,
+    k_factor=32,
+    round1_split=70,
+    elo_posting_scale=100,
+    single_round_threshold=20,
+    seed=0,
+    progress=True,
+):
+    """
+    Discrete-event run of the multi-round voting process with many posts in
+    flight (whitepaper goal 3.7).
+
+    Users join as a Poisson process at `growth_rate` per user per day and
+    post at `posts_per_user_day`, creators weighted by rating as in the
+    growth loop. A round's panel is drawn from the available reviewers of
+    its tier; each reviewer answers after a log-normal delay with median
+    `review_minutes`. A round resolves, and its ratings update, when the last
+    vote is in; Round 2 is only scheduled then. A post that cannot get a full
+    panel waits in its tier's FIFO queue until reviewers free up. Panels
+    only fall short once nearly a whole tier is at its cap, so the defaults
+    (one open assignment per reviewer, 100-minute median) keep most users
+    at the cap.
+
+    Posts still undecided when the run ends are kept as censored
+    observations of time to decision, and of time to publish once they are
+    in their final round; posts still in Round 1 are left out of publish
+    times, as most of them will not publish.
+
+    Returns:
+        Dictionary of per-population-bucket statistics (time to publish,
+        time to decision and their censored observations, queue depth,
+        reviewer load, share of users at the cap), per-reviewer review
+        counts and days in the population, and event totals
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    rng = np.random.default_rng([seed, 2])
+    population = Population()
+    rank_index = RankIndex()
+    pool = ReviewerPool(max_concurrent)
+    posting_sampler = PostingSampler(elo_posting_scale)
+    observers = (rank_index, pool, posting_sampler)
+    posts = PostStore()
+
+    events = []  # (time, sequence, kind, post id, reviewer id)
+    sequence = 0
+    in_flight = {}  # post id -> [round, panel ids, votes outstanding, single round]
+    submitted = []
+    joined = []
+    waiting = (deque(), deque())  # posts waiting for a lower / upper tier panel
+    buckets = {}
+    review_median = review_minutes / 60 / 24  # days
+    now = 0.0
+    event_count = 0
+    open_assignments = 0
+
+    def bucket(size):
+        stats = buckets.get(size)
+        if stats is None:
+            stats = buckets[size] = {
+                "posts": 0,
+                "published": 0,
+                "publish_time": QuantileSketch(),
+                "decision_time": QuantileSketch(),
+                "publish_censored": [],
+                "decision_censored": [],
+                "queue_depth": RunningStats(),
+                "open_assignments": RunningStats(),
+                "saturated": RunningStats(),
+            }
+        return stats
+
+    def add_users(count):
+        ids = population.add_users(count, elo=elo_start)
+        joined.extend([now] * count)
+        for user_id in ids.tolist():
+            rank_index.insert(user_id, float(elo_start))
+            pool.add_user(user_id, float(elo_start))
+        posting_sampler.add_users(ids, population.elo[ids])
+
+    def tier(round_number):
+        """Rank range [start, stop) of the voters for a round, and its queue."""
+        N = len(population)
+        if N < single_round_threshold:
+            return 0, N, round1_users, 0
+        cut = int(round1_split / 100.0 * N)
+        if round_number == 1:
+            return 0, cut, round1_users, 0
+        return cut, N, round2_users, 1
+
+    def available_rank(rank):
+        if rank >= len(rank_index):
+            return len(pool.available)
+        user_id = rank_index.select(rank)
+        return pool.available.count_below(rank_index.elo_of(user_id), user_id)
+
+    def start_round(post_id, round_number):
+        nonlocal sequence, open_assignments
+        start, stop, size, _ = tier(round_number)
+        needed = min(size, stop - start)
+        lo, hi = available_rank(start), available_rank(stop)
+        if needed == 0 or hi - lo < needed:
+            return False
+        panel = pool.available.sample_range(lo, hi, needed)
+        pool.assign(panel)
+        open_assignments += len(panel)
+        in_flight[post_id] = [round_number, panel, len(panel), stop - start == len(population)]
+        delays = rng.lognormal(math.log(review_median), review_sigma, len(panel))
+        for user_id, delay in zip(panel, delays.tolist()):
+            sequence += 1
+            heapq.heappush(events, (now + delay, sequence, VOTE, post_id, user_id))
+        return True
+
+    def request_round(post_id, round_number):
+        queue = waiting[tier(round_number)[3]]
+        if queue or not start_round(post_id, round_number):
+            queue.append((post_id, round_number))
+
+    def drain_queues():
+        for queue in waiting:
+            while queue and start_round(*queue[0]):
+                queue.popleft()
+
+    def resolve(post_id):
+        round_number, panel, _, single = in_flight.pop(post_id)
+        _, decision = round_voting_panel(
+            population, panel, posts.quality[post_id], k_factor, observers
+        )
+        if decision == "support" and round_number == 1 and not single:
+            request_round(post_id, 2)
+            return
+        stats = bucket(_population_bucket(submitted[post_id][1]))
+        elapsed = now - submitted[post_id][0]
+        stats["decision_time"].update(elapsed)
+        if decision == "support":
+            stats["published"] += 1
+            stats["publish_time"].update(elapsed)
+
+    add_users(initial_population)
+    join_rate = growth_rate
+    pbar = tqdm(
+        total=max_population,
+        initial=initial_population,
+        desc="Population",
+        disable=not progress,
+    )
+    start = time.perf_counter()
+    # Joins and posts are competing exponential clocks on one external event
+    heapq.heappush(
+        events,
+        (rng.exponential(1 / (len(population) * (join_rate + posts_per_user_day))), 0, EXTERNAL, -1, -1),
+    )
+    while events:
+        now, _, kind, post_id, user_id = heapq.heappop(events)
+        event_count += 1
+        if kind == VOTE:
+            freed = pool.finish(user_id, float(population.elo[user_id]))
+            open_assignments -= 1
+            in_flight[post_id][2] -= 1
+            if not in_flight[post_id][2]:
+                resolve(post_id)
+            if freed:
+                drain_queues()
+            continue
+
+        N = len(population)
+        if random.random() < join_rate / (join_rate + posts_per_user_day):
+            if N >= max_population:
+                break
+            add_users(1)
+            pbar.update(1)
+            drain_queues()
+        else:
+            creator = posting_sampler.draw(1)
+            post_id = int(posts.add_posts(creator, population)[0])
+            submitted.append((now, N))
+            stats = bucket(_population_bucket(N))
+            stats["posts"] += 1
+            # Poisson arrivals see time averages, so sampling here is unbiased
+            stats["queue_depth"].update(len(waiting[0]) + len(waiting[1]))
+            stats["open_assignments"].update(open_assignments / N)
+            stats["saturated"].update(1 - len(pool.available) / N)
+            request_round(post_id, 1)
+        sequence += 1
+        heapq.heappush(
+            events,
+            (
+                now + rng.exponential(1 / (len(population) * (join_rate + posts_per_user_day))),
+                sequence,
+                EXTERNAL,
+                -1,
+                -1,
+            ),
+        )
+    pbar.close()
+
+    undecided = [(post_id, state[0], state[3]) for post_id, state in in_flight.items()]
+    for queue in waiting:
+        single = len(population) < single_round_threshold
+        undecided.extend((post_id, round_number, single) for post_id, round_number in queue)
+    for post_id, round_number, single in undecided:
+        stats = bucket(_population_bucket(submitted[post_id][1]))
+        age = now - submitted[post_id][0]
+        stats["decision_censored"].append(age)
+        if round_number == 2 or single:
+            stats["publish_censored"].append(age)
+
+    wall_time = time.perf_counter() - start
+    return {
+        "buckets": dict(sorted(buckets.items())),
+        "reviews": np.array(pool.reviews),
+        "member_days": now - np.array(joined),
+        "days": now,
+        "events": event_count,
+        "wall_time": wall_time,
+        "max_concurrent": max_concurrent,
+        "in_flight": len(in_flight),
+        "waiting": len(waiting[0]) + len(waiting[1]),
+    }
+
+
+def _hours(days, longest):
+    """Duration in hours, or a lower bound when the estimate is censored."""
+    if np.isinf(days):
+        return f">{24 * longest:.2f}"
+    return f"{24 * days:.2f}"
+
+
+def print_report(run):
+    days = run["days"]
+    print(
+        f"\nPipeline: {run['events']} events over {days:.1f} simulated days "
+        f"in {run['wall_time']:.2f}s ({run['events'] / max(run['wall_time'], 1e-9):.0f} events/s)"
+    )
+    print(f"  Posts still in flight: {run['in_flight']} ({run['waiting']} waiting for reviewers)")
+    print(
+        f"\n  {'population':>13} {'posts':>8} {'published':>10} {'censored':>9} "
+        f"{'publish p50/p90/p99 (h)':>25} {'decision p50 (h)':>17} {'queue':>7} {'open/user':>10} "
+        f"{'at cap':>7}"
+    )
+    for size, stats in run["buckets"].items():
+        publish = stats["publish_time"]
+        decision = stats["decision_time"]
+        publish_censored = stats["publish_censored"]
+        decision_censored = stats["decision_censored"]
+        if publish.count:
+            longest = max(publish_censored, default=0.0)
+            publish_text = "/".join(
+                _hours(q, longest)
+                for q in censored_quantiles(publish, publish_censored, [0.5, 0.9, 0.99])
+            )
+        else:
+            publish_text = "-"
+        if decision.count:
+            (p50,) = censored_quantiles(decision, decision_censored, [0.5])
+            decision_text = _hours(p50, max(decision_censored, default=0.0))
+        else:
+            decision_text = "-"
+        print(
+            f"  {2 ** size:>6}-{2 ** (size + 1) - 1:<6} {stats['posts']:>8} {stats['published']:>10} "
+            f"{len(decision_censored):>9} {publish_text:>25} {decision_text:>17} "
+            f"{stats['queue_depth'].mean:>7.1f} {stats['open_assignments'].mean:>10.3f} "
+            f"{stats['saturated'].mean:>7.1%}"
+        )
+    # Rates over each user's own time in the population; a day at least, so
+    # users who joined just before the end do not dominate the tail
+    members = run["member_days"] >= 1
+    reviews = run["reviews"][members] / run["member_days"][members]
+    q50, q90, q99 = np.percentile(reviews, [50, 90, 99])
+    print(
+        f"\n  Reviews per user per day: p50={q50:.2f} p90={q90:.2f} p99={q99:.2f} "
+        f"max={reviews.max():.2f} (cap {run['max_concurrent']} concurrent; "
+        f"{int(members.sum())} users with at least a day in the population)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - concurrent review pipeline with reviewer latency"
+    )
+    parser.add_argument("--initial-population", type=int, default=100)
+    parser.add_argument("--max-population", type=int, default=20000)
+    parser.add_argument(
+        "--growth-rate",
+        type=float,
+        default=0.2,
+        help="New users per existing user per simulated day (default: 0.2)",
+    )
+    parser.add_argument("--posts-per-user-day", type=float, default=1.0)
+    parser.add_argument(
+        "--review-minutes",
+        type=float,
+        default=100.0,
+        help="Median reviewer response time (default: 100)",
+    )
+    parser.add_argument(
+        "--review-sigma",
+        type=float,
+        default=1.0,
+        help="Log-normal shape of reviewer response times (default: 1.0)",
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=1,
+        help="Open review assignments a user can hold (default: 1)",
+    )
+    parser.add_argument("--round1-users", type=int, default=5)
+    parser.add_argument("--round2-users", type=int, default=5)
+    parser.add_argument("--elo-start", type=int, default=800)
+    parser.add_argument("--k-factor", type=int, default=32)
+    parser.add_argument("--round1-split", type=int, default=70)
+    parser.add_argument("--elo-posting-scale", type=int, default=100)
+    parser.add_argument("--single-round-threshold", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run = simulate_pipeline(
+        initial_population=args.initial_population,
+        max_population=args.max_population,
+        growth_rate=args.growth_rate,
+        posts_per_user_day=args.posts_per_user_day,
+        review_minutes=args.review_minutes,
+        review_sigma=args.review_sigma,
+        max_concurrent=args.max_concurrent,
+        round1_users=args.round1_users,
+        round2_users=args.round2_users,
+        elo_start=args.elo_start,
+        k_factor=args.k_factor,
+        round1_split=args.round1_split,
+        elo_posting_scale=args.elo_posting_scale,
+        single_round_threshold=args.single_round_threshold,
+        seed=args.seed,
+    )
+    print_report(run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,645 @@
+import random
+import numpy as np
+
+from posting_sampler import posting_weights
+from profiler import NULL_PROFILER
+from simulation import elo_update_team
+
+
+class Population:
+    """
+    Struct-of-arrays user store.
+
+    Every per-user attribute of `simulation.User` lives in a contiguous NumPy
+    array indexed by user id, so voting, mood and ELO updates over a panel are
+    array operations instead of per-object attribute lookups. The buffers grow
+    geometrically; the public attributes are views over the active users.
+    `remove_user` swap-removes a departing user and shrinks the buffers once
+    they are mostly empty, so memory follows the active population.
+    """
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self._elo = np.empty(capacity, dtype=np.float64)
+        self._goodness = np.empty(capacity, dtype=np.float64)
+        self._mood_factor = np.empty(capacity, dtype=np.float64)
+        self._adjusted_goodness = np.empty(capacity, dtype=np.float64)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def elo(self):
+        return self._elo[: self.size]
+
+    @property
+    def goodness(self):
+        return self._goodness[: self.size]
+
+    @property
+    def mood_factor(self):
+        return self._mood_factor[: self.size]
+
+    @property
+    def adjusted_goodness(self):
+        return self._adjusted_goodness[: self.size]
+
+    @classmethod
+    def from_arrays(cls, elo, goodness, mood_factor, adjusted_goodness):
+        """Population holding copies of the given per-user arrays."""
+        population = cls(max(len(elo), 1))
+        population.size = len(elo)
+        population._elo[: len(elo)] = elo
+        population._goodness[: len(elo)] = goodness
+        population._mood_factor[: len(elo)] = mood_factor
+        population._adjusted_goodness[: len(elo)] = adjusted_goodness
+        return population
+
+    def state_arrays(self):
+        """Per-user arrays by attribute name (views, e.g. for checkpoints)."""
+        return {
+            "elo": self.elo,
+            "goodness": self.goodness,
+            "mood_factor": self.mood_factor,
+            "adjusted_goodness": self.adjusted_goodness,
+        }
+
+    def _reserve(self, capacity):
+        if capacity <= len(self._elo):
+            return
+        self._resize(max(capacity, 2 * len(self._elo)))
+
+    def _resize(self, capacity):
+        for name in ("_elo", "_goodness", "_mood_factor", "_adjusted_goodness"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+    def remove_user(self, user_id):
+        """
+        Remove a user in O(1) by moving the last user into its id.
+
+        Returns:
+            Previous id of the moved user (`user_id` itself if it was the last)
+        """
+        last = self.size - 1
+        for name in ("_elo", "_goodness", "_mood_factor", "_adjusted_goodness"):
+            values = getattr(self, name)
+            values[user_id] = values[last]
+        self.size = last
+        capacity = len(self._elo) // 2
+        if capacity >= 1024 and self.size < capacity // 2:
+            self._resize(capacity)
+        return last
+
+    def add_users(self, count, elo=800, rng=np.random):
+        """
+        Append `count` users with the same attribute distributions as `User`.
+
+        Args:
+            rng: `numpy.random` or a `numpy.random.Generator`
+
+        Returns:
+            Array of the new user ids
+        """
+        goodness = rng.exponential(scale=0.3, size=count)
+        resample = goodness >= 1
+        goodness[resample] = rng.uniform(size=int(resample.sum()))
+        return self.append_users(elo, goodness, rng.uniform(0.05, 0.15, size=count))
+
+    def append_users(self, elo, goodness, mood_factor):
+        """
+        Append users with the given attributes (arrays, or scalars broadcast
+        over `goodness`).
+
+        Returns:
+            Array of the new user ids
+        """
+        start, end = self.size, self.size + len(goodness)
+        self._reserve(end)
+        self._elo[start:end] = elo
+        self._goodness[start:end] = goodness
+        self._mood_factor[start:end] = mood_factor
+        self._adjusted_goodness[start:end] = goodness
+        self.size = end
+        return np.arange(start, end)
+
+    def apply_mood(self, ids):
+        """Vectorised `User.apply_mood` for the users in `ids`."""
+        self._adjusted_goodness[ids] = mood_adjusted_goodness(
+            self._goodness[ids], self._mood_factor[ids]
+        )
+
+
+class PostStore:
+    """Parallel arrays of post quality, creator id and creator ELO at creation."""
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self._quality = np.empty(capacity, dtype=np.float64)
+        self._creator = np.empty(capacity, dtype=np.int64)
+        self._creator_elo_at_creation = np.empty(capacity, dtype=np.float64)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def quality(self):
+        return self._quality[: self.size]
+
+    @property
+    def creator(self):
+        return self._creator[: self.size]
+
+    @property
+    def creator_elo_at_creation(self):
+        return self._creator_elo_at_creation[: self.size]
+
+    def add_posts(self, creators, population):
+        """
+        Create one post per entry of `creators`, mirroring `Post.__init__`.
+
+        Returns:
+            Array of the new post ids
+        """
+        count = len(creators)
+        start, end = self.size, self.size + count
+        if end > len(self._quality):
+            new_capacity = max(end, 2 * len(self._quality))
+            for name in ("_quality", "_creator", "_creator_elo_at_creation"):
+                old = getattr(self, name)
+                new = np.empty(new_capacity, dtype=old.dtype)
+                new[: self.size] = old[: self.size]
+                setattr(self, name, new)
+
+        variation = np.random.uniform(-0.2, 0.2, size=count)
+        self._quality[start:end] = np.clip(
+            population.goodness[creators] + variation, 0, 1
+        )
+        self._creator[start:end] = creators
+        self._creator_elo_at_creation[start:end] = population.elo[creators]
+        self.size = end
+        return np.arange(start, end)
+
+
+# Panels smaller than this are voted with Python floats (see
+# `_round_voting_small_panel`), larger ones with array operations
+SCALAR_PANEL_LIMIT = 64
+
+
+def mood_adjusted_goodness(goodness, mood_factor, rng=np.random):
+    """
+    Vectorised `User.apply_mood` on plain arrays.
+
+    Args:
+        rng: `numpy.random` or a `numpy.random.Generator`
+
+    Returns:
+        Array of adjusted goodness values
+    """
+    moody = rng.random(len(goodness)) < mood_factor
+    adjustment = rng.uniform(0, 0.25, size=len(goodness))
+    raise_mood = rng.random(len(goodness)) < 0.5
+    adjusted = np.where(
+        raise_mood,
+        np.minimum(1, goodness * (1 + adjustment)),
+        np.maximum(0, goodness * (1 - adjustment)),
+    )
+    return np.where(moody, adjusted, goodness)
+
+
+def panel_support(adjusted_goodness, quality, rng=np.random):
+    """
+    Vectorised `vote` given each voter's (mood-adjusted) goodness.
+
+    Returns:
+        Boolean array, True where the voter supports the post
+    """
+    informed = rng.random(len(adjusted_goodness)) < adjusted_goodness
+    coin_flip = rng.random(len(adjusted_goodness)) < 0.5
+    return np.where(informed, quality >= 0.5, coin_flip)
+
+
+def team_elo_deltas(elo, support, k_factor=32):
+    """
+    Round outcome and per-voter ELO changes of `round_voting` for a panel.
+
+    Args:
+        elo: Ratings of the panel
+        support: Boolean support mask of the panel
+
+    Returns:
+        (round decision, array of ELO deltas aligned with the panel)
+    """
+    support_count = int(support.sum())
+    oppose_count = len(support) - support_count
+    deltas = np.zeros(len(support))
+    if support_count == oppose_count:
+        return "draw", deltas
+
+    round_decision = "support" if support_count > oppose_count else "oppose"
+    winners = support if round_decision == "support" else ~support
+    if support_count and oppose_count:
+        change_per_winner, change_per_loser = elo_update_team(
+            elo[winners].mean(),
+            elo[~winners].mean(),
+            k=k_factor,
+            winner_size=int(winners.sum()),
+            loser_size=int((~winners).sum()),
+        )
+        deltas[winners] = change_per_winner
+        deltas[~winners] = change_per_loser
+    return round_decision, deltas
+
+
+def vote_panel(population, ids, quality):
+    """
+    Vectorised `vote` for a whole panel.
+
+    Returns:
+        Boolean array, True where the voter supports the post
+    """
+    population.apply_mood(ids)
+    return panel_support(population.adjusted_goodness[ids], quality)
+
+
+def round_voting_panel(
+    population,
+    ids,
+    quality,
+    k_factor=32,
+    rating_observers=(),
+    audit_log=None,
+    post_id=-1,
+    round_number=1,
+    behaviour=None,
+    creator=-1,
+):
+    """
+    Array counterpart of `round_voting`: votes the panel and applies the team
+    ELO update to the winners and losers in place. A behaviour model (see
+    `behaviour.py`) replaces the votes of its non-honest voters.
+
+    Returns:
+        (support mask, round decision)
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) < SCALAR_PANEL_LIMIT:
+        return _round_voting_small_panel(
+            population,
+            ids,
+            quality,
+            k_factor,
+            rating_observers,
+            audit_log,
+            post_id,
+            round_number,
+            behaviour,
+            creator,
+        )
+    support = vote_panel(population, ids, quality)
+    elo_before = population.elo[ids]
+    if behaviour is not None:
+        creator_elo = float(population.elo[creator]) if creator >= 0 else None
+        support = behaviour.votes(ids, support, elo_before, creator, creator_elo)
+    round_decision, deltas = team_elo_deltas(elo_before, support, k_factor)
+    if audit_log is not None:
+        audit_log.record_round(
+            post_id,
+            round_number,
+            ids,
+            support,
+            elo_before,
+            elo_before + deltas,
+            round_decision,
+        )
+    if deltas.any():
+        elo = population.elo
+        elo[ids] += deltas
+        changed = list(zip(ids.tolist(), elo[ids].tolist()))
+        for observer in rating_observers:
+            for user_id, rating in changed:
+                observer.rating_changed(user_id, rating)
+    return support, round_decision
+
+
+def _panel_mean(values):
+    # NumPy sums fewer than 8 values sequentially and longer arrays pairwise
+    if len(values) >= 8:
+        return float(np.mean(values))
+    total = 0.0
+    for value in values:
+        total += value
+    return total / len(values)
+
+
+def _round_voting_small_panel(
+    population,
+    ids,
+    quality,
+    k_factor,
+    rating_observers,
+    audit_log,
+    post_id,
+    round_number,
+    behaviour=None,
+    creator=-1,
+):
+    """
+    `round_voting_panel` for panels below `SCALAR_PANEL_LIMIT` voters.
+
+    NumPy's per-call overhead dominates on panels of a few dozen voters, so
+    this path draws all of the panel's random numbers in one call and works
+    on Python floats. The draws are those of `mood_adjusted_goodness` and
+    `panel_support` in the same order and the team means match
+    `ndarray.mean`, so results are bit-identical to the vectorised path.
+    """
+    n = len(ids)
+    id_list = ids.tolist()
+    goodness = population._goodness[ids].tolist()
+    mood_factor = population._mood_factor[ids].tolist()
+    draws = np.random.random(5 * n).tolist()
+    good_post = bool(quality >= 0.5)
+
+    adjusted = []
+    support = []
+    for i in range(n):
+        value = goodness[i]
+        if draws[i] < mood_factor[i]:
+            adjustment = 0.25 * draws[n + i]
+            if draws[2 * n + i] < 0.5:
+                value = min(1.0, value * (1 + adjustment))
+            else:
+                value = max(0.0, value * (1 - adjustment))
+        adjusted.append(value)
+        support.append(good_post if draws[3 * n + i] < value else draws[4 * n + i] < 0.5)
+    population._adjusted_goodness[ids] = adjusted
+
+    elo = population._elo
+    elo_before = elo[ids].tolist()
+    if behaviour is not None:
+        creator_elo = float(elo[creator]) if creator >= 0 else None
+        support = behaviour.votes(id_list, support, elo_before, creator, creator_elo)
+    support_count = sum(support)
+    oppose_count = n - support_count
+    if support_count == oppose_count:
+        round_decision = "draw"
+    else:
+        round_decision = "support" if support_count > oppose_count else "oppose"
+    elo_after = elo_before
+    if round_decision != "draw" and support_count and oppose_count:
+        winning = support_count > oppose_count
+        winner_elos = [rating for vote, rating in zip(support, elo_before) if vote == winning]
+        loser_elos = [rating for vote, rating in zip(support, elo_before) if vote != winning]
+        change_per_winner, change_per_loser = elo_update_team(
+            _panel_mean(winner_elos),
+            _panel_mean(loser_elos),
+            k=k_factor,
+            winner_size=len(winner_elos),
+            loser_size=len(loser_elos),
+        )
+        elo_after = [
+            rating + (change_per_winner if vote == winning else change_per_loser)
+            for vote, rating in zip(support, elo_before)
+        ]
+        elo[ids] = elo_after
+        for observer in rating_observers:
+            for user_id, rating in zip(id_list, elo_after):
+                observer.rating_changed(user_id, rating)
+
+    support = np.array(support, dtype=bool)
+    if audit_log is not None:
+        audit_log.record_round(
+            post_id,
+            round_number,
+            ids,
+            support,
+            np.array(elo_before),
+            np.array(elo_after),
+            round_decision,
+        )
+    return support, round_decision
+
+
+def multi_round_voting_panel(
+    population,
+    quality,
+    round1_users=5,
+    round2_users=5,
+    k_factor=32,
+    round1_split=70,
+    rank_index=None,
+    rating_observers=(),
+    single_round_threshold=20,
+    audit_log=None,
+    post_id=-1,
+    behaviour=None,
+    creator=-1,
+):
+    """
+    Array counterpart of `multi_round_voting` with the same tiering and
+    publishing rules. Panels come from `rank_index` when one is given,
+    otherwise from an argsort of the ratings at the start of the post.
+    Votes are written to `audit_log` under `post_id` when a log is given.
+    A `behaviour` model replaces the votes of its non-honest voters in both
+    rounds.
+
+    Returns:
+        (final-round support mask, decision, sample size,
+         round 1 participant ids, round 2 participant ids)
+    """
+    if not len(population):
+        empty = np.empty(0, dtype=np.int64)
+        return np.empty(0, dtype=bool), "oppose", 0, empty, empty
+
+    if rank_index is None:
+        order = np.argsort(population.elo, kind="stable")
+
+        def draw_panel(start, stop, size):
+            if stop - start <= size:
+                return order[start:stop]
+            return order[random.sample(range(start, stop), size)]
+
+        return _tiered_voting(
+            population,
+            quality,
+            draw_panel,
+            round1_users,
+            round2_users,
+            k_factor,
+            round1_split,
+            rating_observers,
+            single_round_threshold,
+            audit_log,
+            post_id,
+            behaviour,
+            creator,
+        )
+
+    def draw_panel(start, stop, size):
+        return np.array(rank_index.sample_range(start, stop, size), dtype=np.int64)
+
+    rank_index.hold()
+    try:
+        return _tiered_voting(
+            population,
+            quality,
+            draw_panel,
+            round1_users,
+            round2_users,
+            k_factor,
+            round1_split,
+            (rank_index, *rating_observers),
+            single_round_threshold,
+            audit_log,
+            post_id,
+            behaviour,
+            creator,
+        )
+    finally:
+        rank_index.release()
+
+
+def _majority_supports(support):
+    support_votes = int(np.count_nonzero(support))
+    return len(support) > 0 and support_votes > len(support) - support_votes
+
+
+def _tiered_voting(
+    population,
+    quality,
+    draw_panel,
+    round1_users,
+    round2_users,
+    k_factor,
+    round1_split,
+    rating_observers,
+    single_round_threshold,
+    audit_log,
+    post_id,
+    behaviour=None,
+    creator=-1,
+):
+    N = len(population)
+    empty = np.empty(0, dtype=np.int64)
+
+    def vote_round(ids, round_number):
+        support, _ = round_voting_panel(
+            population,
+            ids,
+            quality,
+            k_factor,
+            rating_observers,
+            audit_log,
+            post_id,
+            round_number,
+            behaviour,
+            creator,
+        )
+        return support
+
+    if N < single_round_threshold:
+        round1_ids = draw_panel(0, N, round1_users)
+        support = vote_round(round1_ids, 1)
+        decision = "support" if _majority_supports(support) else "oppose"
+        return support, decision, len(support), round1_ids, empty
+
+    cut = int(round1_split / 100.0 * N)
+    round1_ids = draw_panel(0, cut, round1_users)
+    support1 = vote_round(round1_ids, 1)
+    sample_size = len(support1)
+    if not _majority_supports(support1):
+        return support1, "oppose", sample_size, round1_ids, empty
+
+    round2_ids = draw_panel(cut, N, round2_users)
+    support2 = vote_round(round2_ids, 2)
+    sample_size += len(support2)
+    decision = "support" if _majority_supports(support2) else "oppose"
+    return support2, decision, sample_size, round1_ids, round2_ids
+
+
+def select_posting_panel(population, num_posts, elo_scale=400):
+    """
+    Vectorised `select_posting_users`: same sigmoid weighting, all creators
+    drawn in one call.
+
+    Returns:
+        Array of creator ids (may contain duplicates)
+    """
+    if not len(population) or num_posts <= 0:
+        return np.empty(0, dtype=np.int64)
+    weights = posting_weights(population.elo, elo_scale)
+    return np.random.choice(len(population), size=num_posts, p=weights / weights.sum())
+
+
+class ArrayBackend:
+    """
+    Struct-of-arrays backend of `simulation.simulate_growth`: users in a
+    `Population`, each growth step's posts in a `PostStore`, decided by
+    `multi_round_voting_panel`. With `remove_user` it supports churn.
+    """
+
+    def __init__(self, population=None):
+        self.users = Population() if population is None else population
+
+    def __len__(self):
+        return len(self.users)
+
+    @classmethod
+    def from_arrays(cls, elo, goodness, mood_factor, adjusted_goodness):
+        """Backend restored from per-user arrays (see `state_arrays`)."""
+        return cls(Population.from_arrays(elo, goodness, mood_factor, adjusted_goodness))
+
+    def state_arrays(self):
+        return self.users.state_arrays()
+
+    def ratings(self, ids=None):
+        """Array of the ratings of `ids` (of everyone when None)."""
+        return self.users.elo if ids is None else self.users.elo[ids]
+
+    def add_users(self, count, elo=800):
+        return self.users.add_users(count, elo=elo)
+
+    def onboard(self, ids, elos, bots, bot_goodness):
+        """Set the starting ratings of new users and turn `bots` into bots."""
+        population = self.users
+        population.elo[ids] = elos
+        bot_ids = ids[np.asarray(bots, dtype=bool)]
+        population.goodness[bot_ids] = bot_goodness
+        population.adjusted_goodness[bot_ids] = bot_goodness
+
+    def remove_user(self, user_id):
+        return self.users.remove_user(user_id)
+
+    def create_posts(self, creators, first_id):
+        """
+        One post per creator id, numbered from `first_id`.
+
+        Returns:
+            List of (post id, quality, creator id, creator ELO at creation)
+        """
+        posts = PostStore(len(creators))
+        posts.add_posts(creators, self.users)
+        return list(
+            zip(
+                range(first_id, first_id + len(posts)),
+                posts.quality.tolist(),
+                posts.creator.tolist(),
+                posts.creator_elo_at_creation.tolist(),
+            )
+        )
+
+    def decide(self, post, quality, creator, profiler=NULL_PROFILER, **voting):
+        """
+        `multi_round_voting_panel` for a post of `create_posts`; the profiler
+        only times the whole decision.
+
+        Returns:
+            (decision, sample size, round 1 participant ids,
+             round 2 participant ids)
+        """
+        _, decision, sample_size, round1_ids, round2_ids = multi_round_voting_panel(
+            self.users, quality, post_id=post, creator=creator, **voting
+        )
+        return decision, sample_size, round1_ids, round2_ids
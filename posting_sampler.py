@@ -0,0 +1,121 @@
+import numpy as np
+
+
+def posting_weights(elo, elo_scale=400, mid_elo=None):
+    """
+    Vectorised sigmoid posting weights of `select_posting_users`.
+
+    Args:
+        elo: Array of ratings
+        elo_scale: Scale parameter (lower = more extreme difference)
+        mid_elo: Centre of the sigmoid; defaults to the middle of the ELO range
+
+    Returns:
+        Array of unnormalised weights, one per rating
+    """
+    elo = np.asarray(elo, dtype=np.float64)
+    if mid_elo is None:
+        mid_elo = (elo.min() + elo.max()) / 2
+    normalized_elo = (elo - mid_elo) / elo_scale
+    # Numerically stable form of 1 / (1 + e^(-10x))
+    return 0.5 * (1 + np.tanh(normalized_elo * 5))
+
+
+class PostingSampler:
+    """
+    Draws post creators with the ELO-weighted sigmoid of `select_posting_users`.
+
+    The sampler keeps its own copy of every rating, indexed by user id, and is
+    registered as a rating observer so voting only marks the users whose ELO
+    changed. `refresh()` folds those changes in once per growth step:
+    when the ELO range (and so the sigmoid centre) is unchanged only the dirty
+    weights are recomputed, otherwise all weights are rebuilt in one vectorised
+    pass. A cumulative-sum index then serves any number of draws in
+    O(log N) each. Departing users are swap-removed with `user_removed`.
+    """
+
+    def __init__(self, elo_scale=400):
+        self.elo_scale = elo_scale
+        self.size = 0
+        self._elo = np.empty(1024, dtype=np.float64)
+        self._weights = np.empty(1024, dtype=np.float64)
+        self._cumulative = None
+        self._mid_elo = None
+        self._pending = {}
+
+    def __len__(self):
+        return self.size
+
+    def add_users(self, ids, elos):
+        """Register new users; ids must continue the existing id sequence."""
+        ids = np.asarray(ids, dtype=np.int64)
+        end = self.size + len(ids)
+        if end > len(self._elo):
+            capacity = max(end, 2 * len(self._elo))
+            for name in ("_elo", "_weights"):
+                old = getattr(self, name)
+                new = np.empty(capacity, dtype=np.float64)
+                new[: self.size] = old[: self.size]
+                setattr(self, name, new)
+        self.size = end
+        elos = np.broadcast_to(np.asarray(elos, dtype=np.float64), ids.shape)
+        self._pending.update(zip(ids.tolist(), elos.tolist()))
+
+    def rating_changed(self, user_id, elo):
+        self._pending[user_id] = elo
+
+    def user_removed(self, user_id, moved_from):
+        """Drop `user_id`; the user with id `moved_from` (the last) takes it over."""
+        pending = self._pending.pop(moved_from, None)
+        if moved_from != user_id:
+            self._elo[user_id] = self._elo[moved_from]
+            self._weights[user_id] = self._weights[moved_from]
+            self._pending.pop(user_id, None)
+            if pending is not None:
+                self._pending[user_id] = pending
+        self.size -= 1
+        self._cumulative = None
+        capacity = len(self._elo) // 2
+        if capacity >= 1024 and self.size < capacity // 2:
+            self._elo = self._elo[:capacity].copy()
+            self._weights = self._weights[:capacity].copy()
+
+    def refresh(self):
+        """Apply pending rating changes and rebuild the cumulative-sum index."""
+        elo = self._elo[: self.size]
+        dirty = np.fromiter(self._pending.keys(), dtype=np.int64, count=len(self._pending))
+        if len(dirty):
+            elo[dirty] = np.fromiter(
+                self._pending.values(), dtype=np.float64, count=len(dirty)
+            )
+        self._pending.clear()
+
+        mid_elo = (elo.min() + elo.max()) / 2
+        weights = self._weights[: self.size]
+        if mid_elo == self._mid_elo:
+            weights[dirty] = posting_weights(elo[dirty], self.elo_scale, mid_elo)
+        else:
+            weights[:] = posting_weights(elo, self.elo_scale, mid_elo)
+            self._mid_elo = mid_elo
+        self._cumulative = np.cumsum(weights)
+
+    def ratings(self):
+        """Ratings by user id, with pending changes applied."""
+        if self._pending:
+            self.refresh()
+        return self._elo[: self.size]
+
+    def draw(self, num_posts):
+        """
+        Draw `num_posts` creators in one batched call.
+
+        Returns:
+            Array of user ids (can include duplicates if a user posts multiple times)
+        """
+        if not self.size or num_posts <= 0:
+            return np.empty(0, dtype=np.int64)
+        if self._cumulative is None or self._pending or len(self._cumulative) != self.size:
+            self.refresh()
+        targets = np.random.random(num_posts) * self._cumulative[-1]
+        ids = np.searchsorted(self._cumulative, targets, side="right")
+        return np.minimum(ids, self.size - 1)
@@ -0,0 +1,152 @@
+import bisect
+import json
+import sys
+import time
+from contextlib import nullcontext
+
+from metrics import QuantileSketch
+
+# Per-post latency histogram bin edges: 10 log-spaced bins per decade, 1 us .. 100 s
+LATENCY_EDGES = [10 ** (exponent / 10) for exponent in range(-60, 21)]
+
+
+class _Phase:
+    """Context manager timing one named phase; reused for every entry."""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.allocated_blocks = 0
+        self.allocation_samples = 0
+        self._sampled = False
+
+    def __enter__(self):
+        for hook in self.profiler.hooks:
+            hook.phase_started(self.name)
+        self._sampled = self.calls % self.profiler.allocation_stride == 0
+        if self._sampled:
+            self._blocks = sys.getallocatedblocks()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        if self._sampled:
+            self.allocated_blocks += sys.getallocatedblocks() - self._blocks
+            self.allocation_samples += 1
+        self.seconds += elapsed
+        self.calls += 1
+        for hook in self.profiler.hooks:
+            hook.phase_ended(self.name, elapsed)
+
+
+class Profiler:
+    """
+    Per-phase instrumentation of the growth loop.
+
+    Each phase accumulates wall time, call count and the net number of
+    allocated memory blocks (`sys.getallocatedblocks`). Counting blocks walks
+    the allocator's pools, so it is only done on every `allocation_stride`-th
+    call of a phase and reported as a per-call mean. Phases nest, and
+    times are inclusive: `multi_round_voting` contains `panel_selection` and
+    `elo_update`. Per-post latency goes into a log-spaced histogram and a
+    quantile sketch.
+
+    External profilers attach through `add_hook`: a hook is any object with
+    `phase_started(name)` and `phase_ended(name, seconds)` methods, called at
+    every phase boundary.
+    """
+
+    enabled = True
+
+    def __init__(self, allocation_stride=16):
+        self.allocation_stride = allocation_stride
+        self.hooks = []
+        self._phases = {}
+        self.latency_counts = [0] * (len(LATENCY_EDGES) + 1)
+        self.latency_sketch = QuantileSketch()
+        self._started = time.perf_counter()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def phase(self, name):
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def record_post(self, seconds):
+        self.latency_counts[bisect.bisect_right(LATENCY_EDGES, seconds)] += 1
+        self.latency_sketch.update(seconds)
+
+    def report(self):
+        """Everything recorded so far as a JSON-serialisable dictionary."""
+        p50, p90, p99 = self.latency_sketch.quantiles([0.5, 0.9, 0.99])
+        return {
+            "wall_time": time.perf_counter() - self._started,
+            "phases": {
+                name: {
+                    "calls": phase.calls,
+                    "seconds": phase.seconds,
+                    "mean_seconds": phase.seconds / phase.calls if phase.calls else 0.0,
+                    "allocated_blocks_per_call": (
+                        phase.allocated_blocks / phase.allocation_samples
+                        if phase.allocation_samples
+                        else 0.0
+                    ),
+                }
+                for name, phase in self._phases.items()
+            },
+            "post_latency": {
+                "posts": self.latency_sketch.count,
+                "p50": float(p50) if self.latency_sketch.count else None,
+                "p90": float(p90) if self.latency_sketch.count else None,
+                "p99": float(p99) if self.latency_sketch.count else None,
+                "bin_edges": LATENCY_EDGES,
+                "counts": self.latency_counts,
+            },
+        }
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def print_report(self):
+        report = self.report()
+        print(f"\nProfile ({report['wall_time']:.2f}s wall time):")
+        print(f"  {'phase':<24} {'calls':>10} {'seconds':>10} {'us/call':>10} {'blocks/call':>12}")
+        for name, phase in sorted(
+            report["phases"].items(), key=lambda item: -item[1]["seconds"]
+        ):
+            print(
+                f"  {name:<24} {phase['calls']:>10} {phase['seconds']:>10.3f} "
+                f"{phase['mean_seconds'] * 1e6:>10.1f} {phase['allocated_blocks_per_call']:>12.1f}"
+            )
+        latency = report["post_latency"]
+        if latency["posts"]:
+            print(
+                f"  Post latency: p50={latency['p50'] * 1e6:.1f}us "
+                f"p90={latency['p90'] * 1e6:.1f}us p99={latency['p99'] * 1e6:.1f}us"
+            )
+
+
+class NullProfiler:
+    """Disabled profiler: every phase is a shared no-op context manager."""
+
+    enabled = False
+    _phase = nullcontext()
+
+    def add_hook(self, hook):
+        raise ValueError("Hooks need an enabled Profiler")
+
+    def phase(self, name):
+        return self._phase
+
+    def record_post(self, seconds):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
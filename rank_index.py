@@ -0,0 +1,183 @@
+import random
+from bisect import bisect_left, insort
+
+
+class RankIndex:
+    """
+    Order-statistic index over user ratings.
+
+    Users are kept in ascending (elo, id) order, which is exactly the order
+    `sorted(users, key=lambda u: u.elo)` produces for users stored by id, split
+    into sorted buckets of roughly `load` entries. A Fenwick tree over the
+    bucket sizes maps a rank to its bucket in O(log N), so rating updates and
+    rank lookups never touch the whole population.
+
+    The index registers as a rating observer: `round_voting` calls
+    `rating_changed` for every voter whose ELO moved. Between `hold()` and
+    `release()` those changes are buffered, so the ranking stays frozen at
+    the state it had when a post entered voting.
+    """
+
+    def __init__(self, load=512):
+        self._load = load
+        self._buckets = []
+        self._maxes = []
+        self._tree = [0]
+        self._elo = {}
+        self._held = None
+
+    @classmethod
+    def from_ratings(cls, ratings, load=512):
+        """Bulk-build an index from an iterable of (user_id, elo) pairs."""
+        index = cls(load=load)
+        keys = sorted((elo, user_id) for user_id, elo in ratings)
+        index._elo = {user_id: elo for elo, user_id in keys}
+        index._buckets = [keys[i : i + load] for i in range(0, len(keys), load)]
+        index._maxes = [bucket[-1] for bucket in index._buckets]
+        index._rebuild_tree()
+        return index
+
+    def __len__(self):
+        return len(self._elo)
+
+    def __contains__(self, user_id):
+        return user_id in self._elo
+
+    def elo_of(self, user_id):
+        return self._elo[user_id]
+
+    def min_elo(self):
+        return self._buckets[0][0][0]
+
+    def max_elo(self):
+        return self._buckets[-1][-1][0]
+
+    def _rebuild_tree(self):
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket_index, delta):
+        i = bucket_index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket_index):
+        """Number of entries in buckets before `bucket_index`."""
+        total = 0
+        i = bucket_index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, rank):
+        """Return (bucket index, offset within bucket) of the entry at `rank`."""
+        pos = 0
+        remaining = rank
+        bit = 1 << (len(self._tree) - 1).bit_length()
+        while bit:
+            nxt = pos + bit
+            if nxt < len(self._tree) and self._tree[nxt] <= remaining:
+                pos = nxt
+                remaining -= self._tree[nxt]
+            bit >>= 1
+        return pos, remaining
+
+    def insert(self, user_id, elo):
+        key = (elo, user_id)
+        self._elo[user_id] = elo
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            return
+
+        b = bisect_left(self._maxes, key)
+        if b == len(self._buckets):
+            b -= 1
+        bucket = self._buckets[b]
+        insort(bucket, key)
+        self._maxes[b] = bucket[-1]
+
+        if len(bucket) > 2 * self._load:
+            half = len(bucket) // 2
+            self._buckets[b : b + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[b : b + 1] = [bucket[half - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(b, 1)
+
+    def remove(self, user_id):
+        key = (self._elo.pop(user_id), user_id)
+        b = bisect_left(self._maxes, key)
+        bucket = self._buckets[b]
+        del bucket[bisect_left(bucket, key)]
+
+        if not bucket:
+            del self._buckets[b]
+            del self._maxes[b]
+            self._rebuild_tree()
+        else:
+            self._maxes[b] = bucket[-1]
+            self._tree_add(b, -1)
+
+    def update(self, user_id, elo):
+        self.remove(user_id)
+        self.insert(user_id, elo)
+
+    def user_removed(self, user_id, moved_from):
+        """Drop `user_id` and re-key the user that moved from id `moved_from` to it."""
+        self.remove(user_id)
+        if moved_from != user_id:
+            self.insert(user_id, self._elo[moved_from])
+            self.remove(moved_from)
+
+    def rating_changed(self, user_id, elo):
+        if self._held is not None:
+            self._held[user_id] = elo
+        else:
+            self.update(user_id, elo)
+
+    def hold(self):
+        """Buffer rating changes until `release()`."""
+        self._held = {}
+
+    def release(self):
+        """Apply the rating changes buffered since `hold()`."""
+        held, self._held = self._held, None
+        for user_id, elo in (held or {}).items():
+            self.update(user_id, elo)
+
+    def select(self, rank):
+        """User id at ascending rank `rank` (0 = lowest ELO)."""
+        b, offset = self._locate(rank)
+        return self._buckets[b][offset][1]
+
+    def count_below(self, elo, user_id=-1):
+        """Number of users ordered strictly before the key (elo, user_id)."""
+        key = (elo, user_id)
+        b = bisect_left(self._maxes, key)
+        if b == len(self._buckets):
+            return len(self)
+        return self._prefix(b) + bisect_left(self._buckets[b], key)
+
+    def sample_range(self, start, stop, k):
+        """
+        Sample up to `k` distinct user ids uniformly from ranks [start, stop).
+
+        If the range holds no more than `k` users they are all returned in
+        ascending order. Otherwise the draw consumes `random` exactly like
+        `random.sample(sorted_users[start:stop], k)`, so results match the
+        sort-based reference for the same seed.
+
+        Returns:
+            List of user ids
+        """
+        if stop - start <= k:
+            return [self.select(rank) for rank in range(start, stop)]
+        return [self.select(rank) for rank in random.sample(range(start, stop), k)]
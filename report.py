@@ -0,0 +1,294 @@
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+import scipy.stats as st
+from matplotlib.figure import Figure
+
+# Same split as `simulation.plot_distributions`
+GOODNESS_THRESHOLD = 0.65
+
+
+def _decimate(values, stride, budget):
+    """
+    Average-pool `values` (points `stride` raw samples apart) down to at most
+    `budget` points.
+
+    Returns:
+        (pooled values, new stride)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    factor = math.ceil(len(values) / budget) if budget else 1
+    if factor <= 1:
+        return values, stride
+    usable = len(values) // factor * factor
+    return values[:usable].reshape(-1, factor).mean(axis=1), stride * factor
+
+
+def _edges(values, bins):
+    if not len(values):
+        return np.linspace(0, 1, bins + 1)
+    low, high = float(values.min()), float(values.max())
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def build_report_data(run, bins=50, point_budget=2000, summary=None):
+    """
+    Everything `plot_distributions` draws, reduced to plain numbers.
+
+    Histograms are binned with `np.histogram`, the Round 1 / editor cutoffs
+    come from a single `np.partition` instead of a full sort, and the
+    accuracy and population series are average-pooled to `point_budget`
+    points after smoothing, so the data (and any plot of it) stays the same
+    size however long the run was.
+
+    Returns:
+        JSON-serialisable dictionary (see `render_report`)
+    """
+    goodness = np.asarray(run["user_goodness"], dtype=np.float64)
+    good = goodness > GOODNESS_THRESHOLD
+    goodness_edges = _edges(goodness, bins)
+
+    elos = np.asarray(run["user_elos"], dtype=np.float64)
+    N = len(elos)
+    round1_cut, editor_cut = int(0.70 * N), int(0.99 * N)
+    round1_threshold = editor_threshold = None
+    if N:
+        # Partitioned at both cutoffs: the first k entries are the k lowest
+        elos = np.partition(elos, sorted({max(round1_cut - 1, 0), max(editor_cut - 1, 0)}))
+        round1_threshold = float(elos[max(round1_cut - 1, 0)])
+        editor_threshold = float(elos[max(editor_cut - 1, 0)])
+    elo_edges = _edges(elos, bins)
+    groups = (elos[:round1_cut], elos[round1_cut:editor_cut], elos[editor_cut:])
+
+    metrics = run["metrics"]
+    correct, stride = metrics.correct_series.values(), metrics.correct_series.stride
+    total_posts = len(correct) * stride
+    if total_posts > 10:
+        window = min(10, total_posts) if total_posts < 50 else max(10, int(total_posts / 100))
+        window = max(1, round(window / stride))
+        smoothed = np.convolve(correct, np.ones(window) / window, mode="valid") * 100
+    else:
+        smoothed = np.asarray(correct, dtype=np.float64) * 100
+    x = np.arange(len(smoothed)) * stride
+    if len(smoothed) > 1:
+        regression = st.linregress(x, smoothed)
+        slope, intercept, r_squared = regression.slope, regression.intercept, regression.rvalue**2
+    else:
+        slope, intercept, r_squared = 0.0, float(smoothed[0]) if len(smoothed) else 0.0, 0.0
+    accuracy, accuracy_stride = _decimate(smoothed, stride, point_budget)
+    recent = metrics.rolling_accuracy
+    population, population_stride = _decimate(
+        metrics.population_series.values(), metrics.population_series.stride, point_budget
+    )
+
+    return {
+        "summary": summary or {},
+        "goodness": {
+            "threshold": GOODNESS_THRESHOLD,
+            "edges": goodness_edges.tolist(),
+            "bad": np.histogram(goodness[~good], goodness_edges)[0].tolist(),
+            "good": np.histogram(goodness[good], goodness_edges)[0].tolist(),
+        },
+        "elo": {
+            "edges": elo_edges.tolist(),
+            "round1_threshold": round1_threshold,
+            "editor_threshold": editor_threshold,
+            "round1": np.histogram(groups[0], elo_edges)[0].tolist(),
+            "round2": np.histogram(groups[1], elo_edges)[0].tolist(),
+            "editors": np.histogram(groups[2], elo_edges)[0].tolist(),
+        },
+        "accuracy": {
+            "values": accuracy.tolist(),
+            "stride": accuracy_stride,
+            "slope": float(slope),
+            "intercept": float(intercept),
+            "r_squared": float(r_squared),
+            "recent": None if math.isnan(recent.value) else 100 * recent.value,
+            "recent_window": recent.window,
+        },
+        "population": {
+            "values": population.tolist(),
+            "stride": population_stride,
+        },
+    }
+
+
+def save_report_data(data, path):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def load_report_data(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _stacked_hist(ax, edges, series, **kwargs):
+    edges = np.asarray(edges)
+    ax.hist(
+        [edges[:-1]] * len(series),
+        bins=edges,
+        weights=[np.asarray(counts, dtype=np.float64) for counts in series],
+        stacked=True,
+        edgecolor="black",
+        alpha=0.8,
+        **kwargs,
+    )
+
+
+def render_report(data, path_prefix, formats=("png", "svg")):
+    """
+    Draw the four `plot_distributions` panels from report data onto a
+    non-interactive figure and save one file per format.
+
+    Returns:
+        List of written paths
+    """
+    fig = Figure(figsize=(16, 8))
+
+    goodness = data["goodness"]
+    ax = fig.add_subplot(2, 2, 1)
+    _stacked_hist(
+        ax,
+        goodness["edges"],
+        [goodness["bad"], goodness["good"]],
+        color=["#ff6b6b", "#51cf66"],
+        label=[
+            f"Bad Users (≤ {goodness['threshold']}): {sum(goodness['bad'])} users",
+            f"Good Users (> {goodness['threshold']}): {sum(goodness['good'])} users",
+        ],
+    )
+    ax.axvline(
+        x=goodness["threshold"],
+        color="black",
+        linestyle="--",
+        alpha=0.7,
+        linewidth=2,
+        label=f"Threshold: {goodness['threshold']}",
+    )
+    ax.legend(fontsize=9, loc="upper right")
+    ax.set_xlabel("Goodness Factor")
+    ax.set_ylabel("Number of Users")
+    ax.set_title("Distribution of Users by Goodness Factor\n(Bad vs Good Users)")
+
+    elo = data["elo"]
+    ax = fig.add_subplot(2, 2, 2)
+    round2_total = sum(elo["round2"]) + sum(elo["editors"])
+    _stacked_hist(
+        ax,
+        elo["edges"],
+        [elo["round1"], elo["round2"], elo["editors"]],
+        log=True,
+        color=["#ff9999", "#99ccff", "#51cf66"],
+        label=[
+            f"Round 1 Voters (Bottom 70%): {sum(elo['round1'])} users",
+            f"Round 2 Voters (Top 30%): {round2_total} users",
+            f"Editors (Top 1%): {sum(elo['editors'])} users",
+        ],
+    )
+    if elo["round1_threshold"] is not None:
+        ax.axvline(
+            x=elo["round1_threshold"],
+            color="blue",
+            linestyle="--",
+            alpha=0.7,
+            linewidth=2,
+            label=f"70th percentile (by user count): {elo['round1_threshold']:.1f}",
+        )
+        ax.axvline(
+            x=elo["editor_threshold"],
+            color="green",
+            linestyle="--",
+            alpha=0.7,
+            linewidth=2,
+            label=f"99th percentile (by user count): {elo['editor_threshold']:.1f}",
+        )
+    ax.legend(fontsize=8, loc="upper right")
+    ax.set_xlabel("Elo Rating")
+    ax.set_ylabel("Number of Users (log scale)")
+    ax.set_title("Distribution of Users by Elo Rating")
+
+    accuracy = data["accuracy"]
+    ax = fig.add_subplot(2, 2, 3)
+    x = np.arange(len(accuracy["values"])) * accuracy["stride"]
+    ax.plot(x, accuracy["values"], "b-", label="Multi-Round Voting", alpha=0.7)
+    ax.plot(
+        x,
+        accuracy["slope"] * x + accuracy["intercept"],
+        "b--",
+        label=f"Regression (R²={accuracy['r_squared']:.3f})",
+    )
+    if accuracy.get("recent") is not None:
+        ax.axhline(
+            accuracy["recent"],
+            color="gray",
+            linestyle=":",
+            label=f"Last {accuracy['recent_window']} posts: {accuracy['recent']:.2f}%",
+        )
+    ax.set_title("Correct Votes Ratio")
+    ax.set_xlabel("Round Index")
+    ax.set_ylabel("Proportion of Correct Votes (%)")
+    ax.set_ylim(0, 110)
+    ax.grid(True)
+    ax.legend()
+
+    population = data["population"]
+    ax = fig.add_subplot(2, 2, 4)
+    ax.plot(
+        np.arange(len(population["values"])) * population["stride"],
+        population["values"],
+        label="Population Size",
+    )
+    ax.set_xlabel("Round Index")
+    ax.set_ylabel("Population Size")
+    ax.set_title("Population Over Time")
+
+    fig.tight_layout()
+    paths = []
+    for fmt in formats:
+        path = f"{path_prefix}.{fmt}"
+        fig.savefig(path, format=fmt)
+        paths.append(path)
+    return paths
+
+
+def write_report(run, directory, formats=("png", "svg"), bins=50, point_budget=2000, summary=None):
+    """
+    Write `report.json` and the rendered figures for a finished run to
+    `directory`.
+
+    Returns:
+        List of written paths
+    """
+    os.makedirs(directory, exist_ok=True)
+    data = build_report_data(run, bins, point_budget, summary)
+    data_path = os.path.join(directory, "report.json")
+    save_report_data(data, data_path)
+    return [data_path] + render_report(data, os.path.join(directory, "report"), formats)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - re-render a saved report without re-simulating"
+    )
+    parser.add_argument("data", help="report.json written by `simulation.py --report`")
+    parser.add_argument(
+        "--out",
+        default=None,
+        help="Output path without extension (default: next to the data file)",
+    )
+    parser.add_argument("--formats", nargs="+", default=["png", "svg"])
+    args = parser.parse_args()
+
+    out = args.out or os.path.splitext(args.data)[0]
+    for path in render_report(load_report_data(args.data), out, args.formats):
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from metrics import QuantileSketch
+from posting_sampler import PostingSampler
+from rank_index import RankIndex
+from simulation import Post, User, settle_round
+
+
+class RatingLock:
+    """
+    `asyncio.Lock` around the ratings that records how long requests wait.
+
+    Everything that reads or writes the rating order (panel selection,
+    creator selection, round settlement) runs under it.
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._waiting = 0
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait = QuantileSketch()
+        self.max_wait = 0.0
+
+    async def __aenter__(self):
+        # A free lock still queues newcomers behind woken waiters
+        contended = self._lock.locked() or self._waiting > 0
+        start = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._lock.acquire()
+        finally:
+            self._waiting -= 1
+        waited = time.perf_counter() - start
+        self.acquisitions += 1
+        self.contended += contended
+        self.wait.update(waited)
+        self.max_wait = max(self.max_wait, waited)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._lock.release()
+
+    def report(self):
+        p50, p99 = self.wait.quantiles([0.5, 0.99]) if self.wait.count else (0.0, 0.0)
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "wait_p50": float(p50),
+            "wait_p99": float(p99),
+            "wait_max": self.max_wait,
+        }
+
+
+class FeedService:
+    """
+    Local stand-in for a Veridonia community served over asyncio.
+
+    Posts enter the multi-round voting process of `multi_round_voting`, but
+    votes arrive as requests: a submitted post gets a Round 1 panel from the
+    lower tier, each panel member becomes an open review assignment, and the
+    round settles through `settle_round` once every member has voted. Round 2
+    panels come from the upper tier, and published posts go to the feed.
+    Unlike the batch simulation many posts are in flight at once, so ratings
+    are not frozen while a post is being voted on.
+
+    Round settlement runs on a worker thread while the rating lock is held,
+    which keeps the event loop serving other requests and makes them queue on
+    the lock only when they need the rating order.
+    """
+
+    def __init__(
+        self,
+        population=1000,
+        round1_users=5,
+        round2_users=5,
+        k_factor=32,
+        round1_split=70,
+        elo_start=800,
+        elo_posting_scale=100,
+        single_round_threshold=20,
+        feed_size=1000,
+        seed=0,
+    ):
+        random.seed(seed)
+        np.random.seed(seed)
+        self.round1_users = round1_users
+        self.round2_users = round2_users
+        self.k_factor = k_factor
+        self.round1_split = round1_split
+        self.single_round_threshold = single_round_threshold
+        self.users = [User(i, elo_start) for i in range(population)]
+        self.rank_index = RankIndex.from_ratings((user.id, user.elo) for user in self.users)
+        self.posting_sampler = PostingSampler(elo_posting_scale)
+        self.posting_sampler.add_users(range(population), elo_start)
+        self.rating_lock = RatingLock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.posts = {}
+        self.in_flight = {}  # post id -> [round, {user id: vote or None}, single round]
+        self.assignments = deque()  # (user id, post id, round)
+        self.feed = deque(maxlen=feed_size)
+        self.decided = 0
+        self.published = 0
+        self.requests = 0
+
+    def _draw_panel(self, round_number):
+        N = len(self.users)
+        if N < self.single_round_threshold:
+            return self.rank_index.sample_range(0, N, self.round1_users), True
+        cut = int(self.round1_split / 100.0 * N)
+        if round_number == 1:
+            return self.rank_index.sample_range(0, cut, self.round1_users), False
+        return self.rank_index.sample_range(cut, N, self.round2_users), False
+
+    def _open_round(self, post_id, round_number):
+        panel, single = self._draw_panel(round_number)
+        self.in_flight[post_id] = [round_number, dict.fromkeys(panel), single]
+        for user_id in panel:
+            self.assignments.append((user_id, post_id, round_number))
+
+    def _settle(self, votes):
+        return settle_round(votes, self.k_factor, (self.rank_index, self.posting_sampler))
+
+    async def submit_post(self, user=None):
+        async with self.rating_lock:
+            if user is None:
+                user = int(self.posting_sampler.draw(1)[0])
+            post = Post(len(self.posts), self.users[user])
+            self.posts[post.id] = post
+            self._open_round(post.id, 1)
+        return {"post": post.id, "creator": user}
+
+    async def fetch_assignment(self):
+        if not self.assignments:
+            return {"post": None}
+        user_id, post_id, round_number = self.assignments.popleft()
+        return {
+            "user": user_id,
+            "post": post_id,
+            "round": round_number,
+            "quality": self.posts[post_id].quality,
+        }
+
+    async def cast_vote(self, user, post, vote):
+        state = self.in_flight.get(post)
+        if vote not in ("support", "oppose"):
+            return {"accepted": False}
+        if state is None or user not in state[1] or state[1][user] is not None:
+            return {"accepted": False}
+        round_number, ballots, single = state
+        ballots[user] = vote
+        if any(ballot is None for ballot in ballots.values()):
+            return {"accepted": True}
+
+        del self.in_flight[post]
+        votes = [(self.users[user_id], ballot) for user_id, ballot in ballots.items()]
+        loop = asyncio.get_running_loop()
+        async with self.rating_lock:
+            decision = await loop.run_in_executor(self.executor, self._settle, votes)
+            if decision == "support" and round_number == 1 and not single:
+                self._open_round(post, 2)
+                return {"accepted": True}
+        self.decided += 1
+        if decision == "support":
+            self.published += 1
+            self.feed.append(post)
+        return {"accepted": True, "decision": decision}
+
+    async def read_feed(self, limit=20):
+        posts = [self.posts[post_id] for post_id in list(self.feed)[-limit:]]
+        return {"posts": [[post.id, post.creator.id, post.quality] for post in reversed(posts)]}
+
+    async def users_snapshot(self):
+        """Hidden user traits, so a load generator can mirror their voting."""
+        return {
+            "users": [[user.goodness, user.mood_factor] for user in self.users]
+        }
+
+    async def stats(self):
+        elos = [user.elo for user in self.users]
+        return {
+            "requests": self.requests,
+            "posts": len(self.posts),
+            "in_flight": len(self.in_flight),
+            "open_assignments": len(self.assignments),
+            "decided": self.decided,
+            "published": self.published,
+            "elo_min": min(elos),
+            "elo_max": max(elos),
+            "rating_lock": self.rating_lock.report(),
+        }
+
+    async def handle(self, request):
+        self.requests += 1
+        op = request.pop("op", None)
+        handler = {
+            "submit_post": self.submit_post,
+            "fetch_assignment": self.fetch_assignment,
+            "cast_vote": self.cast_vote,
+            "read_feed": self.read_feed,
+            "users": self.users_snapshot,
+            "stats": self.stats,
+        }.get(op)
+        if handler is None:
+            return {"error": f"unknown op {op!r}"}
+        try:
+            return await handler(**request)
+        except (TypeError, KeyError, IndexError) as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    async def serve_connection(self, reader, writer):
+        """One JSON request per line, one JSON response per line."""
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    response = {"error": f"invalid JSON: {e}"}
+                else:
+                    if isinstance(request, dict):
+                        response = await self.handle(request)
+                    else:
+                        response = {"error": "request must be a JSON object"}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+
+
+async def start_server(service, host="127.0.0.1", port=8765):
+    return await asyncio.start_server(service.serve_connection, host, port)
+
+
+async def _serve(args):
+    service = FeedService(
+        population=args.population,
+        round1_users=args.round1_users,
+        round2_users=args.round2_users,
+        k_factor=args.k_factor,
+        round1_split=args.round1_split,
+        elo_start=args.elo_start,
+        seed=args.seed,
+    )
+    server = await start_server(service, args.host, args.port)
+    print(f"Serving {args.population} users on {args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - local feed service (line-delimited JSON over TCP)"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--population", type=int, default=1000)
+    parser.add_argument("--round1-users", type=int, default=5)
+    parser.add_argument("--round2-users", type=int, default=5)
+    parser.add_argument("--k-factor", type=int, default=32)
+    parser.add_argument("--round1-split", type=int, default=70)
+    parser.add_argument("--elo-start", type=int, default=800)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,38 @@
 import random
 import numpy as np
-import matplotlib.pyplot as plt
-from termcolor import colored
-from tqdm import tqdm
 import math
-import scipy.stats as st
 import argparse
+import time
+
+from metrics import StreamingMetrics
+from posting_sampler import PostingSampler
+from profiler import NULL_PROFILER
+from rank_index import RankIndex
+
+
+class NullProgress:
+    """Disabled progress bar, so quiet runs never import tqdm."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def update(self, n=1):
+        pass
+
+    def set_postfix(self, **kwargs):
+        pass
+
+
+def progress_bar(total, desc, enabled=True):
+    """A `tqdm` progress bar, or a `NullProgress` when disabled."""
+    if not enabled:
+        return NullProgress()
+    from tqdm import tqdm
+
+    return tqdm(total=total, desc=desc)
 
 
 class User:
@@ -16,6 +43,17 @@ class User:
         self.mood_factor = random.uniform(0.05, 0.15)
         self.adjusted_goodness = self.goodness
 
+    @classmethod
+    def restore(cls, id, elo, goodness, mood_factor, adjusted_goodness):
+        """Recreate a saved user without drawing new random attributes."""
+        user = cls.__new__(cls)
+        user.id = id
+        user.elo = elo
+        user.goodness = goodness
+        user.mood_factor = mood_factor
+        user.adjusted_goodness = adjusted_goodness
+        return user
+
     def generate_goodness(self):
         goodness = np.random.exponential(scale=0.3)
         if goodness >= 1:
@@ -59,12 +97,50 @@ def vote(user, post):
     return vote_decision
 
 
-def round_voting(round_users, post, k_factor=32):
+def round_voting(
+    round_users,
+    post,
+    k_factor=32,
+    rating_observers=(),
+    audit_log=None,
+    round_number=1,
+    profiler=NULL_PROFILER,
+    behaviour=None,
+):
     votes = []
-    round_decision = "draw"
+    if audit_log is not None:
+        elo_before = [user.elo for user in round_users]
     for user in round_users:
         vote_decision = vote(user, post)
         votes.append((user, vote_decision))
+    if behaviour is not None:
+        support = behaviour.votes(
+            [user.id for user in round_users],
+            [vote_decision == "support" for _, vote_decision in votes],
+            [user.elo for user in round_users],
+            post.creator.id,
+            post.creator.elo,
+        )
+        votes = [
+            (user, "support" if supported else "oppose")
+            for user, supported in zip(round_users, support)
+        ]
+    round_decision = settle_round(votes, k_factor, rating_observers, profiler)
+    if audit_log is not None:
+        _audit_round(audit_log, post, round_number, votes, elo_before, round_decision)
+    return votes, round_decision
+
+
+def settle_round(votes, k_factor=32, rating_observers=(), profiler=NULL_PROFILER):
+    """
+    Decide a round from its (user, vote) pairs and apply the team ELO update.
+
+    Split out of `round_voting` so votes collected elsewhere (e.g. by
+    `service.py`) settle exactly like simulated ones.
+
+    Returns:
+        Round decision: "support", "oppose" or "draw"
+    """
     supporters = [user for user, vote in votes if vote == "support"]
     opposers = [user for user, vote in votes if vote == "oppose"]
     if not supporters and opposers:
@@ -84,24 +160,38 @@ def round_voting(round_users, post, k_factor=32):
         losing_team = supporters
         round_decision = "oppose"
     else:
-        return votes, round_decision
-    if not losing_team:
-        pass
-    else:
-        average_winner_elo = sum(user.elo for user in winning_team) / len(winning_team)
-        average_loser_elo = sum(user.elo for user in losing_team) / len(losing_team)
-        change_per_winner, change_per_loser = elo_update_team(
-            average_winner_elo,
-            average_loser_elo,
-            k=k_factor,
-            winner_size=len(winning_team),
-            loser_size=len(losing_team),
-        )
-        for user in winning_team:
-            user.elo += change_per_winner
-        for user in losing_team:
-            user.elo += change_per_loser
-    return votes, round_decision
+        return "draw"
+    if losing_team:
+        with profiler.phase("elo_update"):
+            average_winner_elo = sum(user.elo for user in winning_team) / len(winning_team)
+            average_loser_elo = sum(user.elo for user in losing_team) / len(losing_team)
+            change_per_winner, change_per_loser = elo_update_team(
+                average_winner_elo,
+                average_loser_elo,
+                k=k_factor,
+                winner_size=len(winning_team),
+                loser_size=len(losing_team),
+            )
+            for user in winning_team:
+                user.elo += change_per_winner
+            for user in losing_team:
+                user.elo += change_per_loser
+            for observer in rating_observers:
+                for user in winning_team + losing_team:
+                    observer.rating_changed(user.id, user.elo)
+    return round_decision
+
+
+def _audit_round(audit_log, post, round_number, votes, elo_before, round_decision):
+    audit_log.record_round(
+        post.id,
+        round_number,
+        [user.id for user, _ in votes],
+        [vote == "support" for _, vote in votes],
+        elo_before,
+        [user.elo for user, _ in votes],
+        round_decision,
+    )
 
 
 def elo_update_team(winner_avg_elo, loser_avg_elo, k=32, winner_size=1, loser_size=1):
@@ -127,6 +217,9 @@ def select_posting_users(users, num_posts, elo_scale=400):
     Select users to create posts based on ELO-weighted probability.
     Uses a sigmoid-like function with steeper rise in the middle range.
 
+    Reference implementation; the growth loop draws from an incrementally
+    maintained `PostingSampler` with the same weights.
+
     Args:
         users: List of all users
         num_posts: Number of posts to be created
@@ -180,16 +273,29 @@ def multi_round_voting(
     round2_users=5,
     k_factor=32,
     round1_split=70,
+    rank_index=None,
+    rating_observers=(),
+    single_round_threshold=20,
+    audit_log=None,
+    profiler=NULL_PROFILER,
+    behaviour=None,
 ):
     """
     Implements a two-round voting mechanism for a given post using ELO tiers.
-    If the number of users is less than 20, a single round voting is performed by selecting round1_users from all users.
+    If the number of users is less than single_round_threshold (default 20), a single round voting is performed by selecting round1_users from all users.
     Otherwise:
       - Round 1: Bottom round1_split% of all users (select round1_users)
       - Round 2: Top (100-round1_split)% of all users (select round2_users) - only if Round 1 has more support than oppose votes
     Publishing rules:
       - Single round: More support than oppose votes required to publish
       - Two round: Round 1 needs more support than oppose votes to advance to Round 2, then Round 2 needs more support than oppose votes to publish
+    When a `RankIndex` over `all_users` (indexed by user id) is passed, tier
+    panels are drawn from it instead of re-sorting the population. Like the
+    sort, it reflects ratings as they were when the post entered voting; the
+    rating changes of both rounds are applied to it once the post is decided.
+    Every vote is also written to `audit_log` (an `auditlog.AuditLog`) when one
+    is given. `profiler` times panel selection and ELO updates (see `profiler.py`).
+    A `behaviour.VoterBehaviour` replaces the votes of its non-honest voters.
     """
 
     # Use all users for voting
@@ -203,71 +309,111 @@ def multi_round_voting(
             [],
         )  # Added empty lists for round1, round2 participants
 
-    sorted_users = sorted(all_users, key=lambda u: u.elo)
-    N = len(sorted_users)
-    sample_size = 0
-
-    round1_participants = []
-    round2_participants = []
-    if N < 20:
-        round_users = (
-            sorted_users
-            if N <= round1_users
-            else random.sample(sorted_users, round1_users)
-        )
-        votes, round_decision = round_voting(round_users, post, k_factor=k_factor)
-        sample_size += len(votes)
-        round1_participants = [user for user, _ in votes]
-        support_votes, oppose_votes, total_votes, majority_supported = count_votes(
-            votes
-        )
+    if rank_index is not None:
+        N = len(rank_index)
+        rating_observers = (rank_index, *rating_observers)
+        rank_index.hold()
+
+        def draw_panel(start, stop, size):
+            with profiler.phase("panel_selection"):
+                return [
+                    all_users[i] for i in rank_index.sample_range(start, stop, size)
+                ]
 
-        if total_votes > 0:
-            decision = "support" if majority_supported else "oppose"
-        else:
-            decision = "oppose"
     else:
-        round1_group = sorted_users[: int(round1_split / 100.0 * N)]
-        round1_selected_users = (
-            round1_group
-            if len(round1_group) <= round1_users
-            else random.sample(round1_group, round1_users)
-        )
-        votes1, _ = round_voting(round1_selected_users, post, k_factor=k_factor)
-        sample_size += len(votes1)
-        round1_participants = [user for user, _ in votes1]
-        support_votes, oppose_votes, total_votes, majority_supported = count_votes(
-            votes1
-        )
+        with profiler.phase("sort"):
+            sorted_users = sorted(all_users, key=lambda u: u.elo)
+        N = len(sorted_users)
 
-        if total_votes > 0:
-            if majority_supported:
-                round2_group = sorted_users[int(round1_split / 100.0 * N) :]
-                round2_selected_users = (
-                    round2_group
-                    if len(round2_group) <= round2_users
-                    else random.sample(round2_group, round2_users)
-                )
-                votes2, _ = round_voting(round2_selected_users, post, k_factor=k_factor)
-                sample_size += len(votes2)
-                round2_participants = [user for user, _ in votes2]
-                round2_support_votes, round2_oppose_votes, round2_total_votes, _ = (
-                    count_votes(votes2)
-                )
+        def draw_panel(start, stop, size):
+            with profiler.phase("panel_selection"):
+                group = sorted_users[start:stop]
+                return group if len(group) <= size else random.sample(group, size)
+
+    # Release the index even when an observer or the audit log raises
+    try:
+        sample_size = 0
+
+        round1_participants = []
+        round2_participants = []
+        if N < single_round_threshold:
+            round_users = draw_panel(0, N, round1_users)
+            votes, round_decision = round_voting(
+                round_users,
+                post,
+                k_factor=k_factor,
+                rating_observers=rating_observers,
+                audit_log=audit_log,
+                profiler=profiler,
+                behaviour=behaviour,
+            )
+            sample_size += len(votes)
+            round1_participants = [user for user, _ in votes]
+            support_votes, oppose_votes, total_votes, majority_supported = count_votes(
+                votes
+            )
+
+            if total_votes > 0:
+                decision = "support" if majority_supported else "oppose"
+            else:
+                decision = "oppose"
+        else:
+            round1_selected_users = draw_panel(
+                0, int(round1_split / 100.0 * N), round1_users
+            )
+            votes1, _ = round_voting(
+                round1_selected_users,
+                post,
+                k_factor=k_factor,
+                rating_observers=rating_observers,
+                audit_log=audit_log,
+                round_number=1,
+                profiler=profiler,
+                behaviour=behaviour,
+            )
+            sample_size += len(votes1)
+            round1_participants = [user for user, _ in votes1]
+            support_votes, oppose_votes, total_votes, majority_supported = count_votes(
+                votes1
+            )
 
-                if round2_total_votes > 0:
-                    decision = (
-                        "support"
-                        if round2_support_votes > round2_oppose_votes
-                        else "oppose"
+            if total_votes > 0:
+                if majority_supported:
+                    round2_selected_users = draw_panel(
+                        int(round1_split / 100.0 * N), N, round2_users
+                    )
+                    votes2, _ = round_voting(
+                        round2_selected_users,
+                        post,
+                        k_factor=k_factor,
+                        rating_observers=rating_observers,
+                        audit_log=audit_log,
+                        round_number=2,
+                        profiler=profiler,
+                        behaviour=behaviour,
+                    )
+                    sample_size += len(votes2)
+                    round2_participants = [user for user, _ in votes2]
+                    round2_support_votes, round2_oppose_votes, round2_total_votes, _ = (
+                        count_votes(votes2)
                     )
-                    votes = votes2
+
+                    if round2_total_votes > 0:
+                        decision = (
+                            "support"
+                            if round2_support_votes > round2_oppose_votes
+                            else "oppose"
+                        )
+                        votes = votes2
+                    else:
+                        votes, decision = votes2, "oppose"
                 else:
-                    votes, decision = votes2, "oppose"
+                    votes, decision = votes1, "oppose"
             else:
                 votes, decision = votes1, "oppose"
-        else:
-            votes, decision = votes1, "oppose"
+    finally:
+        if rank_index is not None:
+            rank_index.release()
 
     return (
         votes,
@@ -278,7 +424,102 @@ def multi_round_voting(
     )
 
 
-def run_simulation(
+class ObjectBackend:
+    """
+    Reference backend of `simulate_growth`: one `User` per participant and
+    one `Post` per submission, decided by `multi_round_voting`.
+
+    A backend owns the users (`users`, which hooks receive and the run
+    returns) and gives the growth loop what it needs to add them, create
+    their posts and decide those; `population.ArrayBackend` is the
+    struct-of-arrays counterpart. Ids are list positions.
+    """
+
+    def __init__(self, users=None):
+        self.users = [] if users is None else users
+
+    def __len__(self):
+        return len(self.users)
+
+    @classmethod
+    def from_arrays(cls, elo, goodness, mood_factor, adjusted_goodness):
+        """Backend restored from per-user arrays (see `state_arrays`)."""
+        return cls(
+            [
+                User.restore(i, *attributes)
+                for i, attributes in enumerate(
+                    zip(
+                        elo.tolist(),
+                        goodness.tolist(),
+                        mood_factor.tolist(),
+                        adjusted_goodness.tolist(),
+                    )
+                )
+            ]
+        )
+
+    def state_arrays(self):
+        """Per-user arrays by attribute name, e.g. for checkpoints."""
+        return {
+            "elo": np.array([user.elo for user in self.users], dtype=float),
+            "goodness": np.array([user.goodness for user in self.users]),
+            "mood_factor": np.array([user.mood_factor for user in self.users]),
+            "adjusted_goodness": np.array(
+                [user.adjusted_goodness for user in self.users]
+            ),
+        }
+
+    def ratings(self, ids=None):
+        """Array of the ratings of `ids` (of everyone when None)."""
+        users = self.users if ids is None else [self.users[i] for i in ids.tolist()]
+        return np.array([user.elo for user in users], dtype=float)
+
+    def add_users(self, count, elo=800):
+        """
+        Returns:
+            Array of the new user ids
+        """
+        start = len(self.users)
+        self.users.extend(User(i, elo=elo) for i in range(start, start + count))
+        return np.arange(start, start + count)
+
+    def onboard(self, ids, elos, bots, bot_goodness):
+        """Set the starting ratings of new users and turn `bots` into bots."""
+        for user_id, elo, bot in zip(ids.tolist(), elos, bots):
+            user = self.users[user_id]
+            user.elo = elo
+            if bot:
+                user.goodness = bot_goodness
+                user.adjusted_goodness = bot_goodness
+
+    def create_posts(self, creators, first_id):
+        """
+        One post per creator id, numbered from `first_id`.
+
+        Returns:
+            List of (post, quality, creator id, creator ELO at creation)
+        """
+        posts = []
+        for post_id, creator in enumerate(creators.tolist(), first_id):
+            post = Post(post_id, self.users[creator])
+            posts.append((post, post.quality, creator, post.creator_elo_at_creation))
+        return posts
+
+    def decide(self, post, quality, creator, **voting):
+        """
+        `multi_round_voting` for a post of `create_posts`.
+
+        Returns:
+            (decision, sample size, round 1 participants, round 2 participants)
+        """
+        _, decision, sample_size, round1, round2 = multi_round_voting(
+            post, self.users, **voting
+        )
+        return decision, sample_size, round1, round2
+
+
+def simulate_growth(
+    backend,
     max_population=5000,
     posts_per_user=2,
     growth_rate=0.01,
@@ -288,117 +529,254 @@ def run_simulation(
     k_factor=32,
     round1_split=70,
     elo_posting_scale=100,
+    single_round_threshold=20,
+    progress=True,
+    audit_log=None,
+    checkpointer=None,
+    resume=False,
+    profiler=NULL_PROFILER,
+    ip_model=None,
+    convergence=None,
+    behaviour=None,
+    baseline=None,
+    analytic=None,
+    churn=None,
 ):
+    """
+    Growth loop of `run_simulation` on either backend.
 
-    with tqdm(total=max_population, desc="Growing user population") as pbar:
-        posts = []
-        supported_posts_count = 0
-        total_votes = 0
-        correct_votes = 0
-        correct_votes_stats = []
-        population_sizes = []
-        users = []
-
-        # Track participants count from each group
-        round1_participants_count = []
-        round2_participants_count = []
-        round1_population_sizes = []
-        round2_population_sizes = []
-
-        population_increment = 1.0
-        while len(users) < max_population:
-            new_count = min(int(population_increment), max_population - len(users))
-
-            if new_count > 0:
-                new_users = [
-                    User(i, elo=elo_start)
-                    for i in range(len(users), len(users) + new_count)
-                ]
-                users.extend(new_users)
-
-                posts_to_create = posts_per_user * new_count
-                posting_users = select_posting_users(
-                    users, posts_to_create, elo_posting_scale
-                )
-
-                new_posts = []
-                for i, creator in enumerate(posting_users):
-                    post_id = len(posts) + i
-                    new_post = Post(post_id, creator)
-                    new_posts.append(new_post)
-
-                posts.extend(new_posts)
-
-            for post in new_posts if new_count > 0 else []:
-                sorted_users = sorted(users, key=lambda u: u.elo)
-                round1_group_size = int(round1_split / 100.0 * len(sorted_users))
-                round2_group_size = len(sorted_users) - round1_group_size
-
-                round1_population_sizes.append(round1_group_size)
-                round2_population_sizes.append(round2_group_size)
-                (
-                    votes,
-                    decision,
-                    post_sample_size,
-                    round1_participants,
-                    round2_participants,
-                ) = multi_round_voting(
-                    post,
-                    users,
-                    round1_users,
-                    round2_users,
-                    k_factor,
-                    round1_split,
-                )
-                total_votes += 1
-                round1_participants_count.append(len(round1_participants))
-                round2_participants_count.append(len(round2_participants))
-
-                is_correct = (decision == "support" and post.quality >= 0.5) or (
-                    decision == "oppose" and post.quality < 0.5
-                )
+    Args:
+        backend: Backend class, `ObjectBackend` or `population.ArrayBackend`
+
+    Posts are only kept for the growth step that creates them; everything the
+    report needs is accumulated in a constant-memory `StreamingMetrics`.
+    With a `checkpoint.Checkpointer` the loop state is saved periodically at
+    the end of a growth step; `resume=True` continues from the last one.
+    A `profiler.Profiler` records per-phase timings and per-post latency.
+    An `ip_inheritance.IPModel` assigns IPs to new users, sets their starting
+    rating by IP inheritance and turns bot-farm registrations into bots.
+    A `convergence.ConvergenceTracker` snapshots the rating distribution
+    every few posts, a `baseline.CommunityBaseline` compares every
+    decision with that of a large one-round panel, and an
+    `analytic.AnalyticAccuracy` records each post's exact probability of
+    being decided correctly. A `behaviour.VoterBehaviour` assigns each new
+    user a voter kind and replaces the votes of non-honest voters, and a
+    `churn.ChurnModel` removes departing users at the start of every growth
+    step (on the arrays backend only). Departures are swap-removed: the last user takes over the
+    leaver's id in the population and in every structure keyed by id.
 
-                if is_correct:
-                    correct_votes += 1
-                    correct_votes_stats.append(1)
-                else:
-                    correct_votes_stats.append(0)
+    Returns:
+        Run dictionary with the final users, their goodness and ELO arrays,
+        the run's `StreamingMetrics` and the hooks
+    """
+    posting_sampler = PostingSampler(elo_posting_scale)
+
+    with progress_bar(max_population, "Growing user population", progress) as pbar:
+        if resume:
+            arrays, state = checkpointer.load()
+            store = backend.from_arrays(**arrays)
+            ratings = store.ratings()
+            rank_index = RankIndex.from_ratings(enumerate(ratings.tolist()))
+            posting_sampler.add_users(np.arange(len(store)), ratings)
+            posts_created = state["posts_created"]
+            metrics = state["metrics"]
+            population_increment = state["population_increment"]
+            ip_model = state.get("ip_model", ip_model)
+            convergence = state.get("convergence", convergence)
+            behaviour = state.get("behaviour", behaviour)
+            baseline = state.get("baseline", baseline)
+            analytic = state.get("analytic", analytic)
+            churn = state.get("churn", churn)
+            if audit_log is not None:
+                audit_log.truncate(state["audit_records"], len(store))
+            pbar.update(len(store) + (churn.departed if churn is not None else 0))
+        else:
+            store = backend()
+            rank_index = RankIndex()
+            metrics = StreamingMetrics()
+            posts_created = 0
+            population_increment = 1.0
+        users = store.users
+        rating_observers = (posting_sampler,)
+        if ip_model is not None:
+            rating_observers += (ip_model.index,)
+        if convergence is not None:
+            rating_observers += (convergence,)
+        if analytic is not None:
+            rating_observers += (analytic,)
+        removal_observers = tuple(
+            hook
+            for hook in (rank_index, posting_sampler, churn, behaviour, convergence, analytic)
+            if hook is not None
+        )
+        voting = {
+            "round1_users": round1_users,
+            "round2_users": round2_users,
+            "k_factor": k_factor,
+            "round1_split": round1_split,
+            "rank_index": rank_index,
+            "rating_observers": rating_observers,
+            "single_round_threshold": single_round_threshold,
+            "audit_log": audit_log,
+            "profiler": profiler,
+        }
+        if behaviour is not None:
+            voting["behaviour"] = behaviour
+
+        def joined():
+            return len(store) + (churn.departed if churn is not None else 0)
+
+        while joined() < max_population:
+            new_count = min(int(population_increment), max_population - joined())
+
+            if churn is not None and len(store):
+                with profiler.phase("churn"):
+                    for user_id in churn.departures(
+                        users, rank_index, posts_created, round1_split
+                    ):
+                        moved_from = store.remove_user(user_id)
+                        for hook in removal_observers:
+                            hook.user_removed(user_id, moved_from)
 
-                if decision == "support":
-                    supported_posts_count += 1
             if new_count > 0:
-                population_sizes.append(len(users))
+                with profiler.phase("user_creation"):
+                    new_ids = store.add_users(new_count, elo=elo_start)
+                    if ip_model is not None:
+                        elos, bots = ip_model.onboard(new_ids.tolist(), elo_start)
+                        store.onboard(new_ids, elos, bots, ip_model.bot_goodness)
+                    if behaviour is not None:
+                        behaviour.add_users(new_ids)
+                    new_elos = store.ratings(new_ids)
+                    if audit_log is not None:
+                        audit_log.record_users(new_elos)
+                    if churn is not None:
+                        churn.add_users(new_ids, new_elos, posts_created)
+                    for user_id, elo in zip(new_ids.tolist(), new_elos.tolist()):
+                        rank_index.insert(user_id, elo)
+                    posting_sampler.add_users(new_ids, new_elos)
+
+                with profiler.phase("select_posting_users"):
+                    creators = posting_sampler.draw(posts_per_user * new_count)
+
+                with profiler.phase("post_construction"):
+                    posts = store.create_posts(creators, posts_created)
+                    for _, _, _, creator_elo in posts:
+                        metrics.record_creation(creator_elo)
+
+                N = len(store)
+                round1_group_size = int(round1_split / 100.0 * N)
+                for post_id, (post, quality, creator, creator_elo) in enumerate(
+                    posts, posts_created
+                ):
+                    if profiler.enabled:
+                        post_start = time.perf_counter()
+                    if analytic is not None:
+                        analytic.record_post(users, rank_index, quality)
+                    with profiler.phase("multi_round_voting"):
+                        decision, sample_size, round1, round2 = store.decide(
+                            post, quality, creator, **voting
+                        )
+                    metrics.record_decision(
+                        (decision == "support") == (quality >= 0.5),
+                        decision == "support",
+                        len(round1),
+                        len(round2),
+                        round1_group_size,
+                        N - round1_group_size,
+                    )
+                    if convergence is not None:
+                        convergence.record_post(rank_index, creator_elo)
+                    if baseline is not None:
+                        baseline.record_post(users, quality, decision, sample_size)
+                    if churn is not None:
+                        churn.record_post(post_id, creator, round1, round2)
+                    if profiler.enabled:
+                        profiler.record_post(time.perf_counter() - post_start)
+
+                posts_created += len(posts)
+                metrics.record_population(N)
                 pbar.update(new_count)
-                pbar.set_postfix(current=len(users))
+                pbar.set_postfix(current=N)
 
             population_increment *= 1 + growth_rate
+
+            if checkpointer is not None and checkpointer.due():
+                with profiler.phase("checkpoint"):
+                    if audit_log is not None:
+                        audit_log.flush()
+                    checkpointer.save(
+                        store.state_arrays(),
+                        {
+                            "posts_created": posts_created,
+                            "metrics": metrics,
+                            "population_increment": population_increment,
+                            "audit_records": audit_log.records_written if audit_log else 0,
+                            "ip_model": ip_model,
+                            "convergence": convergence,
+                            "behaviour": behaviour,
+                            "baseline": baseline,
+                            "analytic": analytic,
+                            "churn": churn,
+                        },
+                    )
+
+    if churn is not None:
+        errors = churn.consistency_errors(users, rank_index, posting_sampler)
+        if errors:
+            raise RuntimeError("inconsistent state after churn: " + "; ".join(errors))
+
+    arrays = store.state_arrays()
+    return {
+        "users": users,
+        "user_goodness": np.array(arrays["goodness"]),
+        "user_elos": np.array(arrays["elo"]),
+        "metrics": metrics,
+        "ip_model": ip_model,
+        "convergence": convergence,
+        "behaviour": behaviour,
+        "baseline": baseline,
+        "analytic": analytic,
+        "churn": churn,
+    }
+
+
+def print_summary(run):
+    metrics = run["metrics"]
+    supported_posts_count = metrics.supported_posts_count
+    correct_votes = metrics.correct_votes
+    total_votes = metrics.total_votes
     print(f"Number of posts supported through all voting: {supported_posts_count}")
     print(f"Number of correct votes: {correct_votes}")
     print(f"Total number of votes: {total_votes}")
     print(f"Correct votes: {(correct_votes / total_votes) * 100:.2f}%")
+    recent = metrics.rolling_accuracy
+    print(
+        f"Correct votes over the last {min(total_votes, recent.window)} posts: "
+        f"{recent.value * 100:.2f}%"
+    )
 
-    if posts:
-        creator_elos = [post.creator_elo_at_creation for post in posts]
+    creator_elo = metrics.creator_elo
+    if creator_elo.count:
         print(f"\nPost Creation Statistics:")
-        print(f"Total posts created: {len(posts)}")
-        print(f"Average creator ELO at creation: {np.mean(creator_elos):.2f}")
+        print(f"Total posts created: {creator_elo.count}")
+        print(f"Average creator ELO at creation: {creator_elo.mean:.2f}")
         print(
-            f"Creator ELO range at creation: {min(creator_elos):.1f} - {max(creator_elos):.1f}"
+            f"Creator ELO range at creation: {creator_elo.min:.1f} - {creator_elo.max:.1f}"
         )
 
-        user_elos = [user.elo for user in users]
+        user_elos = run["user_elos"]
         print(f"Final user ELO range: {min(user_elos):.1f} - {max(user_elos):.1f}")
         print(f"Final average user ELO: {np.mean(user_elos):.2f}")
 
-        creator_elo_quartiles = np.percentile(creator_elos, [25, 50, 75])
+        creator_elo_quartiles = metrics.creator_elo_quantiles([0.25, 0.5, 0.75])
         q1, q2, q3 = creator_elo_quartiles
 
         print(f"Throttling Analysis (Creator ELO at post creation):")
-        print(f"  Creator ELO range: {min(creator_elos):.1f} - {max(creator_elos):.1f}")
-        print(f"  Creator ELO average: {np.mean(creator_elos):.1f}")
+        print(f"  Creator ELO range: {creator_elo.min:.1f} - {creator_elo.max:.1f}")
+        print(f"  Creator ELO average: {creator_elo.mean:.1f}")
         print(f"  Population ELO average: {np.mean(user_elos):.1f}")
 
-        elo_bias = np.mean(creator_elos) - np.mean(user_elos)
+        elo_bias = creator_elo.mean - np.mean(user_elos)
         print(f"  ELO bias (creators vs population): {elo_bias:+.1f} ELO points")
 
         print(f"  Creator ELO quartiles: Q1={q1:.1f}, Q2={q2:.1f}, Q3={q3:.1f}")
@@ -419,33 +797,286 @@ def run_simulation(
                 f"  → Throttling may not be effective or population hasn't spread enough"
             )
 
-    plot_distributions(
-        users,
-        correct_votes_stats,
-        population_sizes,
-    )
-    return users
+
+def simulate(
+    backend="objects",
+    seed=None,
+    checkpoint_dir=None,
+    checkpoint_interval=300,
+    resume=False,
+    **params,
+):
+    """
+    Seed the random generators and run the growth loop on one backend.
+
+    Args:
+        backend: "objects" for the reference `User`/`Post` implementation,
+            "arrays" for the struct-of-arrays engine in `population.py`
+        seed: Seed for `random` and `numpy.random` (None leaves them as they are)
+        checkpoint_dir: Directory for periodic checkpoints of the growth loop
+        checkpoint_interval: Minimum seconds between checkpoints
+        resume: Continue from the checkpoint in `checkpoint_dir`; the result is
+            identical to that of an uninterrupted run with the same seed
+        **params: Keyword arguments of `simulate_growth`
+
+    Returns:
+        Run dictionary (see `simulate_growth`)
+    """
+    if backend == "arrays":
+        from population import ArrayBackend as store
+    elif backend == "objects":
+        store = ObjectBackend
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    if checkpoint_dir:
+        from checkpoint import Checkpointer
+
+        unrecorded = (
+            "progress",
+            "audit_log",
+            "profiler",
+            "ip_model",
+            "convergence",
+            "behaviour",
+            "baseline",
+            "analytic",
+            "churn",
+        )
+        recorded = {name: value for name, value in params.items() if name not in unrecorded}
+        for name in ("ip_model", "behaviour", "baseline", "analytic", "churn"):
+            if params.get(name) is not None:
+                recorded[name] = params[name].config()
+        params["checkpointer"] = Checkpointer(
+            checkpoint_dir,
+            checkpoint_interval,
+            params={"backend": backend, "seed": seed, **recorded},
+        )
+        params["resume"] = resume
+    elif resume:
+        raise ValueError("resume requires a checkpoint directory")
+    if params.get("churn") is not None:
+        if backend != "arrays":
+            raise ValueError("churn models need the arrays backend")
+        if params.get("ip_model") is not None or params.get("audit_log") is not None:
+            raise ValueError("churn reuses user ids, which IP inheritance and audit logs cannot follow")
+    return simulate_growth(store, **params)
+
+
+def summarize_run(run):
+    """
+    Headline metrics of a run as plain floats.
+
+    Returns:
+        Dictionary with the correct-vote rate (%), supported post count,
+        creator ELO bias and the final population ELO quartiles
+    """
+    user_elos = run["user_elos"]
+    metrics = run["metrics"]
+    q1, q2, q3 = np.percentile(user_elos, [25, 50, 75])
+    return {
+        "accuracy": 100.0 * metrics.accuracy,
+        "supported_posts": metrics.supported_posts_count,
+        "elo_bias": float(metrics.creator_elo.mean - np.mean(user_elos)),
+        "elo_q1": float(q1),
+        "elo_q2": float(q2),
+        "elo_q3": float(q3),
+    }
+
+
+def run_simulation(
+    max_population=5000,
+    posts_per_user=2,
+    growth_rate=0.01,
+    round1_users=5,
+    round2_users=5,
+    elo_start=800,
+    k_factor=32,
+    round1_split=70,
+    elo_posting_scale=100,
+    single_round_threshold=20,
+    backend="objects",
+    seed=None,
+    show_plots=True,
+    audit_log_dir=None,
+    checkpoint_dir=None,
+    checkpoint_interval=300,
+    resume=False,
+    profile_path=None,
+    report_dir=None,
+    convergence_path=None,
+    convergence_interval=1000,
+    baseline_panel=None,
+    analytic=False,
+    cache_dir=None,
+    cache_size=None,
+):
+    """
+    Run the growth simulation, print the summary and plot the distributions.
+
+    Args:
+        backend: "objects" for the reference `User`/`Post` implementation,
+            "arrays" for the struct-of-arrays engine in `population.py`
+        seed: Seed for `random` and `numpy.random` (None = unseeded)
+        show_plots: Set to False for headless runs
+        audit_log_dir: Directory for a binary log of every vote (see `auditlog.py`)
+        checkpoint_dir / checkpoint_interval / resume: see `simulate`
+        profile_path: Record per-phase timings (see `profiler.py`), print them
+            and write them to this JSON file at exit
+        report_dir: Write a headless report (JSON data plus PNG/SVG figures,
+            see `report.py`) to this directory
+        convergence_path / convergence_interval: Snapshot the rating
+            distribution every `convergence_interval` posts (see
+            `convergence.py`), print the convergence summary and write the
+            snapshots to this JSON file
+        baseline_panel: Also decide every post by a one-round panel of this
+            many random users (0 = the whole community) without touching
+            ratings, and report how often it agrees (see `baseline.py`)
+        analytic: Also report the expected decision accuracy, computed
+            exactly per post instead of sampled (see `analytic.py`)
+        cache_dir / cache_size: Reuse the result of an earlier seeded run
+            with the same parameters from this directory, kept under
+            `cache_size` bytes (see `cache.py`)
+
+    Returns:
+        The final users (a list of `User`, or a `population.Population`;
+        None when the result came from the cache)
+    """
+    audit_log = None
+    if audit_log_dir:
+        from auditlog import AuditLog
+
+        audit_log = AuditLog(audit_log_dir, elo_start=elo_start, append=resume)
+
+    profiler = NULL_PROFILER
+    if profile_path:
+        from profiler import Profiler
+
+        profiler = Profiler()
+
+    convergence = None
+    if convergence_path:
+        from convergence import ConvergenceTracker
+
+        convergence = ConvergenceTracker(convergence_interval, round1_split)
+
+    baseline = None
+    if baseline_panel is not None:
+        from baseline import CommunityBaseline
+
+        baseline = CommunityBaseline(baseline_panel or None, seed=0 if seed is None else seed)
+
+    accuracy = None
+    if analytic:
+        from analytic import AnalyticAccuracy
+
+        accuracy = AnalyticAccuracy(
+            round1_users, round2_users, round1_split, single_round_threshold
+        )
+
+    simulate_run = simulate
+    if cache_dir:
+        from cache import DEFAULT_MAX_BYTES, ResultCache
+
+        simulate_run = ResultCache(cache_dir, cache_size or DEFAULT_MAX_BYTES).simulate
+
+    try:
+        run = simulate_run(
+            backend=backend,
+            audit_log=audit_log,
+            convergence=convergence,
+            baseline=baseline,
+            analytic=accuracy,
+            checkpoint_dir=checkpoint_dir,
+            checkpoint_interval=checkpoint_interval,
+            resume=resume,
+            profiler=profiler,
+            seed=seed,
+            max_population=max_population,
+            posts_per_user=posts_per_user,
+            growth_rate=growth_rate,
+            round1_users=round1_users,
+            round2_users=round2_users,
+            elo_start=elo_start,
+            k_factor=k_factor,
+            round1_split=round1_split,
+            elo_posting_scale=elo_posting_scale,
+            single_round_threshold=single_round_threshold,
+        )
+
+        if audit_log is not None:
+            audit_log.close()
+
+        if run.get("cached"):
+            print(f"Loaded the result from the cache in {cache_dir}\n")
+        print_summary(run)
+        if convergence is not None:
+            run["convergence"].print_report()
+            run["convergence"].save(convergence_path)
+        if baseline is not None:
+            run["baseline"].print_report()
+        if accuracy is not None:
+            run["analytic"].print_report(run["metrics"])
+        if report_dir:
+            from report import write_report
+
+            with profiler.phase("write_report"):
+                write_report(run, report_dir, summary=summarize_run(run))
+        if show_plots:
+            metrics = run["metrics"]
+            with profiler.phase("plot_distributions"):
+                plot_distributions(
+                    run["user_goodness"],
+                    run["user_elos"],
+                    metrics.correct_series.values(),
+                    metrics.population_series.values(),
+                    correct_votes_stride=metrics.correct_series.stride,
+                    population_stride=metrics.population_series.stride,
+                )
+    finally:
+        # Also dumped when the run is interrupted
+        if profiler.enabled:
+            profiler.print_report()
+            profiler.dump(profile_path)
+    return run["users"]
 
 
 def plot_distributions(
-    users,
+    user_goodness,
+    user_elos,
     correct_votes_stats,
     population_sizes,
+    correct_votes_stride=1,
+    population_stride=1,
 ):
+    """
+    Plot goodness and ELO distributions, the smoothed correct-vote ratio and
+    population growth.
+
+    `correct_votes_stats` and `population_sizes` may be downsampled series
+    (see `metrics.DownsampledSeries`) whose points each average `*_stride`
+    consecutive posts / growth steps; smoothing windows and x axes are scaled
+    so the curves match the full-resolution ones.
+    """
+    import matplotlib.pyplot as plt
+    import scipy.stats as st
+
     plt.figure(figsize=(16, 8))  # 2x2 grid layout
 
     # Subplot 1: Distribution of Users by Goodness Factor
     plt.subplot(2, 2, 1)
 
-    user_goodness = [user.goodness for user in users]
-    if user_goodness:
+    user_goodness = np.asarray(user_goodness)
+    if len(user_goodness):
         # Define threshold for "good" vs "bad" users
         # Good users (goodness > 0.65): More likely to vote correctly than randomly
         # Bad users (goodness ≤ 0.65): Vote randomly or worse
         threshold = 0.65
 
-        bad_users = [g for g in user_goodness if g <= threshold]
-        good_users = [g for g in user_goodness if g > threshold]
+        bad_users = user_goodness[user_goodness <= threshold]
+        good_users = user_goodness[user_goodness > threshold]
 
         # Create stacked histogram with different colors
         plt.hist(
@@ -482,11 +1113,11 @@ def plot_distributions(
     # Subplot 2: Distribution of Users by Elo Rating with User Groups
     plt.subplot(2, 2, 2)
 
-    user_elos = [user.elo for user in users]
-    if user_elos:
+    user_elos = np.asarray(user_elos)
+    if len(user_elos):
         # Sort users by ELO to determine thresholds based on user count percentiles
-        sorted_users = sorted(users, key=lambda u: u.elo)
-        N = len(sorted_users)
+        sorted_elos = np.sort(user_elos)
+        N = len(sorted_elos)
 
         # Define thresholds based on user count percentiles (matching voting system)
         # Round 1: bottom 70% of users by count
@@ -497,25 +1128,23 @@ def plot_distributions(
 
         # Get the actual ELO values at these cutoff points
         round1_threshold = (
-            sorted_users[round1_cutoff_index - 1].elo
+            sorted_elos[round1_cutoff_index - 1]
             if round1_cutoff_index > 0
-            else sorted_users[0].elo
+            else sorted_elos[0]
         )
         editor_threshold = (
-            sorted_users[editor_cutoff_index - 1].elo
+            sorted_elos[editor_cutoff_index - 1]
             if editor_cutoff_index > 0
-            else sorted_users[0].elo
+            else sorted_elos[0]
         )
 
         # Separate users into groups based on user count percentiles
-        round1_elos = [user.elo for user in sorted_users[:round1_cutoff_index]]
-        round2_non_editor_elos = [
-            user.elo for user in sorted_users[round1_cutoff_index:editor_cutoff_index]
-        ]
-        editor_elos = [user.elo for user in sorted_users[editor_cutoff_index:]]
+        round1_elos = sorted_elos[:round1_cutoff_index]
+        round2_non_editor_elos = sorted_elos[round1_cutoff_index:editor_cutoff_index]
+        editor_elos = sorted_elos[editor_cutoff_index:]
 
         # Round 2 includes both non-editors and editors (top 30% total)
-        round2_elos = round2_non_editor_elos + editor_elos
+        round2_elos = sorted_elos[round1_cutoff_index:]
 
         # Create histogram with 50 bins
         bins = 50
@@ -567,11 +1196,14 @@ def plot_distributions(
 
     # Subplot 3: Correct Votes Ratio with Linear Regression
     plt.subplot(2, 2, 3)
-    if len(correct_votes_stats) > 10:
-        if len(correct_votes_stats) < 50:
-            window_size = min(10, len(correct_votes_stats))
+    total_posts = len(correct_votes_stats) * correct_votes_stride
+    if total_posts > 10:
+        if total_posts < 50:
+            window_size = min(10, total_posts)
         else:
-            window_size = max(10, int(len(correct_votes_stats) / 100))
+            window_size = max(10, int(total_posts / 100))
+        # Window in (possibly downsampled) points
+        window_size = max(1, round(window_size / correct_votes_stride))
 
         multiround_smoothed = (
             np.convolve(
@@ -580,7 +1212,7 @@ def plot_distributions(
             * 100
         )
 
-        x = np.arange(len(multiround_smoothed))
+        x = np.arange(len(multiround_smoothed)) * correct_votes_stride
 
         # Linear regression for multiround voting
         (
@@ -642,7 +1274,11 @@ def plot_distributions(
 
     # Subplot 4: Population Over Time
     plt.subplot(2, 2, 4)
-    plt.plot(range(len(population_sizes)), population_sizes, label="Population Size")
+    plt.plot(
+        np.arange(len(population_sizes)) * population_stride,
+        population_sizes,
+        label="Population Size",
+    )
     plt.xlabel("Round Index")
     plt.ylabel("Population Size")
     plt.title("Population Over Time")
@@ -711,6 +1347,101 @@ def main():
         default=70,
         help="Percentage of high-ELO users for round 1 (remaining go to round 2) (default: 70)",
     )
+    parser.add_argument(
+        "--single-round-threshold",
+        type=int,
+        default=20,
+        help="Communities smaller than this use a single voting round (default: 20)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["objects", "arrays"],
+        default="objects",
+        help="Population store: reference User/Post objects or the struct-of-arrays engine (default: objects)",
+    )
+
+    parser.add_argument(
+        "--seed", type=int, default=None, help="Random seed (default: unseeded)"
+    )
+    parser.add_argument(
+        "--no-plot", action="store_true", help="Skip the plots (headless runs)"
+    )
+    parser.add_argument(
+        "--report",
+        default=None,
+        metavar="DIR",
+        help="Write report.json and PNG/SVG figures to DIR without opening a window",
+    )
+    parser.add_argument(
+        "--convergence",
+        default=None,
+        metavar="FILE",
+        help="Snapshot the rating distribution during the run and write the time series to FILE",
+    )
+    parser.add_argument(
+        "--convergence-interval",
+        type=int,
+        default=1000,
+        help="Posts between rating distribution snapshots (default: 1000)",
+    )
+    parser.add_argument(
+        "--baseline",
+        nargs="?",
+        type=int,
+        const=1001,
+        default=None,
+        metavar="PANEL",
+        help="Compare every decision with a one-round vote of PANEL random users "
+        "(default: 1001, 0 = whole community)",
+    )
+    parser.add_argument(
+        "--analytic",
+        action="store_true",
+        help="Report the expected decision accuracy, computed exactly per post",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        default=None,
+        metavar="FILE",
+        help="Record per-phase timings and write them to FILE (default: profile.json)",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        default=None,
+        metavar="DIR",
+        help="Periodically checkpoint the run to DIR",
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=300,
+        help="Seconds between checkpoints (default: 300)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the checkpoint in --checkpoint-dir (pass the same parameters and seed)",
+    )
+    parser.add_argument(
+        "--audit-log",
+        default=None,
+        metavar="DIR",
+        help="Write every vote and rating change to a binary audit log in DIR",
+    )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        metavar="DIR",
+        help="Reuse results of earlier seeded runs with the same parameters from DIR",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=1024,
+        help="Size limit of the result cache in MB (default: 1024)",
+    )
 
     args = parser.parse_args()
 
@@ -725,6 +1456,22 @@ def main():
         k_factor=args.k_factor,
         round1_split=args.round1_split,
         elo_posting_scale=args.elo_posting_scale,
+        single_round_threshold=args.single_round_threshold,
+        backend=args.backend,
+        seed=args.seed,
+        show_plots=not args.no_plot,
+        audit_log_dir=args.audit_log,
+        checkpoint_dir=args.checkpoint_dir,
+        checkpoint_interval=args.checkpoint_interval,
+        resume=args.resume,
+        profile_path=args.profile,
+        report_dir=args.report,
+        convergence_path=args.convergence,
+        convergence_interval=args.convergence_interval,
+        baseline_panel=args.baseline,
+        analytic=args.analytic,
+        cache_dir=args.cache,
+        cache_size=int(args.cache_size * 2**20),
     )
 
     return users
@@ -0,0 +1,235 @@
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from simulation import simulate, summarize_run
+
+# Simulation knobs that can be swept, with the type their values are parsed as
+SWEEP_PARAMETERS = {
+    "max_population": int,
+    "posts_per_user": int,
+    "growth_rate": float,
+    "round1_users": int,
+    "round2_users": int,
+    "elo_start": int,
+    "k_factor": int,
+    "round1_split": int,
+    "elo_posting_scale": int,
+    "single_round_threshold": int,
+}
+
+METRICS = ["accuracy", "supported_posts", "elo_bias", "elo_q1", "elo_q2", "elo_q3"]
+
+
+def _split_spec(spec):
+    name, _, values = spec.partition("=")
+    name = name.strip().replace("-", "_")
+    if name not in SWEEP_PARAMETERS or not values:
+        raise argparse.ArgumentTypeError(
+            f"Expected NAME=VALUES with NAME one of {', '.join(SWEEP_PARAMETERS)}: {spec}"
+        )
+    return name, values
+
+
+def parse_values(specs):
+    """Parse NAME=V1,V2,... specs into {name: [typed values]}."""
+    parsed = {}
+    for spec in specs:
+        name, values = _split_spec(spec)
+        parsed[name] = [SWEEP_PARAMETERS[name](v) for v in values.split(",")]
+    return parsed
+
+
+def parse_ranges(specs):
+    """Parse NAME=LOW:HIGH specs into {name: (low, high)}."""
+    parsed = {}
+    for spec in specs:
+        name, values = _split_spec(spec)
+        low, high = values.split(":")
+        parsed[name] = (SWEEP_PARAMETERS[name](low), SWEEP_PARAMETERS[name](high))
+    return parsed
+
+
+def grid_points(grid):
+    """Every combination of the grid values, in a stable order."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def random_points(ranges, samples, seed):
+    """
+    `samples` points drawn uniformly from the given ranges (integer
+    parameters inclusive of both bounds).
+    """
+    rng = np.random.default_rng(seed)
+    points = []
+    for _ in range(samples):
+        point = {}
+        for name, (low, high) in ranges.items():
+            if SWEEP_PARAMETERS[name] is int:
+                point[name] = int(rng.integers(low, high + 1))
+            else:
+                point[name] = float(rng.uniform(low, high))
+        points.append(point)
+    return points
+
+
+def plan_runs(points, replicas=1, seed=0):
+    """
+    Expand sweep points into runs with independent, reproducible seeds.
+
+    Seeds come from `numpy.random.SeedSequence(seed).spawn`, so run `i` always
+    gets the same seed for the same sweep, whichever worker executes it.
+    """
+    children = np.random.SeedSequence(seed).spawn(len(points) * replicas)
+    runs = []
+    for i, (point, replica) in enumerate(itertools.product(points, range(replicas))):
+        runs.append(
+            {
+                "run_id": i,
+                "replica": replica,
+                "seed": int(children[i].generate_state(1)[0]),
+                "params": point,
+            }
+        )
+    return runs
+
+
+def execute_run(run, base_params, backend="objects", cache_dir=None):
+    """
+    Run one simulation headless and return its summary row.
+
+    With `cache_dir`, a run already in that result cache (see `cache.py`)
+    is read from disk instead of simulated.
+    """
+    start = time.perf_counter()
+    simulate_run = simulate
+    if cache_dir:
+        from cache import ResultCache
+
+        simulate_run = ResultCache(cache_dir).simulate
+    result = simulate_run(
+        backend=backend,
+        seed=run["seed"],
+        progress=False,
+        **{**base_params, **run["params"]},
+    )
+    row = {"run_id": run["run_id"], "replica": run["replica"], "seed": run["seed"]}
+    row.update(run["params"])
+    row.update(summarize_run(result))
+    row["wall_time"] = time.perf_counter() - start
+    return row
+
+
+def run_sweep(runs, base_params, output, workers=None, backend="objects", cache_dir=None):
+    """
+    Fan the runs out across a process pool and append each summary row to
+    the CSV at `output` as soon as its run finishes. Runs found in the
+    result cache at `cache_dir` are not simulated again.
+
+    Returns:
+        List of result rows in completion order
+    """
+    swept = sorted({name for run in runs for name in run["params"]})
+    fieldnames = ["run_id", "replica", "seed", *swept, *METRICS, "wall_time"]
+    rows = []
+    with open(output, "w", newline="") as f, ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count()
+    ) as pool:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        f.flush()
+        futures = [pool.submit(execute_run, run, base_params, backend, cache_dir) for run in runs]
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            writer.writerow(row)
+            f.flush()
+            rows.append(row)
+            settings = " ".join(f"{name}={row[name]}" for name in swept)
+            print(
+                f"[{done}/{len(runs)}] {settings} seed={row['seed']} "
+                f"accuracy={row['accuracy']:.2f}% bias={row['elo_bias']:+.1f}"
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - parallel parameter sweep"
+    )
+    parser.add_argument(
+        "--grid",
+        action="append",
+        default=[],
+        metavar="NAME=V1,V2,...",
+        help="Grid values for a parameter (repeatable; runs every combination)",
+    )
+    parser.add_argument(
+        "--uniform",
+        action="append",
+        default=[],
+        metavar="NAME=LOW:HIGH",
+        help="Random-search range for a parameter (repeatable; see --samples)",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=20,
+        help="Number of random-search points (default: 20)",
+    )
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Fixed value for a parameter in every run (repeatable)",
+    )
+    parser.add_argument(
+        "--replicas",
+        type=int,
+        default=1,
+        help="Independently seeded runs per point (default: 1)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Sweep seed (default: 0)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--backend", choices=["objects", "arrays"], default="objects"
+    )
+    parser.add_argument(
+        "--output",
+        default="sweep_results.csv",
+        help="CSV results table (default: sweep_results.csv)",
+    )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        metavar="DIR",
+        help="Result cache shared with earlier sweeps and runs (see cache.py)",
+    )
+    args = parser.parse_args()
+
+    if args.grid and args.uniform:
+        parser.error("use either --grid or --uniform, not both")
+    base_params = {name: values[0] for name, values in parse_values(args.set).items()}
+    if args.uniform:
+        points = random_points(parse_ranges(args.uniform), args.samples, args.seed)
+    else:
+        points = grid_points(parse_values(args.grid))
+
+    runs = plan_runs(points, args.replicas, args.seed)
+    print(f"Running {len(runs)} simulations, writing results to {args.output}")
+    run_sweep(runs, base_params, args.output, args.workers, args.backend, args.cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+import argparse
+import heapq
+import math
+import random
+import time
+
+import numpy as np
+from tqdm import tqdm
+
+from metrics import StreamingMetrics
+from population import Population, PostStore, multi_round_voting_panel
+from rank_index import RankIndex
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+class ThrottleScheduler:
+    """
+    Time-ordered posting under rating-dependent cooldowns (whitepaper 5.2.2).
+
+    A user may post again `cooldown(elo)` seconds after their last post and
+    then does so after a random activity delay. Next post times sit in a
+    heap. A rating change never rescans anything: if it shortens the user's
+    wait, a new entry is pushed at once (the old one becomes stale and is
+    skipped by its version number); if it lengthens it, the user is only
+    marked, and the post time is recomputed when the entry reaches the top.
+
+    Registered as a rating observer of the voting rounds.
+    """
+
+    def __init__(
+        self,
+        base_cooldown=12 * HOUR,
+        halving_elo=50,
+        min_cooldown=HOUR,
+        max_cooldown=7 * DAY,
+        activity_mean=12 * HOUR,
+        elo_start=800,
+        seed=0,
+    ):
+        self.base_cooldown = base_cooldown
+        self.halving_elo = halving_elo
+        self.min_cooldown = min_cooldown
+        self.max_cooldown = max_cooldown
+        self.activity_mean = activity_mean
+        self.elo_start = elo_start
+        self.rng = np.random.default_rng(seed)
+        self.now = 0.0
+        self._heap = []
+        self._sequence = 0
+        self._elo = []
+        self._last_post = []
+        self._delay = []
+        self._due = []
+        self._version = []
+        self._dirty = []
+        self.stale_skipped = 0
+        self.eager_reschedules = 0
+        self.lazy_reschedules = 0
+
+    def cooldown(self, elo):
+        """Base cooldown at the starting rating, doubling every `halving_elo` below it."""
+        cooldown = self.base_cooldown * 2 ** ((self.elo_start - elo) / self.halving_elo)
+        return min(self.max_cooldown, max(self.min_cooldown, cooldown))
+
+    def _push(self, user_id, due):
+        self._version[user_id] += 1
+        self._due[user_id] = due
+        self._sequence += 1
+        heapq.heappush(self._heap, (due, self._sequence, user_id, self._version[user_id]))
+
+    def _next_due(self, user_id):
+        return (
+            self._last_post[user_id]
+            + self.cooldown(self._elo[user_id])
+            + self._delay[user_id]
+        )
+
+    def add_user(self, user_id, elo):
+        """Register a user (ids must be consecutive) who may post from now on."""
+        self._elo.append(elo)
+        # Stagger first posts as if the previous one was a random time ago
+        self._last_post.append(self.now - self.rng.uniform(0, self.cooldown(elo)))
+        self._delay.append(self.rng.exponential(self.activity_mean))
+        self._due.append(math.inf)
+        self._version.append(0)
+        self._dirty.append(False)
+        self._push(user_id, max(self.now, self._next_due(user_id)))
+
+    def rating_changed(self, user_id, elo):
+        self._elo[user_id] = elo
+        due = max(self.now, self._next_due(user_id))
+        if due < self._due[user_id]:
+            self.eager_reschedules += 1
+            self._push(user_id, due)
+        elif due > self._due[user_id]:
+            self._dirty[user_id] = True
+
+    def next_post(self, until):
+        """
+        Pop the next post at or before `until`.
+
+        Returns:
+            (time, user id), or None when no post is due by `until`
+        """
+        heap = self._heap
+        while heap and heap[0][0] <= until:
+            due, _, user_id, version = heapq.heappop(heap)
+            if version != self._version[user_id]:
+                self.stale_skipped += 1
+                continue
+            if self._dirty[user_id]:
+                self._dirty[user_id] = False
+                later = self._next_due(user_id)
+                if later > due:
+                    self.lazy_reschedules += 1
+                    self._push(user_id, later)
+                    continue
+            self.now = due
+            return due, user_id
+        self.now = max(self.now, until)
+        return None
+
+    def posted(self, user_id):
+        """Start the cooldown of a user who just posted at `now`."""
+        self._last_post[user_id] = self.now
+        self._delay[user_id] = self.rng.exponential(self.activity_mean)
+        self._push(user_id, self._next_due(user_id))
+
+    def __len__(self):
+        return len(self._heap)
+
+
+def simulate_throttled(
+    population_size=5000,
+    days=14,
+    arrivals_per_day=0.0,
+    base_cooldown_hours=12,
+    halving_elo=50,
+    activity_hours=12,
+    round1_users=5,
+    round2_users=5,
+    elo_start=800,
+    k_factor=32,
+    round1_split=70,
+    single_round_threshold=20,
+    seed=0,
+    progress=True,
+):
+    """
+    Continuous posting over `days` simulated days on the array backend.
+
+    Posts are released by a `ThrottleScheduler` in time order and voted on
+    with `multi_round_voting_panel` as they arrive; new users join as a
+    Poisson process at `arrivals_per_day`.
+
+    Returns:
+        Run dictionary in the shape of `simulation.simulate_growth`, plus
+        per-user post counts, the scheduler and event statistics
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    scheduler = ThrottleScheduler(
+        base_cooldown=base_cooldown_hours * HOUR,
+        halving_elo=halving_elo,
+        activity_mean=activity_hours * HOUR,
+        elo_start=elo_start,
+        seed=seed,
+    )
+    population = Population()
+    rank_index = RankIndex()
+    metrics = StreamingMetrics()
+    posts = PostStore()
+    post_counts = []
+    arrivals = np.random.default_rng([seed, 1])
+
+    def add_users(count):
+        for user_id in population.add_users(count, elo=elo_start).tolist():
+            rank_index.insert(user_id, float(elo_start))
+            scheduler.add_user(user_id, float(elo_start))
+            post_counts.append(0)
+
+    add_users(population_size)
+    end = days * DAY
+    next_arrival = arrivals.exponential(DAY / arrivals_per_day) if arrivals_per_day else math.inf
+    start = time.perf_counter()
+
+    with tqdm(total=days, desc="Simulated days", disable=not progress) as pbar:
+        day = 0
+        while True:
+            event = scheduler.next_post(min(end, next_arrival))
+            if event is None:
+                if next_arrival > end:
+                    break
+                add_users(1)
+                next_arrival += arrivals.exponential(DAY / arrivals_per_day)
+                continue
+            now, creator = event
+            post_id = posts.add_posts([creator], population)[0]
+            quality = posts.quality[post_id]
+            metrics.record_creation(float(posts.creator_elo_at_creation[post_id]))
+            N = len(population)
+            round1_group_size = int(round1_split / 100.0 * N)
+            _, decision, _, round1_ids, round2_ids = multi_round_voting_panel(
+                population,
+                quality,
+                round1_users,
+                round2_users,
+                k_factor,
+                round1_split,
+                rank_index=rank_index,
+                rating_observers=(scheduler,),
+                single_round_threshold=single_round_threshold,
+            )
+            metrics.record_decision(
+                (decision == "support") == (quality >= 0.5),
+                decision == "support",
+                len(round1_ids),
+                len(round2_ids),
+                round1_group_size,
+                N - round1_group_size,
+            )
+            post_counts[creator] += 1
+            scheduler.posted(creator)
+            while day < int(now // DAY):
+                day += 1
+                metrics.record_population(len(population))
+                pbar.update(1)
+        pbar.update(days - day)
+
+    return {
+        "users": population,
+        "user_goodness": population.goodness.copy(),
+        "user_elos": population.elo.copy(),
+        "metrics": metrics,
+        "posts": posts,
+        "post_counts": np.array(post_counts),
+        "scheduler": scheduler,
+        "days": days,
+        "wall_time": time.perf_counter() - start,
+    }
+
+
+def print_report(run):
+    scheduler = run["scheduler"]
+    metrics = run["metrics"]
+    elos = run["user_elos"]
+    counts = run["post_counts"]
+    days = run["days"]
+    print(f"\nThrottled posting over {days} days, {len(elos)} users:")
+    print(f"  Posts: {metrics.total_votes} ({metrics.total_votes / days:.0f} per day)")
+    print(f"  Correct votes: {100 * metrics.accuracy:.2f}%")
+    print(
+        f"  Scheduler: {scheduler.eager_reschedules} eager and "
+        f"{scheduler.lazy_reschedules} lazy reschedules, "
+        f"{scheduler.stale_skipped} stale entries skipped"
+    )
+    print(
+        f"  Wall time: {run['wall_time']:.2f}s "
+        f"({metrics.total_votes / max(run['wall_time'], 1e-9):.0f} posts/s)"
+    )
+
+    print(f"\n  {'ELO quartile':<14} {'ELO range':>17} {'cooldown (h)':>13} {'posts/user/day':>15}")
+    bounds = np.percentile(elos, [0, 25, 50, 75, 100])
+    quartile = np.clip(np.searchsorted(bounds[1:-1], elos, side="right"), 0, 3)
+    for q in range(4):
+        mask = quartile == q
+        if not mask.any():
+            continue
+        cooldown = np.mean([scheduler.cooldown(elo) for elo in elos[mask]]) / HOUR
+        print(
+            f"  Q{q + 1:<13} {elos[mask].min():>8.1f}-{elos[mask].max():<8.1f} "
+            f"{cooldown:>13.1f} {counts[mask].mean() / days:>15.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Veridonia Voting Simulation - event-driven posting with rating-dependent cooldowns"
+    )
+    parser.add_argument("--population", type=int, default=5000)
+    parser.add_argument("--days", type=float, default=14)
+    parser.add_argument(
+        "--arrivals-per-day",
+        type=float,
+        default=0.0,
+        help="New users joining per simulated day (default: 0)",
+    )
+    parser.add_argument(
+        "--base-cooldown-hours",
+        type=float,
+        default=12,
+        help="Cooldown at the starting rating (default: 12)",
+    )
+    parser.add_argument(
+        "--halving-elo",
+        type=float,
+        default=50,
+        help="Rating drop that doubles the cooldown (default: 50)",
+    )
+    parser.add_argument(
+        "--activity-hours",
+        type=float,
+        default=12,
+        help="Mean delay between becoming eligible and posting (default: 12)",
+    )
+    parser.add_argument("--round1-users", type=int, default=5)
+    parser.add_argument("--round2-users", type=int, default=5)
+    parser.add_argument("--elo-start", type=int, default=800)
+    parser.add_argument("--k-factor", type=int, default=32)
+    parser.add_argument("--round1-split", type=int, default=70)
+    parser.add_argument("--single-round-threshold", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run = simulate_throttled(
+        population_size=args.population,
+        days=args.days,
+        arrivals_per_day=args.arrivals_per_day,
+        base_cooldown_hours=args.base_cooldown_hours,
+        halving_elo=args.halving_elo,
+        activity_hours=args.activity_hours,
+        round1_users=args.round1_users,
+        round2_users=args.round2_users,
+        elo_start=args.elo_start,
+        k_factor=args.k_factor,
+        round1_split=args.round1_split,
+        single_round_threshold=args.single_round_threshold,
+        seed=args.seed,
+    )
+    print_report(run)
+
+
+if __name__ == "__main__":
+    main()
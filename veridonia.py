@@ -0,0 +1,121 @@
+from simulation import plot_distributions, print_summary, simulate, summarize_run
+
+
+class SimulationResult:
+    """
+    Outcome of one headless run (see `run`).
+
+    Attributes:
+        backend / seed / params: What was run
+        users: The final users (a list of `User`, or a `population.Population`;
+            None when the result came from the cache)
+        user_goodness / user_elos: Final per-user arrays
+        metrics: The run's `metrics.StreamingMetrics`
+        cached: Whether the result was read from a result cache
+        extras: The run's optional hooks by name (`convergence`, `baseline`,
+            `analytic`, ...), for the ones that were passed
+
+    Nothing is printed or plotted unless asked for; plotting and report
+    dependencies are imported by the methods that need them.
+    """
+
+    def __init__(self, run, backend, seed, params):
+        self.backend = backend
+        self.seed = seed
+        self.params = params
+        self.users = run["users"]
+        self.user_goodness = run["user_goodness"]
+        self.user_elos = run["user_elos"]
+        self.metrics = run["metrics"]
+        self.cached = run.get("cached", False)
+        self.extras = {
+            name: value
+            for name, value in run.items()
+            if value is not None
+            and name not in ("users", "user_goodness", "user_elos", "metrics", "cached")
+        }
+        self._run = run
+        self._summary = None
+
+    @property
+    def summary(self):
+        """Headline metrics as plain floats (see `simulation.summarize_run`)."""
+        if self._summary is None:
+            self._summary = summarize_run(self._run)
+        return self._summary
+
+    @property
+    def accuracy(self):
+        """Correct-vote rate in percent."""
+        return self.summary["accuracy"]
+
+    def to_dict(self):
+        """
+        JSON-serialisable description: backend, seed, plain parameters (hooks
+        are left out) and summary.
+        """
+        return {
+            "backend": self.backend,
+            "seed": self.seed,
+            "params": {
+                name: value
+                for name, value in self.params.items()
+                if isinstance(value, (bool, int, float, str))
+            },
+            "summary": dict(self.summary),
+        }
+
+    def print_summary(self):
+        print_summary(self._run)
+
+    def report_data(self, bins=50, point_budget=2000):
+        """Plot data of the run (see `report.build_report_data`)."""
+        from report import build_report_data
+
+        return build_report_data(self._run, bins, point_budget, self.summary)
+
+    def write_report(self, directory, formats=("png", "svg")):
+        """
+        Write `report.json` and figures to `directory` (see `report.py`).
+
+        Returns:
+            List of written paths
+        """
+        from report import write_report
+
+        return write_report(self._run, directory, formats, summary=self.summary)
+
+    def plot(self):
+        """Show the distributions in a window (see `simulation.plot_distributions`)."""
+        plot_distributions(
+            self.user_goodness,
+            self.user_elos,
+            self.metrics.correct_series.values(),
+            self.metrics.population_series.values(),
+            correct_votes_stride=self.metrics.correct_series.stride,
+            population_stride=self.metrics.population_series.stride,
+        )
+
+
+def run(backend="objects", seed=None, progress=False, cache_dir=None, **params):
+    """
+    Run the growth simulation as a library call: no output, no plots.
+
+    Args:
+        backend: "objects" or "arrays" (see `simulation.simulate`)
+        seed: Seed for `random` and `numpy.random` (None = unseeded)
+        progress: Show a progress bar on stderr
+        cache_dir: Reuse the result of an identical seeded run from this
+            result cache directory (see `cache.py`)
+        **params: Simulation parameters and hooks of `simulation.simulate`
+
+    Returns:
+        `SimulationResult`
+    """
+    simulate_run = simulate
+    if cache_dir:
+        from cache import ResultCache
+
+        simulate_run = ResultCache(cache_dir).simulate
+    result = simulate_run(backend=backend, seed=seed, progress=progress, **params)
+    return SimulationResult(result, backend, seed, params)